@@ -1,155 +1,159 @@
 #!/usr/bin/env python3
 # Auto-mapper for DS4 (Python)
+# Usage: python -m python.auto_map
+#        python -m python.auto_map --from-samples [--labels cross circle]
+# Importing this module has no side effects; the pure helpers live in
+# python/auto_map_core.py and are re-exported here for compatibility.
 import os, time, json
-try:
-    import hid
-except Exception:
-    hid = None
-
-BUTTONS = ['square','cross','circle','triangle','l1','r1','l2_btn','r2_btn','share','options','lstick','rstick','ps','dpad_up','dpad_right','dpad_down','dpad_left']
-AXES = ['lstick_x','lstick_y','rstick_x','rstick_y','l2','r2']
-
-print('Starting Python auto-mapper')
-if hid is None:
-    print('hid library not available — ensure hidapi is installed and run on a system with device')
-
-devices = hid.enumerate() if hid else []
-print('HID devices:', len(devices))
-
-target = None
-for d in devices:
-    if 'Sony' in (d.get('manufacturer') or '') or 'Wireless Controller' in (d.get('product') or ''):
-        target = d
-        break
-
-if not target:
-    print('No DualShock-like device found; exiting.')
-    raise SystemExit(1)
-
-h = hid.device(); h.open_path(target['path']); h.set_nonblocking(True)
-
-state = {'raw': None}
-
-def print_diff(prev, cur):
-    diffs = []
-    for i in range(max(len(prev), len(cur))):
-        a = prev[i] if i < len(prev) else 0
-        b = cur[i] if i < len(cur) else 0
-        if a != b:
-            diffs.append({'idx':i, 'before':a, 'after':b, 'xor': a ^ b})
-    return diffs
 
-def wait_diff(timeout=8.0):
-    st = state['raw'][:] if state['raw'] else None
-    start = time.time()
-    while time.time() - start < timeout:
-        r = h.read(64)
+from python.auto_map_core import (  # noqa: F401
+    AXES, BUTTONS, DPAD_DIRECTIONS, choose_candidate, detect_sensor_candidates,
+    infer_mappings_batched, infer_mappings_from_labeled_reports, print_diff, stream_diffs,
+)
+from python.sample_store import DEFAULT_PATH as SAMPLES_STORE, JSON_PATH as SAMPLES_JSON, SampleStore, read_json_samples
+
+
+def find_controller(hid):
+    for d in hid.enumerate():
+        if 'Sony' in (d.get('manufacturer') or '') or 'Wireless Controller' in (d.get('product') or ''):
+            return d
+    return None
+
+
+def read_reports(h, timeout=8.0, size=64, poll_ms=100):
+    """Reportes del dispositivo hasta agotar ``timeout`` (lectura bloqueante, sin sleep)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        r = h.read(size, max(1, min(poll_ms, int(remaining * 1000))))
         if r:
-            cur = list(r)
-            if st:
-                diffs = print_diff(st, cur)
-                if diffs:
-                    return diffs
-            st = cur
-        time.sleep(0.01)
-    raise TimeoutError()
-
-mapping = {'axes': {}, 'buttons': {}, 'dpad': {'byte': None, 'mask': None}}
-
-# Add a helper to infer mappings from labeled before/after report pairs
-def infer_mappings_from_labeled_reports(labeled_pairs):
-    # labeled_pairs: list of tuples (label, before, after)
-    per_label = {}
-    def print_diff(prev, cur):
-        diffs = []
-        for i in range(max(len(prev), len(cur))):
-            a = prev[i] if i < len(prev) else 0
-            b = cur[i] if i < len(cur) else 0
-            if a != b:
-                diffs.append({'idx':i,'before':a,'after':b,'xor':a^b})
-        return diffs
-
-    for label, before, after in labeled_pairs:
-        diffs = print_diff(before, after)
-        per_label.setdefault(label, []).append(diffs)
-
-    # pick best candidate per label (prefer single bit xor)
-    mapping = {}
-    for label, attempts in per_label.items():
-        candidates = []
-        for diffs in attempts:
-            for d in diffs: candidates.append(d)
-        # prefer single-bit xor
-        single = next((d for d in candidates if (d['xor'] & (d['xor'] - 1)) == 0), None)
-        if single:
-            mapping[label] = [single['idx'], single['xor']]
-        else:
-            # pick smallest popcount
-            candidates.sort(key=lambda x: bin(x['xor']).count('1'))
-            if candidates:
-                mapping[label] = [candidates[0]['idx'], candidates[0]['xor']]
+            yield r
+
+
+def wait_diff(h, timeout=8.0):
+    """Primer cambio entre reportes consecutivos o TimeoutError."""
+    diffs = next(stream_diffs(read_reports(h, timeout)), None)
+    if diffs is None:
+        raise TimeoutError()
+    return diffs
+
+
+def run_mapper(next_diff, ask=input):
+    """Recorre botones, D-pad y ejes pidiendo cada control; devuelve el mapeo."""
+    mapping = {'axes': {}, 'buttons': {}, 'dpad': {'byte': None, 'mask': None}}
+
+    for btn in BUTTONS:
+        ask(f'Ready for button {btn} — press it now and then ENTER')
+        try:
+            cand = next_diff()[0]
+            mapping['buttons'][btn] = [cand['idx'], cand['xor']]
+            print('Mapped', btn, '->', mapping['buttons'][btn])
+        except TimeoutError:
+            print('Timeout mapping', btn)
+
+    print('Mapping dpad directions')
+    for d in DPAD_DIRECTIONS:
+        ask(f'Ready for {d} — press and ENTER')
+        try:
+            cand = next_diff()[0]
+            mapping['dpad']['byte'] = cand['idx']
+            mapping['dpad']['mask'] = 0x0f
+            print('Dpad byte likely', cand['idx'])
+        except TimeoutError:
+            print('Timeout mapping', d)
+
+    print('Mapping axes — move stick/trigger when prompted')
+    for ax in AXES:
+        ask(f'Ready for axis {ax} — move and press ENTER')
+        try:
+            cand = next_diff()[0]
+            mapping['axes'][ax] = cand['idx']
+            print('Mapped axis', ax, '-> byte', cand['idx'])
+        except TimeoutError:
+            print('Timeout mapping axis', ax)
     return mapping
 
-# expose
-infer_mappings_from_labeled_reports = infer_mappings_from_labeled_reports
-
-def detect_sensor_candidates(reports):
-    if not reports:
-        return {'batteryCandidates': [], 'motionCandidates': []}
-    length = max(len(r) for r in reports)
-    means = []
-    variances = []
-    for i in range(length):
-        vals = [(r[i] if i < len(r) else 0) for r in reports]
-        mean = sum(vals)/len(vals)
-        var = sum((v-mean)**2 for v in vals)/len(vals)
-        means.append(mean)
-        variances.append(var)
-    batteryCandidates = [i for i,v in enumerate(variances) if v < 4 and means[i] > 0]
-    motionCandidates = [i for i,v in enumerate(variances) if v > 20]
-    return {'batteryCandidates': batteryCandidates, 'motionCandidates': motionCandidates}
-
-detect_sensor_candidates = detect_sensor_candidates
-
-for btn in BUTTONS:
-    input(f'Ready for button {btn} — press it now and then ENTER')
-    try:
-        diffs = wait_diff(8.0)
-        cand = diffs[0]
-        mapping['buttons'][btn] = [cand['idx'], cand['xor']]
-        print('Mapped', btn, '->', mapping['buttons'][btn])
-    except TimeoutError:
-        print('Timeout mapping', btn)
-
-print('Mapping dpad directions')
-for d in ['dpad_up','dpad_right','dpad_down','dpad_left']:
-    input(f'Ready for {d} — press and ENTER')
-    try:
-        diffs = wait_diff(8.0)
-        cand = diffs[0]
-        mapping['dpad']['byte'] = cand['idx']
-        mapping['dpad']['mask'] = 0x0f
-        print('Dpad byte likely', cand['idx'])
-    except TimeoutError:
-        print('Timeout mapping', d)
-
-print('Mapping axes — move stick/trigger when prompted')
-for ax in AXES:
-    input(f'Ready for axis {ax} — move and press ENTER')
-    try:
-        diffs = wait_diff(8.0)
-        cand = diffs[0]
-        mapping['axes'][ax] = cand['idx']
-        print('Mapped axis', ax, '-> byte', cand['idx'])
-    except TimeoutError:
-        print('Timeout mapping axis', ax)
-
-# backup previous mapping
+
+def load_samples(labels=None, store_path=SAMPLES_STORE, json_path=SAMPLES_JSON):
+    """
+    Pares (label, before, after) recolectados: del almacén ``.ds4m`` si existe
+    (sólo las cadenas de ``labels``, sin leer el resto), si no del JSON.
+    """
+    if os.path.exists(store_path):
+        with SampleStore(store_path) as store:
+            yield from store.pairs(labels)
+        return
+    if not os.path.exists(json_path):
+        return
+    wanted = None if labels is None else set(labels)
+    for pair in read_json_samples(json_path):
+        if wanted is None or pair[0] in wanted:
+            yield pair
+
+
+def map_from_samples(labels=None, path='.ds4map.json', **paths):
+    """Infiere botones de las muestras guardadas y los funde en el mapeo de ``path``."""
+    buttons, confidence = infer_mappings_batched(load_samples(labels, **paths))
+    mapping = {'axes': {}, 'buttons': {}, 'dpad': {'byte': None, 'mask': None}}
+    if os.path.exists(path):
+        with open(path) as f:
+            mapping = json.load(f)
+    mapping.setdefault('buttons', {}).update(buttons)
+    return mapping, buttons, confidence
+
+
+def write_mapping(mapping, path='.ds4map.json'):
+    # backup previous mapping
     try:
-        if os.path.exists('.ds4map.json'):
-            os.rename('.ds4map.json', '.ds4map.json.bak.' + str(int(time.time())))
+        if os.path.exists(path):
+            os.rename(path, path + '.bak.' + str(int(time.time())))
     except Exception:
         pass
-    with open('.ds4map.json','w') as f:
+    with open(path,'w') as f:
         json.dump(mapping, f, indent=2)
-print('Wrote .ds4map.json — please review masks and bytes')
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description='Map DS4 report bytes interactively or from collected samples')
+    ap.add_argument('--from-samples', action='store_true',
+                    help=f'infer buttons from {SAMPLES_STORE} (or {SAMPLES_JSON}) instead of a live device')
+    ap.add_argument('--labels', nargs='+', help='with --from-samples: only these labels')
+    args = ap.parse_args(argv)
+    if args.from_samples:
+        mapping, buttons, confidence = map_from_samples(args.labels)
+        if not buttons:
+            print('No samples to infer from; collect some first')
+            return 1
+        for label, (idx, mask) in sorted(buttons.items()):
+            print('Mapped', label, '->', [idx, mask], f'(confidence {confidence[label]})')
+        write_mapping(mapping)
+        print('Wrote .ds4map.json — please review masks and bytes')
+        return 0
+
+    print('Starting Python auto-mapper')
+    try:
+        import hid
+    except Exception:
+        print('hid library not available — ensure hidapi is installed and run on a system with device')
+        return 1
+
+    target = find_controller(hid)
+    if not target:
+        print('No DualShock-like device found; exiting.')
+        return 1
+
+    h = hid.device(); h.open_path(target['path']); h.set_nonblocking(False)
+    try:
+        mapping = run_mapper(lambda: wait_diff(h, 8.0))
+    finally:
+        h.close()
+    write_mapping(mapping)
+    print('Wrote .ds4map.json — please review masks and bytes')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
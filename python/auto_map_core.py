@@ -0,0 +1,75 @@
+"""
+Lógica central de mapeo automático de controles (Python)
+
+Funciones puras: no abren dispositivos, no leen de la consola y no importan
+``hid`` ni NumPy, así que el daemon, las pruebas y el CLI (``auto_map.py``)
+pueden importarlas sin coste. Tiempo de importación:
+
+    python -m python.benchmarks.bench_import
+
+@module auto_map_core
+"""
+
+from typing import Iterable, Iterator, List, Optional
+
+from python.inference import infer_mappings_batched, score_candidates  # noqa: F401
+from python.sensors import detect_sensor_candidates  # noqa: F401
+
+BUTTONS = ['square','cross','circle','triangle','l1','r1','l2_btn','r2_btn','share','options','lstick','rstick','ps','dpad_up','dpad_right','dpad_down','dpad_left']
+AXES = ['lstick_x','lstick_y','rstick_x','rstick_y','l2','r2']
+DPAD_DIRECTIONS = ['dpad_up','dpad_right','dpad_down','dpad_left']
+
+
+def print_diff(prev, cur) -> List[dict]:
+    """Diferencias byte a byte: [{idx, before, after, xor}] (0 fuera de rango)."""
+    diffs = []
+    for i in range(max(len(prev), len(cur))):
+        a = prev[i] if i < len(prev) else 0
+        b = cur[i] if i < len(cur) else 0
+        if a != b:
+            diffs.append({'idx':i, 'before':a, 'after':b, 'xor': a ^ b})
+    return diffs
+
+
+def choose_candidate(diffs) -> Optional[dict]:
+    """Prefiere un cambio de un solo bit; si no hay, el de menos bits."""
+    single = next((d for d in diffs if d['xor'] and (d['xor'] & (d['xor'] - 1)) == 0), None)
+    if single:
+        return single
+    return min(diffs, key=lambda d: bin(d['xor']).count('1'), default=None)
+
+
+def stream_diffs(reports: Iterable, baseline=None) -> Iterator[List[dict]]:
+    """
+    Genera las diferencias de cada reporte que cambia respecto al anterior.
+
+    ``reports`` es cualquier iterable de reportes (lector HID, grabación,
+    lista en pruebas); el primero sólo fija la referencia salvo que se pase
+    ``baseline``.
+    """
+    prev = list(baseline) if baseline is not None else None
+    for r in reports:
+        cur = list(r)
+        if prev is not None:
+            diffs = print_diff(prev, cur)
+            if diffs:
+                yield diffs
+        prev = cur
+
+
+def infer_mappings_from_labeled_reports(labeled_pairs):
+    """
+    Mapeo {label: [byteIdx, mask]} desde pares (label, before, after).
+
+    Toma el primer candidato de un solo bit de cada etiqueta; para sesiones
+    grandes o con ruido de sensores usar ``infer_mappings_batched``.
+    """
+    per_label = {}
+    for label, before, after in labeled_pairs:
+        per_label.setdefault(label, []).extend(print_diff(before, after))
+    mapping = {}
+    for label, candidates in per_label.items():
+        best = choose_candidate(candidates)
+        if best:
+            mapping[label] = [best['idx'], best['xor']]
+    return mapping
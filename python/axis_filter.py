@@ -0,0 +1,159 @@
+"""
+Filtro de ejes: zona muerta, cuantización, histéresis y tasa máxima (Python)
+
+Se configura por eje en ``.ds4map.json`` (``"*"`` aplica a todos y cada eje
+puede sobrescribir campos sueltos)::
+
+    "axisFilters": {
+      "*":   {"deadzone": 0.06, "step": 0.01, "hysteresis": 0.02, "maxRate": 60},
+      "l2":  {"deadzone": 0.02}
+    }
+
+- deadzone: sticks con |v| < deadzone y gatillos con v < deadzone valen 0;
+  el resto del recorrido se reescala para empezar en 0 en el borde (sin
+  saltos que hagan oscilar la salida alrededor de la zona muerta)
+- step: cuantiza a múltiplos de ``step``
+- hysteresis: cambio mínimo respecto al último valor emitido; las vueltas
+  al reposo (0) y a los extremos (±1) se emiten siempre
+- maxRate: eventos por segundo como máximo por eje (0 = sin límite)
+- settleMs: si el eje deja de moverse con un valor no emitido (por la
+  histéresis o por maxRate), ese valor se emite tras ``settleMs`` (por
+  defecto 30 ms), así el último valor siempre llega
+
+Sin ``axisFilters`` el daemon conserva el comportamiento original (cambio
+> 0.05 respecto al reporte anterior).
+
+@module axis_filter
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+FIELDS = {'deadzone': 0.0, 'step': 0.0, 'hysteresis': 0.0, 'maxRate': 0.0, 'settleMs': 30.0}
+
+
+def _axis_config(name: str, filters: Dict[str, Any]) -> Dict[str, float]:
+    conf = dict(FIELDS)
+    for key in ('*', name):
+        entry = filters.get(key)
+        if entry is None:
+            continue
+        if not isinstance(entry, dict):
+            raise ValueError(f'axisFilters["{key}"] must be an object')
+        for field, value in entry.items():
+            if field not in FIELDS:
+                raise ValueError(f'axisFilters["{key}"]: unknown field {field!r}')
+            if isinstance(value, bool) or not isinstance(value, (int, float)) \
+                    or not math.isfinite(value) or value < 0:
+                raise ValueError(f'axisFilters["{key}"].{field} must be a non-negative number')
+            conf[field] = float(value)
+    if conf['deadzone'] >= 1:
+        raise ValueError(f'axisFilters: deadzone for {name} must be < 1')
+    return conf
+
+
+class AxisFilter:
+    """
+    Estado de emisión por eje.
+
+    ``update`` recibe los valores decodificados de un reporte y devuelve los
+    eventos a emitir ya; ``flush`` emite los valores retenidos que han
+    vencido. ``deadline`` indica cuándo hay que volver a llamar a ``flush``
+    aunque no lleguen reportes.
+    """
+
+    __slots__ = ('ids', '_centered', '_deadzone', '_step', '_hyst', '_interval', '_settle',
+                 '_last', '_last_t', '_pending', '_pending_t', 'npending')
+
+    def __init__(self, ids: Sequence[str], centered: Sequence[bool], configs: Sequence[Dict[str, float]]):
+        self.ids = tuple(ids)
+        self._centered = tuple(centered)
+        self._deadzone = tuple(c['deadzone'] for c in configs)
+        self._step = tuple(c['step'] for c in configs)
+        self._hyst = tuple(c['hysteresis'] for c in configs)
+        self._interval = tuple(1.0 / c['maxRate'] if c['maxRate'] else 0.0 for c in configs)
+        self._settle = tuple(c['settleMs'] / 1000 for c in configs)
+        n = len(self.ids)
+        self._last: List[Optional[float]] = [None] * n    # último valor emitido
+        self._last_t = [float('-inf')] * n
+        self._pending: List[Optional[float]] = [None] * n  # valor retenido sin emitir
+        self._pending_t = [0.0] * n                        # desde cuándo está retenido ese valor
+        self.npending = 0
+
+    def _shape(self, i: int, v: float) -> float:
+        dz = self._deadzone[i]
+        if dz:
+            a = abs(v) if self._centered[i] else v
+            if a < dz:
+                return 0.0
+            v = (a - dz) / (1 - dz) * (1 if v >= 0 else -1)
+        step = self._step[i]
+        if step:
+            v = round(round(v / step) * step, 4)
+        return v
+
+    def _emit(self, i: int, v: float, now: float, events: List[dict]):
+        events.append({'type': 'axis', 'id': self.ids[i], 'value': v})
+        self._last[i] = v
+        self._last_t[i] = now
+        if self._pending[i] is not None:
+            self._pending[i] = None
+            self.npending -= 1
+
+    def update(self, values: Sequence[Optional[float]], now: float) -> List[dict]:
+        events: List[dict] = []
+        last, pending = self._last, self._pending
+        for i, raw in enumerate(values):
+            if raw is None:
+                continue
+            v = self._shape(i, raw)
+            prev = last[i]
+            if v == prev:
+                if pending[i] is not None:  # volvió al valor emitido: nada que enviar
+                    pending[i] = None
+                    self.npending -= 1
+                continue
+            # STICK_SCALE lleva el crudo 0 a -1.01: el extremo es |v| >= 1
+            big = prev is None or v == 0.0 or abs(v) >= 1.0 or abs(v - prev) > self._hyst[i]
+            if big and now - self._last_t[i] >= self._interval[i]:
+                self._emit(i, v, now, events)
+            elif pending[i] != v:
+                if pending[i] is None:
+                    self.npending += 1
+                pending[i] = v
+                # un cambio grande sólo espera a maxRate; uno pequeño, a que el eje se asiente
+                self._pending_t[i] = float('-inf') if big else now
+        if self.npending:
+            events.extend(self.flush(now))
+        return events
+
+    def _due(self, i: int) -> float:
+        return max(self._last_t[i] + self._interval[i], self._pending_t[i] + self._settle[i])
+
+    def flush(self, now: float) -> List[dict]:
+        """Emite los valores retenidos cuyo plazo (tasa máxima y asentamiento) ya venció."""
+        events: List[dict] = []
+        if not self.npending:
+            return events
+        for i, v in enumerate(self._pending):
+            if v is not None and now >= self._due(i):
+                self._emit(i, v, now, events)
+        return events
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """Instante monotónico del próximo flush necesario (None si no hay nada retenido)."""
+        if not self.npending:
+            return None
+        return min(self._due(i) for i, v in enumerate(self._pending) if v is not None)
+
+
+def compile_axis_filter(mapping: Dict[str, Any], decoder) -> Optional[AxisFilter]:
+    """AxisFilter para los ejes del decoder, o None si el mapeo no define ``axisFilters``."""
+    filters = mapping.get('axisFilters')
+    if filters is None:
+        return None
+    if not isinstance(filters, dict):
+        raise ValueError('axisFilters must be an object')
+    ids = decoder.axis_ids
+    return AxisFilter(ids, decoder.axis_centered, [_axis_config(name, filters) for name in ids])
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: eventos de eje con y sin axisFilters
+
+Ejecutar desde la raíz del repo:
+
+    python -m python.benchmarks.bench_axis_filter [--seconds 10] [--rate 250]
+
+Simula (con reloj simulado) un control en reposo con sticks y gatillos
+ruidosos a ``--rate`` reportes/s, seguido de un movimiento rápido del
+stick, y compara el número de eventos de eje del umbral original con los
+de un filtro típico. También mide el retraso entre que el stick llega a su
+posición final y el momento en que el valor emitido queda a menos de la
+histéresis del valor final.
+"""
+
+import argparse
+import random
+
+from python.axis_filter import compile_axis_filter
+from python.daemon import DEFAULT_MAP
+from python.decoder import compile_mapping
+
+FILTERS = {'*': {'deadzone': 0.06, 'step': 0.01, 'hysteresis': 0.03, 'maxRate': 60}}
+
+
+def jittery_reports(seconds, rate, seed=1, noise=3):
+    """Reportes de un control en reposo: sticks 128 ± ruido, gatillos 0-3."""
+    rnd = random.Random(seed)
+    base = bytearray(64)
+    base[1:5] = bytes([128] * 4)
+    base[5] = 0x08
+    out = []
+    for _ in range(int(seconds * rate)):
+        r = bytearray(base)
+        for i in (1, 2, 3, 4):
+            r[i] = max(0, min(255, 128 + round(rnd.gauss(0, noise))))
+        for i in (8, 9):
+            r[i] = rnd.randrange(4)
+        out.append(bytes(r))
+    return out
+
+
+def flick(rate, target=230, ms=40, hold=0.2, seed=2):
+    """Stick izquierdo de reposo a ``target`` en ``ms`` y luego quieto (con ruido leve)."""
+    rnd = random.Random(seed)
+    steps = max(1, int(ms / 1000 * rate))
+    out = []
+    for k in range(steps + int(hold * rate)):
+        r = bytearray(64)
+        r[1:5] = bytes([128] * 4)
+        r[5] = 0x08
+        pos = 128 + (target - 128) * min(1.0, (k + 1) / steps)
+        r[1] = max(0, min(255, round(pos) + (rnd.randint(-1, 1) if k >= steps else 0)))
+        out.append(bytes(r))
+    return out, steps - 1  # índice del primer reporte en la posición final
+
+
+def run(reports, rate, mapping):
+    """Devuelve [(t, evento)] de ejes usando el reloj simulado."""
+    dec = compile_mapping(mapping)
+    filt = compile_axis_filter(mapping, dec)
+    prev, out = None, []
+    dt = 1.0 / rate
+    for k, r in enumerate(reports):
+        t = k * dt
+        state = dec.decode(r)
+        if filt is None:
+            events = dec.axis_events(prev, state) if prev is not None else []
+        else:
+            events = filt.update(state.axes, t)
+        out.extend((t, ev) for ev in events)
+        prev = state
+    if filt is not None:
+        t = len(reports) * dt
+        while filt.npending:  # timer del daemon: vaciar lo retenido
+            t = max(t, filt.deadline)
+            out.extend((t, ev) for ev in filt.flush(t))
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--seconds', type=float, default=10.0)
+    ap.add_argument('--rate', type=int, default=250)
+    ap.add_argument('--noise', type=float, default=3.0, help='desviación del ruido de los sticks (cuentas)')
+    args = ap.parse_args(argv)
+
+    idle = jittery_reports(args.seconds, args.rate, noise=args.noise)
+    filtered_map = dict(DEFAULT_MAP, axisFilters=FILTERS)
+    legacy = run(idle, args.rate, DEFAULT_MAP)
+    filtered = run(idle, args.rate, filtered_map)
+    print(f'idle {args.seconds:.0f} s @ {args.rate} Hz, noise ±{args.noise} counts')
+    print(f'  threshold 0.05 : {len(legacy):6d} axis events')
+    print(f'  axisFilters    : {len(filtered):6d} axis events'
+          f'  ({len(legacy) / max(1, len(filtered)):.0f}x fewer)')
+
+    reports, final_idx = flick(args.rate)
+    t_final = final_idx / args.rate
+    tolerance = FILTERS['*']['hysteresis']
+    for name, mapping in (('threshold 0.05', DEFAULT_MAP), ('axisFilters', filtered_map)):
+        dec = compile_mapping(mapping)
+        filt = compile_axis_filter(mapping, dec)
+        final = dec.decode(reports[final_idx]).axes[0]
+        if filt is not None:
+            final = filt._shape(0, final)
+        events = [(t, ev['value']) for t, ev in run(reports, args.rate, mapping) if ev['id'] == 'lstick_x']
+        reached = next((t for t, v in events if t >= t_final and abs(v - final) <= tolerance), None)
+        lag = f'{(reached - t_final) * 1000:.1f} ms' if reached is not None else 'never'
+        print(f'  flick {name:15s}: within {tolerance} of final {final:+.2f} after {lag}, '
+              f'{len(events)} lstick_x events')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: decodificador compilado vs. ruta original de _handle_report
+
+Ejecutar desde la raíz del repo:
+
+    python -m python.benchmarks.bench_decoder [--reports N] [--length 64]
+
+Imprime reportes/segundo de ambas rutas y verifica que emiten los mismos
+eventos para la misma secuencia de reportes.
+"""
+
+import argparse
+import random
+import time
+
+from python.daemon import DEFAULT_MAP
+from python.decoder import compile_mapping
+
+
+def legacy_handle_report(mapping, prev_state, report, emit):
+    """Copia congelada de la decodificación original (sin heurística BT)."""
+    b = list(report)
+    state = {'raw': b, 'axes': {}, 'buttons': {}, 'dpad': None}
+    for name, idx in (mapping.get('axes') or {}).items():
+        try:
+            v = b[idx]
+            if 'stick' in name:
+                state['axes'][name] = round((v - 128) / 127, 2)
+            else:
+                state['axes'][name] = round(v / 255, 2)
+        except Exception:
+            pass
+    try:
+        nib = b[mapping['dpad']['byte']] & mapping['dpad']['mask']
+        dirMap = {0: 'dpad_up', 1: 'dpad_up|dpad_right', 2: 'dpad_right', 3: 'dpad_down|dpad_right',
+                  4: 'dpad_down', 5: 'dpad_down|dpad_left', 6: 'dpad_left', 7: 'dpad_left|dpad_up'}
+        state['dpad'] = dirMap.get(nib)
+    except Exception:
+        pass
+    for name, (byteIdx, mask) in (mapping.get('buttons') or {}).items():
+        try:
+            state['buttons'][name] = bool(b[byteIdx] & mask)
+        except Exception:
+            state['buttons'][name] = False
+    if prev_state is None:
+        for k, v in state['buttons'].items():
+            if v: emit({'type': 'button', 'id': k, 'value': 1})
+        for k, v in state['axes'].items():
+            emit({'type': 'axis', 'id': k, 'value': v})
+        return state
+    for k, v in state['buttons'].items():
+        if v != prev_state['buttons'].get(k, False):
+            emit({'type': 'button', 'id': k, 'value': 1 if v else 0})
+    if state['dpad'] != prev_state.get('dpad'):
+        for idc in ['dpad_up', 'dpad_down', 'dpad_left', 'dpad_right']:
+            emit({'type': 'button', 'id': idc, 'value': 0})
+        if state['dpad']:
+            for idc in state['dpad'].split('|'):
+                emit({'type': 'button', 'id': idc, 'value': 1})
+    for k, v in state['axes'].items():
+        if abs(v - prev_state['axes'].get(k, 0)) > 0.05:
+            emit({'type': 'axis', 'id': k, 'value': v})
+    return state
+
+
+def make_reports(n, length, seed=1):
+    """Secuencia realista: sticks con ruido, botones y D-pad ocasionales."""
+    rnd = random.Random(seed)
+    cur = bytearray(length)
+    cur[1:5] = bytes([128, 128, 128, 128])
+    cur[5] = 0x08  # D-pad neutro
+    out = []
+    for _ in range(n):
+        for i in (1, 2, 3, 4):
+            cur[i] = max(0, min(255, cur[i] + rnd.randint(-3, 3)))
+        if rnd.random() < 0.05:
+            cur[5] ^= 1 << rnd.randrange(4, 8)
+        if rnd.random() < 0.02:
+            cur[5] = (cur[5] & 0xf0) | rnd.choice((0, 2, 4, 6, 8))
+        if rnd.random() < 0.05:
+            cur[6] ^= 1 << rnd.randrange(8)
+        cur[8] = rnd.randrange(256) if rnd.random() < 0.1 else cur[8]
+        out.append(bytes(cur))
+    return out
+
+
+def run_legacy(mapping, reports, sink):
+    prev = None
+    for r in reports:
+        prev = legacy_handle_report(mapping, prev, r, sink)
+
+
+def run_compiled(mapping, reports, sink):
+    dec = compile_mapping(mapping)
+    prev = None
+    for r in reports:
+        state = dec.decode(r)
+        if prev is None:
+            for ev in dec.initial_events(state): sink(ev)
+        else:
+            for ev in dec.diff(prev, state): sink(ev)
+        prev = state
+
+
+def _rate(fn, mapping, reports, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(mapping, reports, lambda ev: None)
+        best = min(best, time.perf_counter() - t0)
+    return len(reports) / best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--reports', type=int, default=50000)
+    ap.add_argument('--length', type=int, default=64)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+
+    reports = make_reports(args.reports, args.length)
+    a, b = [], []
+    run_legacy(DEFAULT_MAP, reports, a.append)
+    run_compiled(DEFAULT_MAP, reports, b.append)
+    if a != b:
+        raise SystemExit('compiled decoder output differs from legacy path')
+
+    legacy = _rate(run_legacy, DEFAULT_MAP, reports, args.repeat)
+    compiled = _rate(run_compiled, DEFAULT_MAP, reports, args.repeat)
+    print(f'reports: {len(reports)} x {args.length} bytes, events: {len(a)}')
+    print(f'legacy   : {legacy:12,.0f} reports/s')
+    print(f'compiled : {compiled:12,.0f} reports/s  ({compiled / legacy:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Benchmark: salida headless (datagramas Unix/UDP) vs servidor WebSocket
+
+Ejecutar desde la raíz del repo:
+
+    python -m python.benchmarks.bench_headless [--repeat 3] [--events 2000]
+
+- Arranque en frío: desde lanzar el proceso (SIMULATE=1) hasta recibir el
+  primer evento, con ``python -m python.headless`` escuchando en un socket
+  Unix y con ``python.server`` (uvicorn + FastAPI) y un cliente ``/ws``;
+  también la memoria residente (VmRSS) del proceso al recibirlo.
+- Latencia por evento: en un mismo proceso y event loop, tiempo desde
+  entregar un evento al sink hasta que el consumidor lo recibe: DatagramSink
+  por socket Unix y por UDP frente a ``server.broadcast`` hasta un cliente
+  WebSocket real (uvicorn en localhost, daemon sustituido por uno inactivo).
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+EVENT = {'type': 'axis', 'id': 'lstick_x', 'value': 0.5}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def _spawn(args):
+    env = dict(os.environ, SIMULATE='1', PYTHONPATH=ROOT)
+    return subprocess.Popen([sys.executable, *args], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _stop(proc):
+    proc.terminate()
+    try:
+        proc.wait(5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def cold_start_headless(tmp: str):
+    from python.headless import FrameReader
+    path = os.path.join(tmp, 'ds4.sock')
+    if os.path.exists(path):
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    sock.settimeout(30)
+    reader = FrameReader()
+    t0 = time.perf_counter()
+    proc = _spawn(['-m', 'python.headless', '--unix', path])
+    try:
+        while reader.read(sock.recv(65536))['kind'] != 'events':
+            pass
+        elapsed = time.perf_counter() - t0
+        return elapsed, _rss_mb(proc.pid)
+    finally:
+        _stop(proc)
+        sock.close()
+
+
+def cold_start_server():
+    import websockets
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = _spawn(['-c', f"import uvicorn; uvicorn.run('python.server:app', host='127.0.0.1', port={port}, "
+                         "log_level='warning')"])
+
+    async def first_event():
+        while True:
+            try:
+                async with websockets.connect(f'ws://127.0.0.1:{port}/ws') as ws:
+                    while True:
+                        if '"snapshot"' not in await ws.recv():
+                            return time.perf_counter() - t0
+            except OSError:
+                await asyncio.sleep(0.005)
+
+    try:
+        elapsed = asyncio.run(asyncio.wait_for(first_event(), 60))
+        return elapsed, _rss_mb(proc.pid)
+    finally:
+        _stop(proc)
+
+
+class _IdleDaemon:
+    """Sustituye al daemon del servidor: sólo difunden los eventos del benchmark."""
+
+    def __init__(self):
+        from python.daemon import DEFAULT_MAP
+        from python.decoder import compile_mapping
+        self.decoder = compile_mapping(DEFAULT_MAP)
+
+    async def start(self, emit):
+        await asyncio.Event().wait()
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+async def latency_datagram(kind: str, n: int, tmp: str):
+    from python.headless import DatagramSink
+    loop = asyncio.get_running_loop()
+    if kind == 'unix':
+        path = os.path.join(tmp, 'lat.sock')
+        if os.path.exists(path):
+            os.unlink(path)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(path)
+        target = f'unix:{path}'
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(('127.0.0.1', 0))
+        target = f'udp:127.0.0.1:{sock.getsockname()[1]}'
+    sock.setblocking(False)
+    sink = DatagramSink(target, 'events')
+    sink.add('lstick_x', 'axis')
+    sink.send_table()
+    await loop.sock_recv(sock, 65536)
+    out = []
+    try:
+        for i in range(n):
+            t = time.perf_counter_ns()
+            sink(dict(EVENT, value=(i % 100) / 100))
+            await loop.sock_recv(sock, 65536)
+            out.append(time.perf_counter_ns() - t)
+    finally:
+        sink.close()
+        sock.close()
+    return out
+
+
+async def latency_websocket(n: int):
+    import uvicorn
+    import websockets
+    from python import server
+    server.Daemon = _IdleDaemon
+    server.HID_MULTI = False
+    port = _free_port()
+    srv = uvicorn.Server(uvicorn.Config(server.app, host='127.0.0.1', port=port, log_level='warning'))
+    task = asyncio.create_task(srv.serve())
+    while not srv.started:
+        await asyncio.sleep(0.01)
+    out = []
+    try:
+        async with websockets.connect(f'ws://127.0.0.1:{port}/ws') as ws:
+            await ws.recv()  # instantánea
+            for i in range(n):
+                t = time.perf_counter_ns()
+                server.broadcast(dict(EVENT, value=(i % 100) / 100))
+                await ws.recv()
+                out.append(time.perf_counter_ns() - t)
+    finally:
+        srv.should_exit = True
+        await task
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--repeat', type=int, default=3, help='cold starts per mode')
+    ap.add_argument('--events', type=int, default=2000, help='events per latency measurement')
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, fn in (('headless (unix)', lambda: cold_start_headless(tmp)), ('server (/ws)', cold_start_server)):
+            runs = [fn() for _ in range(args.repeat)]
+            t = statistics.median(r[0] for r in runs)
+            rss = [r[1] for r in runs if r[1] is not None]
+            mem = f', RSS {statistics.median(rss):5.1f} MB' if rss else ''
+            print(f'cold start {name:16s}: {t * 1000:7.0f} ms to first event{mem}')
+
+        results = [('headless unix', asyncio.run(latency_datagram('unix', args.events, tmp))),
+                   ('headless udp', asyncio.run(latency_datagram('udp', args.events, tmp))),
+                   ('websocket', asyncio.run(latency_websocket(args.events)))]
+    for name, samples in results:
+        p50, p99 = _percentiles(samples)
+        print(f'latency {name:14s}: p50 {p50 / 1000:7.1f} us, p99 {p99 / 1000:7.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tiempo de importación de los módulos del backend
+
+Ejecutar desde la raíz del repo:
+
+    python -m python.benchmarks.bench_import [--repeat N] [module ...]
+
+Cada módulo se importa en un intérprete nuevo con ``-X importtime``; se
+informa la mediana del tiempo acumulado del módulo y si arrastró
+dependencias pesadas (hid, numpy, fastapi) o la espera de un dispositivo.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ['python.auto_map_core', 'python.auto_map', 'python.sensors', 'python.daemon']
+HEAVY = ('hid', 'numpy', 'fastapi')
+
+
+def import_time_us(module: str) -> int:
+    """Tiempo acumulado (µs) de importar ``module`` en un proceso nuevo."""
+    code = f'import {module}'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True, timeout=60, cwd=os.getcwd())
+    if proc.returncode != 0:
+        raise RuntimeError(f'import {module} failed: {proc.stderr.strip().splitlines()[-1]}')
+    for line in reversed(proc.stderr.splitlines()):
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1])
+    raise RuntimeError(f'no importtime entry for {module}')
+
+
+def heavy_imports(module: str):
+    code = f'import sys, {module}; print(",".join(m for m in {HEAVY!r} if m in sys.modules))'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60)
+    return [m for m in out.stdout.strip().split(',') if m]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('modules', nargs='*', default=MODULES)
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args(argv)
+
+    for module in args.modules:
+        times = [import_time_us(module) for _ in range(args.repeat)]
+        heavy = heavy_imports(module)
+        print(f'{module:24s} {statistics.median(times) / 1000:7.2f} ms'
+              f'  heavy: {", ".join(heavy) or "-"}')
+
+
+if __name__ == '__main__':
+    main()
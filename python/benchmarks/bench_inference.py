@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: inferencia de mapeos por lotes vs. primer candidato
+
+Ejecutar desde la raíz del repo:
+
+    python -m python.benchmarks.bench_inference [--pairs 10000]
+
+Genera pares (label, before, after) con ruido de sensores (bytes de IMU y un
+contador que cambian en cada reporte) y mide tiempo y aciertos de la versión
+original (copia congelada) y de ``inference.infer_mappings_batched``.
+"""
+
+import argparse
+import random
+import time
+
+from python.daemon import DEFAULT_MAP
+from python.inference import infer_mappings_batched
+
+
+def legacy_infer(labeled_pairs):
+    """Copia congelada de auto_map.infer_mappings_from_labeled_reports."""
+    per_label = {}
+    def print_diff(prev, cur):
+        diffs = []
+        for i in range(max(len(prev), len(cur))):
+            a = prev[i] if i < len(prev) else 0
+            b = cur[i] if i < len(cur) else 0
+            if a != b:
+                diffs.append({'idx':i,'before':a,'after':b,'xor':a^b})
+        return diffs
+    for label, before, after in labeled_pairs:
+        per_label.setdefault(label, []).append(print_diff(before, after))
+    mapping = {}
+    for label, attempts in per_label.items():
+        candidates = [d for diffs in attempts for d in diffs]
+        single = next((d for d in candidates if (d['xor'] & (d['xor'] - 1)) == 0), None)
+        if single:
+            mapping[label] = [single['idx'], single['xor']]
+        else:
+            candidates.sort(key=lambda x: bin(x['xor']).count('1'))
+            if candidates:
+                mapping[label] = [candidates[0]['idx'], candidates[0]['xor']]
+    return mapping
+
+
+def make_pairs(n, width=64, seed=3, noise=True):
+    """Pares etiquetados para los botones de DEFAULT_MAP (reportes como listas)."""
+    rnd = random.Random(seed)
+    buttons = list(DEFAULT_MAP['buttons'].items())
+    pairs = []
+    for k in range(n):
+        label, (idx, mask) = buttons[k % len(buttons)]
+        before = [0] * width
+        before[1:5] = [128, 128, 128, 128]
+        before[5] = 0x08
+        if noise:
+            before[7] = (k * 4) & 0xfc            # contador de reporte (bits altos del byte 7)
+            for i in range(13, 25):                # giroscopio/acelerómetro
+                before[i] = rnd.randrange(256)
+        after = list(before)
+        after[idx] |= mask
+        if noise:
+            after[7] = (before[7] + 4) & 0xfc | (after[7] & 0x03)
+            for i in range(13, 25):
+                after[i] = rnd.randrange(256)
+            if rnd.random() < 0.1:                 # el usuario tocó también el stick
+                after[1] = rnd.randrange(256)
+        pairs.append((label, before, after))
+    return pairs
+
+
+def accuracy(mapping):
+    expected = DEFAULT_MAP['buttons']
+    return sum(1 for k, v in expected.items() if mapping.get(k) == list(v)) / len(expected)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--pairs', type=int, default=10000)
+    args = ap.parse_args(argv)
+    pairs = make_pairs(args.pairs)
+
+    t0 = time.perf_counter()
+    legacy = legacy_infer(pairs)
+    t_legacy = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    batched, confidence = infer_mappings_batched(pairs)
+    t_batched = time.perf_counter() - t0
+
+    print(f'pairs: {len(pairs)}, labels: {len(DEFAULT_MAP["buttons"])}')
+    print(f'legacy  : {t_legacy * 1000:8.1f} ms  accuracy {accuracy(legacy):.0%}')
+    print(f'batched : {t_batched * 1000:8.1f} ms  accuracy {accuracy(batched):.0%}  '
+          f'min confidence {min(confidence.values()):.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: decodificación de IMU y flujo de movimiento submuestreado
+
+Ejecutar desde la raíz del repo:
+
+    python -m python.benchmarks.bench_motion [--reports 20000] [--rate 1000]
+
+Mide el coste por reporte de decodificar los 6 campos int16 del DS4 con el
+``struct`` compilado de ``motion.py`` frente a combinar los bytes en Python,
+y cuántos eventos llegan a ``broadcast`` por segundo a ``--rate``
+reportes/s: un evento por campo y reporte (como si fueran ejes) frente al
+flujo de 60 Hz promediado.
+"""
+
+import argparse
+import time
+
+from python.daemon import DEFAULT_MAP
+from python.loadgen import SyntheticController
+from python.motion import DS4_BATTERY, DS4_MOTION, compile_motion
+
+DS4_MAP = dict(DEFAULT_MAP, motion=DS4_MOTION, battery=DS4_BATTERY)
+
+
+def _per_byte(report, offsets):
+    out = []
+    for off in offsets:
+        v = report[off] | report[off + 1] << 8
+        out.append(v - 0x10000 if v & 0x8000 else v)
+    return out
+
+
+def _best(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t
+        best = dt if best is None or dt < best else best
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--reports', type=int, default=20000)
+    ap.add_argument('--rate', type=float, default=1000.0, help='simulated reports/s')
+    args = ap.parse_args(argv)
+
+    gen = SyntheticController(DS4_MAP, args.rate, seed=3)
+    reports = [gen.next_report() for _ in range(args.reports)]
+    offsets = list(DS4_MOTION.values())
+    dec = compile_motion(DS4_MAP)
+    n = len(reports)
+
+    t_struct = _best(lambda: [dec.decode(r) for r in reports])
+    t_bytes = _best(lambda: [_per_byte(r, offsets) for r in reports])
+    print(f'decode struct: {t_struct / n * 1e9:7.0f} ns/report')
+    print(f'decode bytes:  {t_bytes / n * 1e9:7.0f} ns/report ({t_bytes / t_struct:.1f}x)')
+
+    for rate_hz in (0, 60):
+        m = compile_motion(dict(DS4_MAP, motionStream={'rateHz': rate_hz, 'reportHz': args.rate}))
+        events = 0
+        t = time.perf_counter()
+        for r in reports:
+            events += len(m.update(r))
+        per_report = (time.perf_counter() - t) / n
+        seconds = n / args.rate
+        label = 'every report' if not rate_hz else f'{rate_hz} Hz average'
+        print(f'stream {label:>14}: {events / seconds:8.0f} events/s to broadcast, '
+              f'{per_report * 1e9:5.0f} ns/report (vs {len(offsets) * args.rate:.0f} with one event per field)')
+
+
+if __name__ == '__main__':
+    main()
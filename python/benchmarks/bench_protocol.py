@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: protocolo JSON vs. binario para eventos de entrada
+
+Ejecutar desde la raíz del repo:
+
+    python -m python.benchmarks.bench_protocol [--reports N] [--rate HZ]
+
+Genera eventos reales pasando reportes sintéticos por el decodificador y
+compara, por evento, el coste de codificación y los bytes en el cable de:
+JSON un evento por frame, JSON array por reporte (?batch=1) y registros
+binarios por reporte (?format=binary, con y sin marca de tiempo).
+"""
+
+import argparse
+import json
+import time
+
+from python.binproto import BinaryCodec
+from python.benchmarks.bench_decoder import make_reports
+from python.daemon import DEFAULT_MAP
+from python.decoder import compile_mapping
+
+
+def report_batches(n):
+    """Lista de lotes de eventos, uno por reporte con cambios."""
+    dec = compile_mapping(DEFAULT_MAP)
+    batches, prev = [], None
+    for r in make_reports(n, 64):
+        state = dec.decode(r)
+        events = dec.initial_events(state) if prev is None else dec.diff(prev, state)
+        if events:
+            batches.append(events)
+        prev = state
+    return batches
+
+
+def _measure(fn, batches, repeat):
+    best, size = float('inf'), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = fn(batches)
+        best = min(best, time.perf_counter() - t0)
+    return best, size
+
+
+def json_per_event(batches):
+    return sum(len(json.dumps(ev)) for events in batches for ev in events)
+
+
+def json_batched(batches):
+    return sum(len(json.dumps(events)) for events in batches)
+
+
+def binary(batches, ts=None):
+    codec = BinaryCodec(compile_mapping(DEFAULT_MAP).control_ids)
+    return sum(len(codec.encode(events, ts)) for events in batches)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--reports', type=int, default=50000)
+    ap.add_argument('--rate', type=int, default=250, help='reportes/s del control (para bytes/s)')
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+
+    batches = report_batches(args.reports)
+    n_events = sum(len(b) for b in batches)
+    seconds = args.reports / args.rate
+    print(f'reports: {args.reports}, events: {n_events}, frames (batched): {len(batches)}')
+    print(f'{"path":<22}{"encode us/event":>16}{"bytes/event":>13}{"bytes/s @" + str(args.rate) + "Hz":>16}')
+    for name, fn in (('json per event', json_per_event), ('json batch', json_batched),
+                     ('binary', binary), ('binary + ts', lambda b: binary(b, 123456))):
+        t, size = _measure(fn, batches, args.repeat)
+        print(f'{name:<22}{t / n_events * 1e6:>16.3f}{size / n_events:>13.1f}{size / seconds:>16,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: almacén binario de muestras vs ``.ds4map.samples.json``
+
+Ejecutar desde la raíz del repo:
+
+    python -m python.benchmarks.bench_sample_store [--sizes 10000 100000 1000000]
+
+Para cada tamaño llena un almacén con muestras de 23 etiquetas y mide el
+tiempo de añadir una muestra más y el de leer las 100 muestras de una
+etiqueta fija (``probe``), que deben mantenerse constantes al crecer el
+almacén. Para comparar, mide también añadir una muestra a un archivo JSON
+del mismo tamaño leyéndolo y reescribiéndolo entero (como hacen los
+recolectores de ``server/``), hasta ``--json-max`` muestras.
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from python.auto_map_core import AXES, BUTTONS
+from python.sample_store import SampleStore
+
+LABELS = BUTTONS + AXES
+
+
+def _sample(rng, label):
+    before = bytes(rng.randrange(256) for _ in range(8)) + bytes(56)
+    after = bytearray(before)
+    after[5] ^= 1 << rng.randrange(8)
+    return label, before, bytes(after)
+
+
+def run(size, tmp, rng, json_max):
+    path = os.path.join(tmp, f'bench_{size}.ds4m')
+    pool = [_sample(rng, LABELS[i % len(LABELS)]) for i in range(1000)]
+    with SampleStore(path, width=64) as store:
+        for i in range(size - 100):
+            store.append(*pool[i % len(pool)])
+        for _ in range(100):
+            store.append('probe', *pool[0][1:])
+        t = time.perf_counter()
+        for i in range(1000):
+            store.append(*pool[i])
+        append_us = (time.perf_counter() - t) / 1000 * 1e6
+        t = time.perf_counter()
+        n = sum(1 for _ in store.pairs(['probe']))
+        query_ms = (time.perf_counter() - t) * 1e3
+        assert n == 100
+    mb = os.path.getsize(path) / 1e6
+    os.unlink(path)
+    line = f'{size:>9} samples ({mb:7.1f} MB): append {append_us:6.2f} us, query 100 probe {query_ms:6.3f} ms'
+    if size <= json_max:
+        jpath = os.path.join(tmp, 'samples.json')
+        samples = [{'label': lbl, 'before': list(b), 'after': list(a)}
+                   for lbl, b, a in (pool[i % len(pool)] for i in range(size))]
+        with open(jpath, 'w') as f:
+            json.dump(samples, f)
+        t = time.perf_counter()
+        with open(jpath) as f:
+            existing = json.load(f)
+        existing.append(samples[0])
+        with open(jpath, 'w') as f:
+            json.dump(existing, f)
+        line += f' | JSON append {(time.perf_counter() - t) * 1e3:8.1f} ms'
+        os.unlink(jpath)
+    print(line)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    ap.add_argument('--json-max', type=int, default=100_000)
+    ap.add_argument('--seed', type=int, default=1)
+    args = ap.parse_args(argv)
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            run(size, tmp, rng, args.json_max)
+
+
+if __name__ == '__main__':
+    main()
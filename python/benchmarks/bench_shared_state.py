@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fan-out a WebSocket en 1 proceso vs N workers con memoria compartida
+
+Ejecutar desde la raíz del repo:
+
+    python -m python.benchmarks.bench_shared_state [--clients 1000] [--events 2000] [--workers 1 2 4]
+
+Publica ``--events`` eventos reales en un segmento de ``shared_state`` y
+mide cuánto tardan ``--workers`` procesos (cada uno con
+``clients / workers`` clientes WebSocket falsos y su ``server.broadcast``)
+en leerlos del anillo y enviarlos a todos sus clientes. Con 1 worker es
+equivalente al servidor de un solo proceso; el tiempo total es el del
+worker más lento. También mide el coste de ``publish`` en el daemon.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+
+from python.benchmarks.suite import FakeWS, report_events
+from python.shared_state import SharedStatePublisher, SharedStateReader
+
+
+async def _serve(name, n_clients, n_events):
+    from python import server
+    from python.ws_channel import ClientChannel
+    reader = SharedStateReader(name)
+    reader.next = 0
+    channels = [ClientChannel(FakeWS(), maxsize=1 << 20, max_lag=60) for _ in range(n_clients)]
+    server.clients.update(channels)
+    tasks = [asyncio.create_task(ch.run()) for ch in channels]
+    t0 = time.perf_counter()
+    seen = 0
+    while seen < n_events:
+        for ev in reader.poll():
+            server.broadcast(ev)
+            seen += 1
+        await asyncio.sleep(0)
+    while any(len(ch) for ch in channels):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - t0
+    for ch in channels:
+        ch.close()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    reader.close()
+    return elapsed
+
+
+def _worker(name, n_clients, n_events, start, results):
+    start.wait()
+    results.put(asyncio.run(_serve(name, n_clients, n_events)))
+
+
+def fanout(events, n_clients, workers):
+    """Segundos hasta que ``workers`` procesos envían ``events`` a ``n_clients`` clientes en total."""
+    pub = SharedStatePublisher(slots=max(1024, len(events) * 2))
+    try:
+        for ev in events:
+            pub.publish(ev)
+        start = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        share = [n_clients // workers + (i < n_clients % workers) for i in range(workers)]
+        procs = [multiprocessing.Process(target=_worker, args=(pub.name, share[i], len(events), start, results))
+                 for i in range(workers)]
+        for p in procs:
+            p.start()
+        time.sleep(0.5)  # que todos estén listos antes de medir
+        start.set()
+        elapsed = max(results.get(timeout=300) for _ in procs)
+        for p in procs:
+            p.join()
+        return elapsed
+    finally:
+        pub.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--clients', type=int, default=1000)
+    ap.add_argument('--events', type=int, default=2000)
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = ap.parse_args(argv)
+
+    events = [ev for batch in report_events(args.events) for ev in batch][:args.events]
+    pub = SharedStatePublisher(slots=4096)
+    try:
+        t = time.perf_counter()
+        for ev in events:
+            pub.publish(ev)
+        per_event = (time.perf_counter() - t) / len(events)
+    finally:
+        pub.close()
+    print(f'publish: {per_event * 1e6:.2f} us/event ({os.cpu_count()} CPUs)')
+
+    base = None
+    for w in args.workers:
+        elapsed = fanout(events, args.clients, w)
+        base = base or elapsed
+        sends = len(events) * args.clients
+        print(f'{w} worker(s), {args.clients} clients: {elapsed:.2f} s, '
+              f'{sends / elapsed / 1e6:.2f} M sends/s, {base / elapsed:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks del daemon y el servidor Python con línea base
+
+Ejecutar desde la raíz del repo (no necesita hardware ni red):
+
+    python -m python.benchmarks.suite [--quick] [--json out.json] [--only handle_report]
+    python -m python.benchmarks.suite --update-baseline
+
+Mide:
+- Daemon.handle_report en reportes/s con reportes USB (64 bytes) y
+  Bluetooth cortos (10 bytes)
+- detect_sensor_candidates e inferencia de mapeos al crecer la entrada
+- broadcast a 1, 10, 100 y 1000 clientes WebSocket falsos en proceso,
+  incluidas sus tareas escritoras
+- coste por evento del EventDispatcher (sinks.py) con 1 y 3 sinks en línea
+  y con un sink ``async def``, como múltiplo de llamar al sink directamente
+  (``dispatch.direct``, en ns/evento, no ejecuta código del repo: es sólo
+  informativo y no se compara con la línea base)
+
+Los resultados se escriben en JSON ({nombre: {value, unit, better}}) y se
+comparan con ``baseline.json``: si alguna métrica es más de
+``1 + --tolerance`` veces peor (por defecto 1.5x, holgado porque cada
+medida es el mejor de ``--repeat`` pero las máquinas compartidas tienen
+bastante ruido) se lista como REGRESSION y el proceso termina con código 1;
+las métricas con ``better: info`` sólo se informan.
+``baseline.json`` se grabó con ``--quick`` y depende de la máquina;
+regenerarla con ``--quick --update-baseline`` al cambiar de equipo de CI.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from python.benchmarks.bench_decoder import make_reports
+from python.benchmarks.bench_inference import make_pairs
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+FANOUT_CLIENTS = (1, 10, 100, 1000)
+
+
+def _best(fn: Callable[[], object], repeat: int) -> float:
+    """Mejor tiempo (s) de ``repeat`` ejecuciones."""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _result(value: float, unit: str, better: str) -> dict:
+    return {'value': round(value, 3), 'unit': unit, 'better': better}
+
+
+def bench_handle_report(quick: bool, repeat: int) -> Dict[str, dict]:
+    from python.daemon import DEFAULT_MAP, Daemon
+    n = 5000 if quick else 50000
+    out = {}
+    for name, length in (('usb', 64), ('bt', 10)):
+        reports = make_reports(n, length, seed=5)
+
+        def run():
+            d = Daemon(DEFAULT_MAP)
+            emit = lambda ev: None
+            for r in reports:
+                d.handle_report(r, emit)
+
+        out[f'handle_report.{name}'] = _result(n / _best(run, repeat), 'reports/s', 'higher')
+    return out
+
+
+def bench_sensors(quick: bool, repeat: int) -> Dict[str, dict]:
+    from python.sensors import detect_sensor_candidates
+    out = {}
+    for n in ((8, 256) if quick else (8, 256, 2048)):
+        reports = [list(r) for r in make_reports(n, 64, seed=9)]
+        t = _best(lambda: detect_sensor_candidates(reports), repeat)
+        out[f'detect_sensor_candidates.{n}'] = _result(t * 1000, 'ms', 'lower')
+    return out
+
+
+def bench_inference(quick: bool, repeat: int) -> Dict[str, dict]:
+    from python.auto_map_core import infer_mappings_batched, infer_mappings_from_labeled_reports
+    out = {}
+    for n in ((1000,) if quick else (1000, 10000)):
+        pairs = make_pairs(n)
+        t = _best(lambda: infer_mappings_from_labeled_reports(pairs), repeat)
+        out[f'infer_mappings.{n}'] = _result(t * 1000, 'ms', 'lower')
+        t = _best(lambda: infer_mappings_batched(pairs), repeat)
+        out[f'infer_mappings_batched.{n}'] = _result(t * 1000, 'ms', 'lower')
+    return out
+
+
+class FakeWS:
+    """WebSocket en memoria: cuenta frames sin red."""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def send_text(self, data):
+        self.frames += 1
+
+    async def send_bytes(self, data):
+        self.frames += 1
+
+    async def close(self, code=1000):
+        pass
+
+
+def report_events(n: int) -> List[List[dict]]:
+    """Eventos reales (por reporte) de ``n`` reportes sintéticos."""
+    from python.daemon import DEFAULT_MAP
+    from python.decoder import compile_mapping
+    dec = compile_mapping(DEFAULT_MAP)
+    batches, prev = [], None
+    for r in make_reports(n, 64, seed=11):
+        state = dec.decode(r)
+        if prev is not None:
+            events = dec.diff(prev, state)
+            if events:
+                batches.append(events)
+        prev = state
+    return batches
+
+
+async def _fanout(server, n_clients: int, batches: List[List[dict]]) -> float:
+    """Segundos para difundir ``batches`` y que todos los clientes los envíen."""
+    from python.ws_channel import ClientChannel
+    channels = [ClientChannel(FakeWS()) for _ in range(n_clients)]
+    server.clients.update(channels)
+    tasks = [asyncio.create_task(ch.run()) for ch in channels]
+    try:
+        t0 = time.perf_counter()
+        for events in batches:
+            for ev in events:
+                server.broadcast(ev)
+            await asyncio.sleep(0)  # un reporte por vuelta del loop, como el daemon
+        while any(len(ch) for ch in channels):
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - t0
+    finally:
+        for ch in channels:
+            ch.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        server.clients.difference_update(channels)
+    if any(ch.close_reason not in (None, 'closed') for ch in channels):
+        raise RuntimeError('fake client disconnected during fan-out benchmark')
+    return elapsed
+
+
+def bench_broadcast(quick: bool, repeat: int) -> Dict[str, dict]:
+    try:
+        from python import server
+    except ImportError as e:  # FastAPI no instalado
+        print(f'skipping broadcast benchmarks: {e}', file=sys.stderr)
+        return {}
+    out = {}
+    for n_clients in FANOUT_CLIENTS:
+        # ~constante el nº total de envíos para que cada caso tarde parecido
+        n_reports = max(20, (2000 if quick else 20000) // n_clients)
+        batches = report_events(n_reports)
+        n_events = sum(len(b) for b in batches)
+        best = min(asyncio.run(_fanout(server, n_clients, batches)) for _ in range(repeat))
+        out[f'broadcast.{n_clients}'] = _result(best / n_events * 1e6, 'us/event', 'lower')
+    return out
+
+
+def bench_dispatch(quick: bool, repeat: int) -> Dict[str, dict]:
+    from python.sinks import EventDispatcher
+    n = 20000 if quick else 200000
+    events = [ev for batch in report_events(200) for ev in batch]
+    events = (events * (n // len(events) + 1))[:n]
+    count = [0]
+
+    def sink(ev):
+        count[0] += 1
+
+    async def async_sink(ev):
+        count[0] += 1
+
+    def run_sync(emit):
+        for ev in events:
+            emit(ev)
+
+    async def run_async(dispatcher):
+        emit = dispatcher.emit
+        for i, ev in enumerate(events):
+            emit(ev)
+            if i % 64 == 63:
+                await asyncio.sleep(0)  # como el daemon: el loop gira entre reportes
+        await dispatcher.flush()
+
+    # los tiempos absolutos (decenas de ns) son ruido de la máquina: se
+    # compara la proporción frente a la llamada directa medida en la misma ejecución
+    direct = _best(lambda: run_sync(sink), repeat)
+    out = {}
+    for name, sinks in (('inline1', [sink]), ('inline3', [sink, sink, sink])):
+        out[f'dispatch.{name}'] = _best(lambda: run_sync(EventDispatcher(sinks).emit), repeat)
+    out['dispatch.async1'] = _best(lambda: asyncio.run(run_async(EventDispatcher([async_sink]))), repeat)
+    results = {'dispatch.direct': _result(direct / n * 1e9, 'ns/event', 'info')}
+    results.update((k, _result(t / direct, 'x direct', 'lower')) for k, t in out.items())
+    return results
+
+
+BENCHMARKS = {
+    'handle_report': bench_handle_report,
+    'sensors': bench_sensors,
+    'inference': bench_inference,
+    'broadcast': bench_broadcast,
+    'dispatch': bench_dispatch,
+}
+
+
+def run(only: Optional[List[str]] = None, quick: bool = False, repeat: int = 5) -> Dict[str, dict]:
+    results: Dict[str, dict] = {}
+    for name, fn in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        results.update(fn(quick, repeat))
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """Métricas más de ``1 + tolerance`` veces peores que la línea base."""
+    regressions = []
+    for name, res in sorted(results.items()):
+        base = baseline.get(name)
+        if not base or not base.get('value') or res['better'] == 'info':
+            continue
+        ratio = res['value'] / base['value']
+        slowdown = 1 / ratio if res['better'] == 'higher' else ratio
+        if slowdown > 1 + tolerance:
+            regressions.append(f"{name}: {res['value']} {res['unit']} vs baseline "
+                               f"{base['value']} ({slowdown:.2f}x worse)")
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    ap.add_argument('--only', action='append', choices=sorted(BENCHMARKS))
+    ap.add_argument('--quick', action='store_true', help='entradas más pequeñas (CI)')
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--json', metavar='PATH', help="escribir resultados ('-' = stdout)")
+    ap.add_argument('--baseline', default=BASELINE_PATH)
+    ap.add_argument('--tolerance', type=float, default=0.5)
+    ap.add_argument('--update-baseline', action='store_true')
+    args = ap.parse_args(argv)
+
+    results = run(args.only, args.quick, args.repeat)
+    doc = {'python': platform.python_version(), 'machine': platform.machine(),
+           'quick': args.quick, 'results': results}
+    if args.json:
+        text = json.dumps(doc, indent=2)
+        if args.json == '-':
+            print(text)
+        else:
+            with open(args.json, 'w') as f:
+                f.write(text + '\n')
+    if args.json != '-':
+        for name, res in sorted(results.items()):
+            print(f"{name:34s} {res['value']:14,.3f} {res['unit']}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(doc, f, indent=2)
+            f.write('\n')
+        print(f'baseline written to {args.baseline}', file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}; run with --update-baseline', file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('quick') != args.quick:
+        print('warning: baseline was recorded with a different --quick setting', file=sys.stderr)
+    regressions = compare(results, baseline.get('results', {}), args.tolerance)
+    if regressions:
+        print(f'\n{len(regressions)} benchmark regression(s) against {args.baseline}:', file=sys.stderr)
+        for line in regressions:
+            print('  REGRESSION', line, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,104 @@
+"""
+Protocolo binario compacto para eventos de entrada (Python)
+
+Negociado por conexión con ``/ws?format=binary`` (``&ts=1`` añade marca de
+tiempo). Al conectar se envía una vez, como frame de texto JSON, la tabla de
+controles::
+
+    {"type": "controls", "ids": ["lstick_x", ...], "scale": 10000, "ts": false}
+
+Después cada frame binario contiene uno o más registros little-endian:
+
+    índice (uint16) | tipo (uint8: 0=botón, 1=eje) | valor (int16) [| ts_ms (uint32)]
+
+El valor de eje se cuantiza como round(value * scale); el de botón es 0/1.
+Si aparece un id nuevo se reenvía la tabla completa antes del frame que lo usa.
+Los eventos etiquetados con ``device`` (HID_MULTI=1) usan el id ``device/id``.
+
+@module binproto
+"""
+
+import json
+import struct
+import time
+from typing import Iterable, List, Optional
+
+TYPE_BUTTON = 0
+TYPE_AXIS = 1
+TYPE_CODES = {'button': TYPE_BUTTON, 'axis': TYPE_AXIS}
+
+# Escala de cuantización de ejes: valores con hasta 4 decimales son exactos
+AXIS_SCALE = 10000
+
+RECORD = struct.Struct('<HBh')
+RECORD_TS = struct.Struct('<HBhI')
+
+_EPOCH = time.monotonic()
+
+
+def timestamp_ms() -> int:
+    """Milisegundos monotónicos desde el arranque del proceso (uint32)."""
+    return int((time.monotonic() - _EPOCH) * 1000) & 0xffffffff
+
+
+class BinaryCodec:
+    """Tabla de ids de control + codificación de eventos en registros binarios."""
+
+    def __init__(self, ids: Iterable[str] = ()):
+        self.ids: List[str] = []
+        self.index = {}
+        for cid in ids:
+            self.add(cid)
+
+    def add(self, cid: str) -> int:
+        idx = self.index.get(cid)
+        if idx is None:
+            idx = self.index[cid] = len(self.ids)
+            self.ids.append(cid)
+        return idx
+
+    def table(self, ts: bool = False) -> str:
+        """Frame de texto con la tabla de controles."""
+        return json.dumps({'type': 'controls', 'ids': self.ids, 'scale': AXIS_SCALE, 'ts': ts})
+
+    def encode(self, msgs: Iterable[dict], ts_ms: Optional[int] = None) -> bytes:
+        """
+        Empaqueta eventos button/axis en un frame binario.
+
+        Los mensajes de otro tipo se ignoran (se envían como JSON aparte).
+        """
+        out = bytearray()
+        index, add = self.index, self.add
+        for msg in msgs:
+            code = TYPE_CODES.get(msg.get('type'))
+            if code is None:
+                continue
+            cid = msg.get('id')
+            dev = msg.get('device')
+            if dev is not None:
+                cid = f'{dev}/{cid}'
+            idx = index.get(cid)
+            if idx is None:
+                idx = add(cid)
+            if code == TYPE_AXIS:
+                value = max(-32768, min(32767, round(msg.get('value', 0) * AXIS_SCALE)))
+            else:
+                value = 1 if msg.get('value') else 0
+            if ts_ms is None:
+                out += RECORD.pack(idx, code, value)
+            else:
+                out += RECORD_TS.pack(idx, code, value, ts_ms)
+        return bytes(out)
+
+    def decode(self, frame: bytes, ts: bool = False) -> List[dict]:
+        """Inverso de encode (para pruebas y clientes Python)."""
+        rec = RECORD_TS if ts else RECORD
+        events = []
+        for fields in rec.iter_unpack(frame):
+            idx, code, value = fields[:3]
+            ev = {'type': 'axis' if code == TYPE_AXIS else 'button', 'id': self.ids[idx],
+                  'value': value / AXIS_SCALE if code == TYPE_AXIS else value}
+            if ts:
+                ev['ts'] = fields[3]
+            events.append(ev)
+        return events
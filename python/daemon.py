@@ -5,8 +5,15 @@ Parser de reportes HID de DualShock 4 con soporte para mapeo interactivo.
 Implementación Python/asyncio equivalente al daemon Node.js.
 
 Modos de operación:
-- SIMULATE=1: Genera eventos simulados sin hardware físico
+- SIMULATE=1: reportes sintéticos de controles virtuales por el camino real
+  (SIM_RATE, SIM_CONTROLLERS, SIM_LENGTH; ver loadgen.py)
 - MAP=1: Muestra diferencias de bytes para mapeo manual
+- MAP_WATCH=1: recarga .ds4map.json en caliente al cambiar (inotify o sondeo)
+- HID_IO=poll|thread: lectura no bloqueante cada 1 ms (por defecto) o hilo
+  lector dedicado con cola acotada (HID_QUEUE, HID_OVERFLOW)
+- HID_RECORD=archivo: graba los reportes crudos (ver recording.py)
+- HID_REPLAY=archivo: reproduce una grabación en lugar del dispositivo
+  (HID_REPLAY_SPEED: 1 tiempo real, 0 lo más rápido posible)
 
 @module daemon
 """
@@ -14,13 +21,40 @@ Modos de operación:
 import os
 import asyncio
 import json
-import random
 import time
-from typing import Callable, Dict, List, Optional, Any
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Any
+
+from python.axis_filter import compile_axis_filter
+from python.decoder import compile_mapping
+from python.hid_reader import HIDReaderThread, LatencyStats, ReportQueue
+from python.metrics import tracer
+from python.motion import compile_motion
+from python.ring import ReportRing
+from python.sensors import SensorStats
+from python.sinks import EventDispatcher, print_sink
+
+if TYPE_CHECKING:  # grabación y recarga del mapeo se importan al usarse (arranque en frío, ver headless.py)
+    from python.map_watch import MapWatcher
+    from python.recording import ReportRecorder
 
 # Variables de entorno para controlar el comportamiento del daemon
 SIMULATE = os.getenv('SIMULATE', '1') in ('1', 'true', 'True')
 MAP_MODE = os.getenv('MAP', '0') in ('1', 'true', 'True')
+# Modo de E/S HID: 'poll' (sondeo asyncio) o 'thread' (hilo lector + cola acotada)
+IO_MODE = os.getenv('HID_IO', 'poll')
+QUEUE_SIZE = int(os.getenv('HID_QUEUE', '256'))
+OVERFLOW_POLICY = os.getenv('HID_OVERFLOW', 'drop_oldest')
+# Recarga en caliente del mapeo (MAP_WATCH_INTERVAL sólo aplica al sondeo)
+MAP_WATCH = os.getenv('MAP_WATCH', '0') in ('1', 'true', 'True')
+MAP_WATCH_INTERVAL = float(os.getenv('MAP_WATCH_INTERVAL', '1.0'))
+# Historial de reportes crudos: profundidad del buffer circular y cuántos
+# de ellos se exportan en get_status (y se usan para detectar sensores)
+RECENT_DEPTH = int(os.getenv('RECENT_DEPTH', '2048'))
+STATUS_RECENT = int(os.getenv('STATUS_RECENT', '8'))
+# Grabación / reproducción de reportes crudos
+RECORD_PATH = os.getenv('HID_RECORD')
+REPLAY_PATH = os.getenv('HID_REPLAY')
+REPLAY_SPEED = float(os.getenv('HID_REPLAY_SPEED', '1'))
 
 # Mapeo por defecto para DualShock 4 (USB estándar)
 # Estructura idéntica a la versión Node.js para compatibilidad
@@ -43,9 +77,30 @@ DEFAULT_MAP = {
     },
     # D-pad: nibble bajo codifica dirección 0-7
     'dpad': {'byte': 5, 'mask': 0x0f}
+    # motion/battery son opcionales: ver DS4_MOTION y DS4_BATTERY en motion.py
 }
 
 
+def write_mapping_file(mapping_obj: Dict[str, Any], path: str = '.ds4map.json'):
+    """
+    Valida el mapeo y lo escribe en ``path`` (con backup del anterior).
+
+    Devuelve el decoder compilado; si el mapeo no es válido lanza la
+    excepción antes de tocar el disco.
+    """
+    decoder = compile_mapping(mapping_obj)
+    compile_axis_filter(mapping_obj, decoder)
+    compile_motion(mapping_obj)
+    try:
+        if os.path.exists(path):
+            os.rename(path, f'{path}.bak.{int(time.time())}')
+    except Exception:
+        pass
+    with open(path, 'w') as f:
+        json.dump(mapping_obj, f, indent=2)
+    return decoder
+
+
 class Daemon:
     """
     Clase Daemon - Controlador principal del monitor de entrada (Python)
@@ -54,17 +109,44 @@ class Daemon:
     y emite eventos normalizados de entrada mediante callbacks.
     """
     
-    def __init__(self):
+    def __init__(self, mapping: Optional[Dict[str, Any]] = None):
         """
         Constructor del Daemon
         
         Inicializa el estado pero NO inicia la conexión automáticamente.
         Llamar a start() explícitamente desde el servidor.
+
+        Args:
+            mapping: Mapeo ya cargado; si se omite se lee .ds4map.json
         """
-        self.mapping = self._load_map()
+        self.mapping = mapping if mapping is not None else self._load_map()
+        self._decoder = compile_mapping(self.mapping)  # Mapeo compilado para el hot path
+        try:
+            self._axis_filter = compile_axis_filter(self.mapping, self._decoder)  # None = umbral original
+        except ValueError as e:
+            print(f'axisFilters inválido en el mapeo, se ignora: {e}')
+            self._axis_filter = None
+        try:
+            self._motion = compile_motion(self.mapping)  # IMU y batería; None si el mapeo no los declara
+        except ValueError as e:
+            print(f'motion/battery inválido en el mapeo, se ignora: {e}')
+            self._motion = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_at = 0.0
         self.prev_state = None
         self._device = None
-        self._recent: List[List[int]] = []  # Reportes recientes para heurística
+        self._recent = ReportRing(RECENT_DEPTH)  # Historial de reportes crudos (sin asignaciones por reporte)
+        self._sensors = SensorStats(self._recent.width, STATUS_RECENT)  # Candidatos a sensores en O(ancho)
+        self._queue: Optional[ReportQueue] = None  # Sólo en modo 'thread'
+        self._latency = LatencyStats()
+        self._io_mode = None
+        self._load = None  # LoadGenerator en modo SIMULATE
+        self._watcher: Optional['MapWatcher'] = None
+        self._recorder: Optional['ReportRecorder'] = None
+        self.on_report: Optional[Callable[[bytes], None]] = None  # p. ej. shared_state.publish_report
+        self.reload_count = 0
+        self.last_reload: Optional[float] = None
+        self.last_reload_error: Optional[str] = None
 
     def _load_map(self) -> Dict[str, Any]:
         """
@@ -105,7 +187,30 @@ class Daemon:
             print(f'Error cargando .ds4map.json: {e} - usando mapeo por defecto')
             return DEFAULT_MAP
 
-    async def start(self, emit: Callable[[dict], None]):
+    async def start(self, emit: Callable[[dict], Any], io_mode: Optional[str] = None):
+        """
+        Lee el dispositivo (o reproduce / simula) y entrega los eventos a ``emit``.
+
+        ``emit`` es un EventDispatcher o cualquier sink, síncrono o ``async
+        def`` (se envuelve en un EventDispatcher propio).
+        """
+        own = not isinstance(emit, EventDispatcher)
+        dispatcher = EventDispatcher([emit]) if own else emit
+        emit = dispatcher.emit
+        watch = asyncio.create_task(self.watch_mapping()) if MAP_WATCH else None
+        try:
+            if REPLAY_PATH:
+                await self.replay(REPLAY_PATH, emit, REPLAY_SPEED)
+            else:
+                await self._run(emit, io_mode)
+        finally:
+            if watch is not None:
+                watch.cancel()
+            self.stop_recording()
+            if own:
+                dispatcher.close()
+
+    async def _run(self, emit, io_mode):
         if not SIMULATE:
             try:
                 import hid
@@ -123,163 +228,310 @@ class Daemon:
                 print('Opening HID:', ds)
                 h = hid.device()
                 h.open_path(ds['path'])
-                h.set_nonblocking(True)
                 self._device = h
+                if RECORD_PATH:
+                    self.start_recording(RECORD_PATH, ds)
 
-                while True:
-                    report = h.read(64)
-                    if report:
-                        # validate and handle report robustly
-                        try:
-                            self._handle_report(report, emit)
-                        except Exception as e:
-                            print('Error handling report:', e)
-                    await asyncio.sleep(0.001)
+                if (io_mode or IO_MODE) == 'thread':
+                    await self._read_threaded(h, emit)
+                else:
+                    await self._read_polling(h, emit)
             except Exception as e:
                 print('HID error or not available:', e)
                 await self._simulate(emit)
         else:
             await self._simulate(emit)
 
-    def get_status(self):
-        from python import auto_map
-        return {'mapping': self.mapping, 'recentReports': getattr(self, '_recent', []), 'sensors': auto_map.detect_sensor_candidates(getattr(self, '_recent', []))}
+    async def _read_polling(self, h, emit):
+        """Lectura no bloqueante con sondeo cada 1 ms en el event loop."""
+        self._io_mode = 'poll'
+        h.set_nonblocking(True)
+        latency = self._latency
+        while True:
+            report = h.read(64)
+            if report:
+                t = time.monotonic()
+                if tracer.enabled:
+                    tracer.begin(t)
+                # validate and handle report robustly
+                try:
+                    self._handle_report(bytes(report), emit)
+                except Exception as e:
+                    print('Error handling report:', e)
+                latency.add(time.monotonic() - t)
+            await asyncio.sleep(0.001)
 
-    def save_mapping(self, mapping_obj):
+    async def _read_threaded(self, h, emit, queue_size: Optional[int] = None, policy: Optional[str] = None):
+        """
+        Lectura bloqueante en un hilo dedicado.
+
+        El hilo encola reportes en una ReportQueue acotada y sólo despierta
+        al event loop cuando la cola pasa de vacía a no vacía; aquí se drena
+        la cola completa en cada despertar.
+        """
+        self._io_mode = 'thread'
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        # el decoder se lee en cada llamada: sigue a las recargas del mapeo
+        queue = self._queue = ReportQueue(queue_size or QUEUE_SIZE, policy or OVERFLOW_POLICY,
+                                          lambda a, b: self._decoder.digital_changed(a, b))
+        if hasattr(h, 'set_nonblocking'):
+            h.set_nonblocking(False)
+        reader = HIDReaderThread(h, queue, lambda: loop.call_soon_threadsafe(wake.set))
+        reader.start()
+        latency = self._latency
         try:
-            if os.path.exists('.ds4map.json'):
-                os.rename('.ds4map.json', f'.ds4map.json.bak.{int(time.time())}')
-        except Exception:
-            pass
-        with open('.ds4map.json', 'w') as f:
-            json.dump(mapping_obj, f, indent=2)
+            while True:
+                await wake.wait()
+                wake.clear()
+                for t, report in queue.drain():
+                    if tracer.enabled:
+                        tracer.begin(t)
+                    try:
+                        self._handle_report(report, emit)
+                    except Exception as e:
+                        print('Error handling report:', e)
+                    latency.add(time.monotonic() - t)
+                if reader.done and not len(queue):
+                    break
+            if reader.error is not None:
+                raise reader.error
+        finally:
+            reader.stop()
+
+    def start_recording(self, path: str, device: Optional[dict] = None) -> 'ReportRecorder':
+        """Graba cada reporte que llega a _handle_report (ver recording.py)."""
+        from python.recording import ReportRecorder
+        self.stop_recording()
+        self._recorder = ReportRecorder(path, self._recent.width, device)
+        return self._recorder
+
+    def stop_recording(self):
+        rec, self._recorder = self._recorder, None
+        if rec is not None:
+            rec.close()
+
+    async def replay(self, path: str, emit, speed: Optional[float] = 1.0) -> int:
+        """Reproduce una grabación por el mismo camino que los reportes del dispositivo."""
+        from python.recording import Recording, replay
+        self._io_mode = 'replay'
+        latency = self._latency
+
+        def handle(report):
+            t = time.monotonic()
+            if tracer.enabled:
+                tracer.begin(t)
+            try:
+                self._handle_report(report, emit)
+            except Exception as e:
+                print('Error handling report:', e)
+            latency.add(time.monotonic() - t)
+
+        with Recording(path) as rec:
+            print(f'Replaying {len(rec)} reports from {path} (speed {speed or "max"})')
+            return await replay(rec, handle, speed)
+
+    def io_stats(self) -> dict:
+        """Contadores de E/S HID: modo, latencia lectura->emisión y cola (modo thread)."""
+        st = {'mode': self._io_mode, **self._latency.stats()}
+        if self._queue is not None:
+            st['queue'] = self._queue.stats()
+        if self._load is not None:
+            st['load'] = self._load.stats()
+        return st
+
+    def reload_mapping(self) -> bool:
+        """
+        Relee .ds4map.json, lo valida y aplica el decoder nuevo.
+
+        Si el archivo no es válido se conserva el mapeo actual. El cambio
+        ocurre en el event loop entre dos reportes, sin pausar la lectura.
+        """
+        try:
+            with open('.ds4map.json', 'r', encoding='utf-8') as f:
+                mapping = json.loads(f.read())
+            if not isinstance(mapping, dict):
+                raise ValueError('mapping must be a JSON object')
+            if mapping == self.mapping:
+                return False  # p. ej. el propio save_mapping
+            decoder = compile_mapping(mapping)
+            compile_axis_filter(mapping, decoder)  # validar axisFilters
+            compile_motion(mapping)                # validar motion/battery/motionStream
+        except Exception as e:
+            self.last_reload_error = str(e)
+            print(f'Mapeo .ds4map.json inválido, se mantiene el actual: {e}')
+            return False
+        self._apply_mapping(mapping, decoder)
+        self.reload_count += 1
+        self.last_reload = time.time()
+        self.last_reload_error = None
+        print('Mapeo .ds4map.json recargado')
+        return True
+
+    async def watch_mapping(self, interval: Optional[float] = None):
+        """Vigila .ds4map.json y llama a reload_mapping() en cada cambio."""
+        from python.map_watch import MapWatcher
+        self._watcher = MapWatcher('.ds4map.json', self.reload_mapping, interval or MAP_WATCH_INTERVAL)
+        await self._watcher.run()
+
+    def _apply_mapping(self, mapping_obj, decoder):
         self.mapping = mapping_obj
+        self._decoder = decoder
+        self._axis_filter = compile_axis_filter(mapping_obj, decoder)
+        self._motion = compile_motion(mapping_obj)
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self.prev_state is not None:
+            # re-decodificar el último reporte para no emitir cambios falsos
+            self.prev_state = decoder.decode(self.prev_state.raw)
+
+    def reload_stats(self) -> dict:
+        return {'watch': self._watcher.mode if self._watcher else None, 'count': self.reload_count,
+                'lastReload': self.last_reload, 'lastError': self.last_reload_error}
+
+    @property
+    def decoder(self):
+        """Decoder compilado del mapeo activo."""
+        return self._decoder
+
+    def get_status(self):
+        """Estado en memoria del daemon (no lee el disco)."""
+        recent = self._recent.to_lists(STATUS_RECENT)
+        state = self._decoder.to_dict(self.prev_state) if self.prev_state is not None else None
+        status = {'mapping': self.mapping, 'state': state, 'recentReports': recent,
+                  'sensors': self._sensors.candidates(), 'io': self.io_stats(),
+                  'reload': self.reload_stats()}
+        if self._motion is not None:
+            status.update(self._motion.to_dict())
+        return status
+
+    def save_mapping(self, mapping_obj):
+        """
+        Guarda el mapeo en .ds4map.json (con backup) y lo aplica en caliente.
+
+        El decoder nuevo se compila antes de escribir y se intercambia sin
+        puntos de espera, así que nunca se decodifica un reporte a medias.
+        """
+        decoder = write_mapping_file(mapping_obj)
+        self._apply_mapping(mapping_obj, decoder)
+
     def handle_report(self, report, emit: Callable[[dict], None]):
         """Public wrapper that validates the incoming report and forwards to internal handler.
-        Accepts bytes, bytearray or sequence of ints."""
+        Accepts bytes, bytearray or sequence of ints (0-255)."""
         try:
             if report is None:
                 return False
-            if isinstance(report, (bytes, bytearray)):
-                data = list(report)
-            elif isinstance(report, list) or isinstance(report, tuple):
-                data = list(report)
+            if isinstance(report, bytes):
+                data = report
             else:
-                # try to coerce
-                data = list(report)
+                # bytearray, list, tuple or any iterable of ints
+                data = bytes(report)
         except Exception:
             return False
+        if tracer.enabled:
+            tracer.begin()
         try:
             self._handle_report(data, emit)
             return True
         except Exception:
             return False
 
-    def _handle_report(self, report, emit):
-        b = list(report)
-        state = {'raw': b, 'axes':{}, 'buttons':{}, 'dpad': None}
-        for name, idx in (self.mapping.get('axes') or {}).items():
-            try:
-                v = b[idx]
-                if 'stick' in name:
-                    state['axes'][name] = round((v - 128) / 127, 2)
-                else:
-                    state['axes'][name] = round(v / 255, 2)
-            except Exception:
-                pass
+    def _handle_report(self, report: bytes, emit):
+        if self._recorder is not None:
+            self._recorder.write(report)
+        if self.on_report is not None:
+            self.on_report(report)
+        dec = self._decoder
+        state = dec.decode(report)
+        prev = self.prev_state
+        if tracer.enabled:
+            tracer.mark('decode')
 
-        # dpad
-        try:
-            nib = b[self.mapping['dpad']['byte']] & self.mapping['dpad']['mask']
-            dirMap = {0:'dpad_up',1:'dpad_up|dpad_right',2:'dpad_right',3:'dpad_down|dpad_right',4:'dpad_down',5:'dpad_down|dpad_left',6:'dpad_left',7:'dpad_left|dpad_up'}
-            state['dpad'] = dirMap.get(nib)
-        except Exception:
-            pass
-
-        for name, (byteIdx, mask) in (self.mapping.get('buttons') or {}).items():
-            try:
-                v = b[byteIdx]
-                state['buttons'][name] = bool(v & mask)
-            except Exception:
-                state['buttons'][name] = False
-
-        if self.prev_state is None:
+        if prev is None:
             # initial state
             self.prev_state = state
-            for k, v in state['buttons'].items():
-                if v: emit({'type':'button','id':k,'value':1})
-            for k, v in state['axes'].items():
-                emit({'type':'axis','id':k,'value':v})
+            filt = self._axis_filter
+            for ev in dec.initial_events(state):
+                if filt is None or ev['type'] != 'axis':
+                    emit(ev)
+            if filt is not None:
+                for ev in filt.update(state.axes, time.monotonic()):
+                    emit(ev)
+            if self._motion is not None:
+                for ev in self._motion.initial_events(report):
+                    emit(ev)
             return
 
-        # maintain recent raw reports for heuristics
-        self._recent = getattr(self, '_recent', [])
-        self._recent.append(state['raw'])
-        if len(self._recent) > 8: self._recent.pop(0)
+        # maintain recent raw reports for heuristics and status
+        self._recent.append(report)
+        self._sensors.update(report)
 
         if MAP_MODE:
-            diffs = [(i, self.prev_state['raw'][i], b[i]) for i in range(min(len(b), len(self.prev_state['raw']))) if b[i] != self.prev_state['raw'][i]]
+            b, pb = report, prev.raw
+            diffs = [(i, pb[i], b[i]) for i in range(min(len(b), len(pb))) if b[i] != pb[i]]
             if diffs:
                 print('Report diffs:', diffs)
 
         # buttons
-        for k, v in state['buttons'].items():
-            prev = self.prev_state['buttons'].get(k, False)
-            if v != prev:
-                emit({'type':'button','id':k,'value':1 if v else 0})
+        for ev in dec.button_events(prev, state):
+            emit(ev)
 
-        # Heuristic for buttons when mapping indices are out of range: try to find single-bit changes across previous and current raw
-        try:
-            import statistics
-            if self._recent and len(self._recent) >= 2:
-                prev_raw = self._recent[-2]
-                cur_raw = self._recent[-1]
-                # search for single-bit xor
-                for i in range(max(len(prev_raw), len(cur_raw))):
-                    a = prev_raw[i] if i < len(prev_raw) else 0
-                    b = cur_raw[i] if i < len(cur_raw) else 0
-                    xor = a ^ b
-                    if xor and (xor & (xor - 1)) == 0:
-                        # find which button mapping referenced missing byte and emit a guessed press for it
-                        for name, pair in (self.mapping.get('buttons') or {}).items():
-                            if not pair or pair[0] >= len(cur_raw):
-                                # emit guessed event
-                                emit({'type':'button','id':name,'value':1 if b & xor else 0})
-        except Exception:
-            pass
+        # buttons whose byte is beyond a short (Bluetooth) report
+        for ev in dec.fallback_events(prev, state):
+            emit(ev)
 
-        if state['dpad'] != self.prev_state.get('dpad'):
-            for idc in ['dpad_up','dpad_down','dpad_left','dpad_right']:
-                emit({'type':'button','id':idc,'value':0})
-            if state['dpad']:
-                for idc in state['dpad'].split('|'):
-                    emit({'type':'button','id':idc,'value':1})
+        for ev in dec.dpad_events(prev, state):
+            emit(ev)
 
-        for k, v in state['axes'].items():
-            prev = self.prev_state['axes'].get(k, 0)
-            if abs(v - prev) > 0.05:
-                emit({'type':'axis','id':k,'value':v})
+        filt = self._axis_filter
+        if filt is None:
+            for ev in dec.axis_events(prev, state):
+                emit(ev)
+        else:
+            for ev in filt.update(state.axes, time.monotonic()):
+                emit(ev)
+            if filt.npending:
+                self._schedule_axis_flush(emit)
+
+        # IMU decoded every report, emitted as a downsampled stream; battery on change
+        motion = self._motion
+        if motion is not None:
+            for ev in motion.update(report):
+                emit(ev)
 
         self.prev_state = state
 
+    def _schedule_axis_flush(self, emit):
+        """Programa el envío de los valores de eje retenidos aunque no lleguen más reportes."""
+        deadline = self._axis_filter.deadline
+        if deadline is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # sin event loop (pruebas, benchmarks): se vacían con el próximo reporte
+        if self._flush_handle is not None:
+            if self._flush_at <= deadline:
+                return
+            self._flush_handle.cancel()
+        self._flush_at = deadline
+        self._flush_handle = loop.call_later(max(0.0, deadline - time.monotonic()), self._flush_axes, emit)
+
+    def _flush_axes(self, emit):
+        self._flush_handle = None
+        filt = self._axis_filter
+        if filt is None:
+            return
+        for ev in filt.flush(time.monotonic()):
+            emit(ev)
+        if filt.npending:
+            self._schedule_axis_flush(emit)
+
     async def _simulate(self, emit):
-        buttons = list((self.mapping.get('buttons') or {}).keys())
-        async def loop_buttons():
-            while True:
-                btn = random.choice(buttons)
-                emit({'type':'button','id':btn,'value':1})
-                await asyncio.sleep(0.1 + random.random() * 0.3)
-                emit({'type':'button','id':btn,'value':0})
-                await asyncio.sleep(0.2)
-        async def loop_axes():
-            while True:
-                emit({'type':'axis','id':'lstick_x','value':round(random.uniform(-1,1),2)})
-                emit({'type':'axis','id':'lstick_y','value':round(random.uniform(-1,1),2)})
-                await asyncio.sleep(0.6)
-        await asyncio.gather(loop_buttons(), loop_axes())
+        """Sin hardware: controles sintéticos a la tasa de un DS4 real (ver loadgen.py)."""
+        from python.loadgen import simulate
+        await simulate(self, emit)
 
 if __name__ == '__main__':
-    import asyncio
-    d = Daemon()
-    async def emit(m): print('emit:', m)
-    asyncio.run(d.start(emit))
+    asyncio.run(Daemon().start(EventDispatcher([print_sink])))
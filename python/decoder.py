@@ -0,0 +1,272 @@
+"""
+Decodificador compilado de reportes HID (Python)
+
+Convierte el mapeo ``{axes, buttons, dpad}`` en tablas fijas (índices de
+byte, máscaras y tablas de escala por eje) una sola vez, de modo que cada
+reporte se decodifica sin búsquedas en diccionarios, sin ``'stick' in name``
+y sin try/except por control.
+
+Uso típico::
+
+    dec = compile_mapping(mapping)
+    state = dec.decode(report)
+    events = dec.diff(prev_state, state)
+
+Reportes cortos (Bluetooth): si un botón del mapeo cae fuera del reporte,
+el plan de esa longitud reserva para él su bit en los bytes que ningún
+control del mapeo usa. Un cambio de un solo bit en esas posiciones se
+emite como flanco de ese botón (``fallback_events``); el coste por reporte
+es un XOR entre enteros y un recorrido de los bits que cambiaron.
+
+@module decoder
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# Tablas de escala precalculadas: valor crudo (0-255) -> valor normalizado.
+# Producen exactamente los mismos números que round((v - 128) / 127, 2) y
+# round(v / 255, 2) que usaba el daemon original.
+STICK_SCALE = tuple(round((v - 128) / 127, 2) for v in range(256))
+TRIGGER_SCALE = tuple(round(v / 255, 2) for v in range(256))
+
+# D-pad: el nibble codifica dirección 0-7; cualquier otro valor es neutro.
+DPAD_NEUTRAL = -1
+DPAD_IDS = ('dpad_up', 'dpad_down', 'dpad_left', 'dpad_right')
+DPAD_DIRECTIONS = (
+    ('dpad_up',),
+    ('dpad_up', 'dpad_right'),
+    ('dpad_right',),
+    ('dpad_down', 'dpad_right'),
+    ('dpad_down',),
+    ('dpad_down', 'dpad_left'),
+    ('dpad_left',),
+    ('dpad_left', 'dpad_up'),
+)
+# Código de dirección para cada valor posible de byte & máscara
+DPAD_CODES = tuple(v if v < len(DPAD_DIRECTIONS) else DPAD_NEUTRAL for v in range(256))
+
+# Umbral de cambio para emitir eventos de eje (igual que la versión original)
+AXIS_THRESHOLD = 0.05
+
+
+class State(NamedTuple):
+    """Estado compacto de un reporte decodificado."""
+    raw: bytes
+    axes: Tuple[Optional[float], ...]  # None si el índice no está en el reporte
+    buttons: int                       # bit i activo => botón i presionado
+    dpad: int                          # 0-7 o DPAD_NEUTRAL
+
+
+class _Fallback(NamedTuple):
+    """Posiciones candidatas para los botones que no caben en el reporte."""
+    mask: int                # bits candidatos empaquetados (little-endian, byte i -> bits 8i..8i+7)
+    buttons: Dict[int, str]  # bit dentro del byte (1, 2, 4, ...) -> id del botón
+
+
+class _Plan(NamedTuple):
+    """Subconjunto de controles cuyo byte existe para una longitud de reporte."""
+    axes: Tuple[Tuple[int, int, Tuple[float, ...]], ...]
+    buttons: Tuple[Tuple[int, int, int], ...]
+    dpad: bool
+    fallback: Optional[_Fallback]
+
+
+def _valid_index(v) -> bool:
+    return isinstance(v, int) and not isinstance(v, bool) and v >= 0
+
+
+class Decoder:
+    """
+    Mapeo compilado a arreglos fijos.
+
+    Las entradas inválidas del mapeo (índices ausentes, tipos incorrectos)
+    se descartan al compilar, no en cada reporte.
+    """
+
+    __slots__ = ('axis_ids', 'button_ids', '_axis_idx', '_axis_scale',
+                 '_button_idx', '_button_mask', '_dpad_byte', '_dpad_mask', '_plans')
+
+    def __init__(self, mapping: Dict[str, Any]):
+        axis_ids, axis_idx, axis_scale = [], [], []
+        for name, idx in (mapping.get('axes') or {}).items():
+            if not _valid_index(idx):
+                continue
+            axis_ids.append(name)
+            axis_idx.append(idx)
+            axis_scale.append(STICK_SCALE if 'stick' in name else TRIGGER_SCALE)
+
+        button_ids, button_idx, button_mask = [], [], []
+        for name, pair in (mapping.get('buttons') or {}).items():
+            if not isinstance(pair, (list, tuple)) or len(pair) != 2:
+                continue
+            byte_idx, mask = pair
+            if not _valid_index(byte_idx) or not _valid_index(mask):
+                continue
+            button_ids.append(name)
+            button_idx.append(byte_idx)
+            button_mask.append(mask)
+
+        dpad = mapping.get('dpad') or {}
+        dpad_byte = dpad.get('byte') if isinstance(dpad, dict) else None
+        dpad_mask = dpad.get('mask') if isinstance(dpad, dict) else None
+        if _valid_index(dpad_byte) and _valid_index(dpad_mask):
+            self._dpad_byte, self._dpad_mask = dpad_byte, dpad_mask & 0xff
+        else:
+            self._dpad_byte, self._dpad_mask = None, 0
+
+        self.axis_ids: Tuple[str, ...] = tuple(axis_ids)
+        self.button_ids: Tuple[str, ...] = tuple(button_ids)
+        self._axis_idx = tuple(axis_idx)
+        self._axis_scale = tuple(axis_scale)
+        self._button_idx = tuple(button_idx)
+        self._button_mask = tuple(button_mask)
+        self._plans: Dict[int, _Plan] = {}
+
+    @property
+    def control_ids(self) -> Tuple[str, ...]:
+        """Todos los ids que este decoder puede emitir (ejes, botones, D-pad)."""
+        return self.axis_ids + self.button_ids + (DPAD_IDS if self._dpad_byte is not None else ())
+
+    @property
+    def axis_centered(self) -> Tuple[bool, ...]:
+        """Por eje: True si es un stick centrado (-1..1), False si es un gatillo (0..1)."""
+        return tuple(scale is STICK_SCALE for scale in self._axis_scale)
+
+    def _plan(self, length: int) -> _Plan:
+        """Calcula (una vez por longitud) qué controles caben en el reporte."""
+        plan = self._plans.get(length)
+        if plan is None:
+            axes = tuple((i, idx, scale) for i, (idx, scale)
+                         in enumerate(zip(self._axis_idx, self._axis_scale)) if idx < length)
+            buttons = tuple((idx, mask, 1 << i) for i, (idx, mask)
+                            in enumerate(zip(self._button_idx, self._button_mask)) if idx < length)
+            dpad = self._dpad_byte is not None and self._dpad_byte < length
+            plan = self._plans[length] = _Plan(axes, buttons, dpad, self._fallback(length, axes, buttons, dpad))
+        return plan
+
+    def _fallback(self, length, axes, buttons, dpad) -> Optional[_Fallback]:
+        """Botones fuera de rango y las posiciones donde se buscan (None si no hay)."""
+        by_bit: Dict[int, str] = {}
+        for name, idx, mask in zip(self.button_ids, self._button_idx, self._button_mask):
+            if idx < length:
+                continue
+            for b in range(8):
+                bit = 1 << b
+                if mask & bit and bit not in by_bit:  # el primero del mapeo gana
+                    by_bit[bit] = name
+        if not by_bit:
+            return None
+        used = {idx for _, idx, _ in axes} | {idx for idx, _, _ in buttons}
+        if dpad:
+            used.add(self._dpad_byte)
+        bits = sum(by_bit)
+        mask = 0
+        for i in range(length):
+            if i not in used:
+                mask |= bits << (8 * i)
+        return _Fallback(mask, by_bit) if mask else None
+
+    def digital_changed(self, a: bytes, b: bytes) -> bool:
+        """True si algún botón o el D-pad difiere entre dos reportes crudos (ejes e IMU no cuentan)."""
+        if len(a) != len(b):
+            return True
+        plan = self._plans.get(len(b)) or self._plan(len(b))
+        for idx, mask, _ in plan.buttons:
+            if (a[idx] ^ b[idx]) & mask:
+                return True
+        if plan.dpad and (a[self._dpad_byte] ^ b[self._dpad_byte]) & self._dpad_mask:
+            return True
+        fb = plan.fallback
+        return fb is not None and bool((int.from_bytes(a, 'little') ^ int.from_bytes(b, 'little')) & fb.mask)
+
+    def decode(self, report: bytes) -> State:
+        """Decodifica un reporte crudo (bytes) en un State compacto."""
+        plan = self._plans.get(len(report)) or self._plan(len(report))
+        axes: List[Optional[float]] = [None] * len(self.axis_ids)
+        for i, idx, scale in plan.axes:
+            axes[i] = scale[report[idx]]
+        buttons = 0
+        for idx, mask, bit in plan.buttons:
+            if report[idx] & mask:
+                buttons |= bit
+        dpad = DPAD_CODES[report[self._dpad_byte] & self._dpad_mask] if plan.dpad else DPAD_NEUTRAL
+        return State(report, tuple(axes), buttons, dpad)
+
+    def to_dict(self, state: State) -> dict:
+        """Estado legible: {axes: {id: valor}, buttons: {id: 0/1}, dpad: [ids]}."""
+        return {'axes': {name: v for name, v in zip(self.axis_ids, state.axes) if v is not None},
+                'buttons': {name: state.buttons >> i & 1 for i, name in enumerate(self.button_ids)},
+                'dpad': list(DPAD_DIRECTIONS[state.dpad]) if state.dpad != DPAD_NEUTRAL else []}
+
+    def initial_events(self, state: State) -> List[dict]:
+        """Eventos del primer reporte: botones presionados y todos los ejes."""
+        events = [{'type': 'button', 'id': name, 'value': 1}
+                  for i, name in enumerate(self.button_ids) if state.buttons >> i & 1]
+        events.extend({'type': 'axis', 'id': name, 'value': v}
+                      for name, v in zip(self.axis_ids, state.axes) if v is not None)
+        return events
+
+    def button_events(self, prev: State, cur: State) -> List[dict]:
+        """Flancos de botones entre dos estados (orden del mapeo)."""
+        changed = prev.buttons ^ cur.buttons
+        events = []
+        if changed:
+            ids = self.button_ids
+            for i in range(changed.bit_length()):
+                if changed >> i & 1:
+                    events.append({'type': 'button', 'id': ids[i], 'value': cur.buttons >> i & 1})
+        return events
+
+    def fallback_events(self, prev: State, cur: State) -> List[dict]:
+        """
+        Flancos de botones fuera de rango detectados como cambio de un bit.
+
+        Sólo se miran las posiciones candidatas del plan; un byte candidato
+        que cambió en más de un bit (contador, sensor) se ignora.
+        """
+        fb = (self._plans.get(len(cur.raw)) or self._plan(len(cur.raw))).fallback
+        if fb is None:
+            return []
+        prev_raw, cur_raw = prev.raw, cur.raw
+        x = (int.from_bytes(prev_raw, 'little') ^ int.from_bytes(cur_raw, 'little')) & fb.mask
+        events = []
+        while x:
+            byte = ((x & -x).bit_length() - 1) >> 3
+            x &= ~(0xff << (8 * byte))
+            a = prev_raw[byte] if byte < len(prev_raw) else 0
+            xor = a ^ cur_raw[byte]
+            if (xor & (xor - 1)) == 0:
+                name = fb.buttons.get(xor)
+                if name is not None:
+                    events.append({'type': 'button', 'id': name, 'value': 1 if cur_raw[byte] & xor else 0})
+        return events
+
+    @staticmethod
+    def dpad_events(prev: State, cur: State) -> List[dict]:
+        """Al cambiar el D-pad se liberan las 4 direcciones y se presionan las nuevas."""
+        if cur.dpad == prev.dpad:
+            return []
+        events = [{'type': 'button', 'id': idc, 'value': 0} for idc in DPAD_IDS]
+        if cur.dpad != DPAD_NEUTRAL:
+            events.extend({'type': 'button', 'id': idc, 'value': 1} for idc in DPAD_DIRECTIONS[cur.dpad])
+        return events
+
+    def axis_events(self, prev: State, cur: State) -> List[dict]:
+        """Ejes que cambiaron más que AXIS_THRESHOLD respecto al estado previo."""
+        events = []
+        for name, p, v in zip(self.axis_ids, prev.axes, cur.axes):
+            if v is not None and abs(v - (p or 0)) > AXIS_THRESHOLD:
+                events.append({'type': 'axis', 'id': name, 'value': v})
+        return events
+
+    def diff(self, prev: State, cur: State) -> List[dict]:
+        """Lista de controles que cambiaron: botones, botones fuera de rango, D-pad y ejes."""
+        return (self.button_events(prev, cur) + self.fallback_events(prev, cur)
+                + self.dpad_events(prev, cur) + self.axis_events(prev, cur))
+
+
+def compile_mapping(mapping: Dict[str, Any]) -> Decoder:
+    """Compila un mapeo {axes, buttons, dpad} en un Decoder."""
+    if not isinstance(mapping, dict):
+        raise ValueError('mapping must be a dict')
+    return Decoder(mapping)
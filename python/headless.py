@@ -0,0 +1,280 @@
+"""
+Salida local sin servidor web: datagramas Unix o UDP (Python)
+
+Para consumidores locales (puentes con juegos, controladores de robots)
+que no necesitan FastAPI, uvicorn ni JSON::
+
+    python -m python.headless --unix /tmp/ds4.sock
+    python -m python.headless --udp 127.0.0.1:9750 --frames state
+
+(o HEADLESS_TARGET=unix:/tmp/ds4.sock | udp:127.0.0.1:9750 y
+HEADLESS_FRAMES=events|state). Sólo se importa el daemon: nunca FastAPI, y
+``hid`` únicamente si hay que abrir el dispositivo (no con SIMULATE=1 ni
+HID_REPLAY).
+
+Cada datagrama (little-endian) empieza con una cabecera fija::
+
+    magic b'D4' | versión u8 | tipo u8 | seq u32 | t_ns u64
+
+- tipo 0, eventos: un registro por evento como los de ``binproto``:
+  índice u16 | tipo u8 (0 botón, 1 eje, 2 movimiento, 3 batería) | valor i16
+- tipo 1, estado: nº de controles u16 | un i16 por control, en el orden
+  de la tabla
+- tipo 2, tabla: JSON ``{"ids": [...], "types": [...], "scale": {...}}``
+
+Valores: ejes × 10000, botones 0/1, campos de movimiento crudos (int16) y
+batería en %; el estado de carga es el botón ``charging``. ``seq`` cuenta
+datagramas (un hueco es un datagrama perdido) y ``t_ns`` es
+``time.monotonic_ns()`` al enviar (CLOCK_MONOTONIC, comparable entre
+procesos de la misma máquina). La tabla se envía al empezar, antes del
+primer datagrama que usa un id nuevo y cada HEADLESS_TABLE_INTERVAL
+segundos para los consumidores que se conectan tarde.
+
+En modo ``events`` cada evento sale en su propio datagrama en el momento
+en que el daemon lo emite, sin pasar por el event loop; en modo ``state``
+sale un datagrama con el estado completo por cada reporte que cambió algo.
+Si nadie escucha (socket Unix sin enlazar, puerto UDP cerrado) o el buffer
+del socket está lleno, el datagrama se descarta y se cuenta en
+``dropped``: el daemon nunca se bloquea.
+
+Comparación de arranque y latencia con el camino WebSocket:
+``python -m python.benchmarks.bench_headless``.
+
+@module headless
+"""
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from python.binproto import AXIS_SCALE, RECORD
+
+MAGIC = b'D4'
+VERSION = 1
+HEADER = struct.Struct('<2sBBIQ')
+KIND_EVENTS, KIND_STATE, KIND_TABLE = 0, 1, 2
+TYPE_BUTTON, TYPE_AXIS, TYPE_MOTION, TYPE_BATTERY = 0, 1, 2, 3
+TYPE_NAMES = ('button', 'axis', 'motion', 'battery')
+SCALES = {'axis': AXIS_SCALE, 'battery': 100}
+
+HEADLESS_TARGET = os.getenv('HEADLESS_TARGET', 'udp:127.0.0.1:9750')
+HEADLESS_FRAMES = os.getenv('HEADLESS_FRAMES', 'events')
+TABLE_INTERVAL = float(os.getenv('HEADLESS_TABLE_INTERVAL', '1.0'))
+
+
+def parse_target(target: str) -> Tuple[int, object]:
+    """``unix:/ruta`` o ``udp:host:puerto`` -> (familia de socket, dirección)."""
+    if target.startswith('unix:') and len(target) > 5:
+        return socket.AF_UNIX, target[5:]
+    if target.startswith('udp:'):
+        host, _, port = target[4:].rpartition(':')
+        if port.isdigit():
+            return socket.AF_INET, (host or '127.0.0.1', int(port))
+    raise ValueError(f'headless target must be unix:/path or udp:host:port, not {target!r}')
+
+
+def _clamp(v: float) -> int:
+    return max(-32768, min(32767, round(v)))
+
+
+class DatagramSink:
+    """Sink del daemon que envía eventos o estado como datagramas binarios."""
+
+    def __init__(self, target: str = HEADLESS_TARGET, frames: str = HEADLESS_FRAMES):
+        if frames not in ('events', 'state'):
+            raise ValueError("frames must be 'events' or 'state'")
+        family, self._addr = parse_target(target)
+        self.target = target
+        self.frames = frames
+        self.__name__ = f'headless:{target}'
+        self._sock = socket.socket(family, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+        self.ids: List[str] = []
+        self.types: List[int] = []
+        self._index: Dict[Tuple[str, int], int] = {}
+        self._values = array('h')       # estado actual por control (modo state)
+        self._table_at = 0              # t_ns del último envío de la tabla (0 = reenviar ya)
+        self._state_handle: Optional[asyncio.Handle] = None
+        self.seq = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def add(self, cid: str, kind: str = 'button') -> int:
+        """Registra un control en la tabla (p. ej. los del decoder al arrancar)."""
+        code = TYPE_NAMES.index(kind)
+        idx = self._index.get((cid, code))
+        if idx is None:
+            idx = self._index[(cid, code)] = len(self.ids)
+            self.ids.append(cid)
+            self.types.append(code)
+            self._values.append(0)
+            self._table_at = 0  # la tabla nueva sale antes del próximo datagrama
+        return idx
+
+    def _records(self, msg: dict) -> List[Tuple[int, int, int]]:
+        kind = msg.get('type')
+        dev = msg.get('device')
+        prefix = '' if dev is None else f'{dev}/'
+        index, add = self._index, self.add
+        if kind == 'axis':
+            items = ((msg.get('id'), TYPE_AXIS, msg.get('value', 0) * AXIS_SCALE),)
+        elif kind == 'button':
+            items = ((msg.get('id'), TYPE_BUTTON, 1 if msg.get('value') else 0),)
+        elif kind == 'motion':
+            items = tuple((cid, TYPE_MOTION, v) for cid, v in (msg.get('value') or {}).items())
+        elif kind == 'battery':
+            items = ((msg.get('id'), TYPE_BATTERY, msg.get('value', 0) * 100),)
+            if msg.get('charging') is not None:
+                items += (('charging', TYPE_BUTTON, msg['charging']),)
+        else:
+            return []  # device y otros tipos no tienen registro binario
+        out = []
+        for cid, code, value in items:
+            name = prefix + cid
+            idx = index.get((name, code))
+            if idx is None:
+                idx = add(name, TYPE_NAMES[code])
+            out.append((idx, code, _clamp(value)))
+        return out
+
+    def __call__(self, msg: dict):
+        records = self._records(msg)
+        if not records:
+            return
+        if self.frames == 'events':
+            self._send(KIND_EVENTS, b''.join([RECORD.pack(*r) for r in records]))
+            return
+        values = self._values
+        for idx, _, value in records:
+            values[idx] = value
+        if self._state_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.send_state()  # sin event loop (pruebas): un datagrama por evento
+                return
+            # every event of one report is emitted synchronously: one frame per report
+            self._state_handle = loop.call_soon(self.send_state)
+
+    def send_state(self):
+        self._state_handle = None
+        values = self._values
+        self._send(KIND_STATE, struct.pack('<H', len(values)) + values.tobytes())
+
+    def send_table(self, t_ns: Optional[int] = None):
+        table = {'ids': self.ids, 'types': [TYPE_NAMES[c] for c in self.types], 'scale': SCALES}
+        self._table_at = time.monotonic_ns() if t_ns is None else t_ns
+        self._send(KIND_TABLE, json.dumps(table).encode(), self._table_at)
+
+    def _send(self, kind: int, payload: bytes, t_ns: Optional[int] = None):
+        if t_ns is None:
+            t_ns = time.monotonic_ns()
+            if t_ns - self._table_at >= TABLE_INTERVAL * 1e9:
+                self.send_table(t_ns)
+        self.seq = seq = (self.seq + 1) & 0xffffffff
+        try:
+            self._sock.sendto(HEADER.pack(MAGIC, VERSION, kind, seq, t_ns) + payload, self._addr)
+            self.sent += 1
+        except OSError:  # nadie escuchando, buffer lleno: se descarta
+            self.dropped += 1
+
+    def close(self):
+        if self._state_handle is not None:
+            self._state_handle.cancel()
+            self._state_handle = None
+        self._sock.close()
+
+    def stats(self) -> dict:
+        return {'target': self.target, 'frames': self.frames, 'sent': self.sent, 'dropped': self.dropped,
+                'controls': len(self.ids)}
+
+
+class FrameReader:
+    """Decodifica los datagramas de DatagramSink (consumidores Python, pruebas, benchmark)."""
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.types: List[int] = []
+        self.last_seq: Optional[int] = None
+        self.lost = 0
+
+    def _value(self, idx: int, value: int):
+        name = TYPE_NAMES[self.types[idx]]
+        scale = SCALES.get(name)
+        return value / scale if scale else value
+
+    def read(self, data: bytes) -> dict:
+        """``{kind, seq, t_ns}`` más ``events``, ``state`` o ``ids`` según el tipo."""
+        magic, version, kind, seq, t_ns = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('not a headless datagram (version %d)' % VERSION)
+        if self.last_seq is not None:
+            self.lost += (seq - self.last_seq - 1) & 0xffffffff
+        self.last_seq = seq
+        body = memoryview(data)[HEADER.size:]
+        out = {'seq': seq, 't_ns': t_ns}
+        if kind == KIND_TABLE:
+            table = json.loads(bytes(body))
+            self.ids = table['ids']
+            self.types = [TYPE_NAMES.index(t) for t in table['types']]
+            out.update(kind='table', ids=self.ids)
+        elif kind == KIND_EVENTS:
+            out.update(kind='events', events=[
+                {'type': TYPE_NAMES[code], 'id': self.ids[idx], 'value': self._value(idx, value)}
+                for idx, code, value in RECORD.iter_unpack(body)])
+        elif kind == KIND_STATE:
+            n, = struct.unpack_from('<H', body)
+            values = struct.unpack_from(f'<{n}h', body, 2)
+            out.update(kind='state', state={self.ids[i]: self._value(i, v) for i, v in enumerate(values)})
+        else:
+            raise ValueError(f'unknown datagram kind {kind}')
+        return out
+
+
+async def run(target: str = HEADLESS_TARGET, frames: str = HEADLESS_FRAMES):
+    """Daemon (o MultiDeviceDaemon con HID_MULTI=1) con DatagramSink como único sink."""
+    from python.multi import HID_MULTI, MultiDeviceDaemon
+    from python.daemon import Daemon
+    from python.decoder import DPAD_IDS
+    from python.sinks import EventDispatcher
+
+    daemon = MultiDeviceDaemon() if HID_MULTI else Daemon()
+    sink = DatagramSink(target, frames)
+    dec = daemon.decoder
+    for cid in dec.axis_ids:
+        sink.add(cid, 'axis')
+    for cid in dec.button_ids + (DPAD_IDS if set(DPAD_IDS) <= set(dec.control_ids) else ()):
+        sink.add(cid, 'button')
+    sink.send_table()
+    print(f'Headless output: {frames} -> {target}')
+    try:
+        await daemon.start(EventDispatcher([sink]))
+    finally:
+        sink.close()
+        print('Headless output closed:', sink.stats())
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description='Stream decoded controller events over a Unix datagram socket or UDP')
+    dest = ap.add_mutually_exclusive_group()
+    dest.add_argument('--unix', metavar='PATH', help='Unix datagram socket bound by the consumer')
+    dest.add_argument('--udp', metavar='HOST:PORT', help='UDP address, e.g. 127.0.0.1:9750')
+    ap.add_argument('--frames', choices=('events', 'state'), default=HEADLESS_FRAMES)
+    args = ap.parse_args(argv)
+    target = f'unix:{args.unix}' if args.unix else f'udp:{args.udp}' if args.udp else HEADLESS_TARGET
+    parse_target(target)
+    try:
+        asyncio.run(run(target, args.frames))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
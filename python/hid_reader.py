@@ -0,0 +1,148 @@
+"""
+Lector HID en hilo dedicado (Python)
+
+Un hilo de fondo hace lecturas bloqueantes (con timeout) y deja los reportes
+en una cola acotada; el event loop sólo se despierta cuando la cola pasa de
+vacía a no vacía, en lugar de sondear cada 1 ms.
+
+Políticas de desbordamiento de la cola:
+- drop_oldest: se descarta el reporte más antiguo (contador ``dropped``)
+- coalesce: el reporte nuevo reemplaza al último encolado si sólo cambian
+  ejes/sensores respecto a él (contador ``coalesced``); como cada reporte es
+  un estado completo, el estado más reciente siempre llega. Si cambia algún
+  botón o el D-pad (función ``digital_changed``, normalmente
+  ``Decoder.digital_changed``) reemplazarlo perdería una pulsación corta que
+  empieza y termina en el reporte reemplazado, así que se descarta el más
+  antiguo como en drop_oldest. Sin ``digital_changed`` se reemplaza siempre
+  y las pulsaciones más cortas que un reporte pueden perderse.
+
+@module hid_reader
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+OVERFLOW_POLICIES = ('drop_oldest', 'coalesce')
+
+
+class ReportQueue:
+    """Cola acotada y thread-safe de (timestamp_monotónico, reporte)."""
+
+    def __init__(self, maxsize: int = 256, policy: str = 'drop_oldest',
+                 digital_changed: Optional[Callable[[bytes, bytes], bool]] = None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f'unknown overflow policy: {policy}')
+        if maxsize < 1:
+            raise ValueError('maxsize must be >= 1')
+        self.maxsize = maxsize
+        self.policy = policy
+        self.digital_changed = digital_changed
+        self._items: deque = deque()
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+
+    def put(self, item: Tuple[float, bytes]) -> bool:
+        """Encola un reporte. Devuelve True si la cola estaba vacía (hay que despertar al consumidor)."""
+        with self._lock:
+            items = self._items
+            was_empty = not items
+            if len(items) >= self.maxsize:
+                changed = self.digital_changed
+                if self.policy == 'coalesce' and (changed is None or not changed(items[-1][1], item[1])):
+                    items[-1] = item
+                    self.coalesced += 1
+                    return False
+                items.popleft()
+                self.dropped += 1
+            items.append(item)
+            self.enqueued += 1
+            if len(items) > self.max_depth:
+                self.max_depth = len(items)
+            return was_empty
+
+    def drain(self) -> List[Tuple[float, bytes]]:
+        """Extrae todos los reportes pendientes en orden de llegada."""
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+        return items
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self) -> dict:
+        return {'depth': len(self._items), 'maxDepth': self.max_depth, 'size': self.maxsize,
+                'policy': self.policy, 'enqueued': self.enqueued,
+                'dropped': self.dropped, 'coalesced': self.coalesced}
+
+
+class LatencyStats:
+    """Acumulador mínimo de latencia lectura -> emisión (segundos)."""
+
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, dt: float):
+        self.count += 1
+        self.total += dt
+        if dt > self.max:
+            self.max = dt
+
+    def stats(self) -> dict:
+        avg = self.total / self.count if self.count else 0.0
+        return {'reports': self.count, 'latencyAvgMs': round(avg * 1000, 3),
+                'latencyMaxMs': round(self.max * 1000, 3)}
+
+
+class HIDReaderThread(threading.Thread):
+    """
+    Hilo que lee del dispositivo HID en modo bloqueante con timeout.
+
+    ``notify`` se invoca desde el hilo lector cuando la cola deja de estar
+    vacía; debe ser thread-safe (p. ej. ``loop.call_soon_threadsafe``).
+    Si la lectura falla (dispositivo desconectado) el error queda en
+    ``self.error`` y se notifica al consumidor.
+    """
+
+    def __init__(self, device, queue: ReportQueue, notify: Callable[[], None],
+                 read_size: int = 64, timeout_ms: int = 100):
+        super().__init__(name='hid-reader', daemon=True)
+        self.device = device
+        self.queue = queue
+        self.notify = notify
+        self.read_size = read_size
+        self.timeout_ms = timeout_ms
+        self.error: Optional[BaseException] = None
+        self.done = False  # True cuando el bucle de lectura terminó
+        self._stop_event = threading.Event()
+
+    def run(self):
+        read, put, notify = self.device.read, self.queue.put, self.notify
+        size, timeout = self.read_size, self.timeout_ms
+        try:
+            while not self._stop_event.is_set():
+                report = read(size, timeout)
+                if report and put((time.monotonic(), bytes(report))):
+                    notify()
+        except BaseException as e:
+            self.error = e
+        finally:
+            self.done = True
+            try:
+                notify()
+            except Exception:
+                pass  # event loop ya cerrado
+
+    def stop(self, join_timeout: float = 1.0):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(join_timeout)
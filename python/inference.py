@@ -0,0 +1,153 @@
+"""
+Inferencia de mapeos por lotes a partir de pares etiquetados (Python)
+
+Para miles de pares (label, before, after) de muchas sesiones de recolección,
+en lugar de comparar byte a byte cada par y quedarse con el primer candidato:
+
+1. Los reportes ``before`` y ``after`` de cada etiqueta se concatenan en dos
+   bloques de filas de ancho fijo, y un único XOR entre enteros grandes
+   (``int.from_bytes``) da los bits que cambiaron en todos los pares a la vez.
+2. Para cada posición (byte, bit) que cambió alguna vez se cuentan los
+   intentos que la cambiaron y los que la dejaron en 1 con
+   ``columna.translate(tabla_del_bit).count(1)``, sin bucles Python por par.
+3. Cada posición se puntúa por frecuencia (fracción de intentos en que
+   cambia), consistencia (si cambia siempre en la misma dirección) y fondo
+   (con qué frecuencia cambia en los intentos de otras etiquetas: bytes de
+   sensores o contadores que cambian siempre no sirven para identificar
+   un botón).
+
+@module inference
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# Bits del mismo byte con puntuación >= MASK_RATIO * mejor se unen a la máscara
+MASK_RATIO = 0.9
+
+
+def _as_bytes(report) -> bytes:
+    return report if isinstance(report, (bytes, bytearray)) else bytes(report)
+
+
+# Tabla de traducción por bit: byte -> 1 si el bit b está activo, si no 0
+_BIT_TABLES = tuple(bytes((v >> b) & 1 for v in range(256)) for b in range(8))
+
+
+class _LabelStats:
+    __slots__ = ('attempts', 'flips', 'rises', 'columns')
+
+    def __init__(self, attempts: int, flips: bytes, rises: bytes, columns: List[int]):
+        self.attempts = attempts
+        self.flips = flips      # filas: XOR de cada intento
+        self.rises = rises      # filas: bits que quedaron en 1 (XOR & after)
+        self.columns = columns  # bytes que cambiaron en algún intento
+
+
+def _block(rows: List[bytes], width: int) -> bytes:
+    """Concatena filas rellenando con ceros las más cortas."""
+    if any(len(r) != width for r in rows):
+        rows = [r.ljust(width, b'\0') for r in rows]
+    return b''.join(rows)
+
+
+def _accumulate(labeled_pairs) -> Tuple[Dict[str, _LabelStats], int]:
+    """XOR de todos los pares de cada etiqueta como bloques de ``width`` bytes por fila."""
+    grouped: Dict[str, Tuple[List[bytes], List[bytes]]] = {}
+    width = 0
+    for label, before, after in labeled_pairs:
+        before, after = _as_bytes(before), _as_bytes(after)
+        g = grouped.get(label)
+        if g is None:
+            g = grouped[label] = ([], [])
+        g[0].append(before)
+        g[1].append(after)
+        width = max(width, len(before), len(after))
+    per_label: Dict[str, _LabelStats] = {}
+    for label, (befores, afters) in grouped.items():
+        n = len(befores)
+        a = int.from_bytes(_block(afters, width), 'little')
+        x = int.from_bytes(_block(befores, width), 'little') ^ a
+        flips = x.to_bytes(n * width, 'little')
+        rises = (x & a).to_bytes(n * width, 'little')
+        columns = [i for i in range(width) if flips[i::width].count(0) != n]
+        per_label[label] = _LabelStats(n, flips, rises, columns)
+    return per_label, width
+
+
+def _bit_counts(block: bytes, width: int, idx: int, cache: dict) -> List[int]:
+    """Nº de filas con cada bit (0-7) activo en la columna ``idx`` del bloque."""
+    counts = cache.get(idx)
+    if counts is None:
+        col = block[idx::width]
+        counts = cache[idx] = [col.translate(t).count(1) for t in _BIT_TABLES]
+    return counts
+
+
+def score_candidates(labeled_pairs, top: Optional[int] = 3) -> Dict[str, List[dict]]:
+    """
+    Candidatos (byte, bit) por etiqueta, ordenados por puntuación.
+
+    Cada candidato: {idx, bit, mask, score, frequency, consistency, background}
+    con ``score = frequency * consistency - background``.
+    """
+    per_label, width = _accumulate(labeled_pairs)
+    total_attempts = sum(st.attempts for st in per_label.values())
+    flip_cache = {label: {} for label in per_label}
+    total_cache: Dict[int, List[int]] = {}
+
+    def total_flips(idx):
+        counts = total_cache.get(idx)
+        if counts is None:
+            counts = [0] * 8
+            for label, st in per_label.items():
+                for b, c in enumerate(_bit_counts(st.flips, width, idx, flip_cache[label])):
+                    counts[b] += c
+            total_cache[idx] = counts
+        return counts
+
+    out: Dict[str, List[dict]] = {}
+    for label, st in per_label.items():
+        others = total_attempts - st.attempts
+        rise_cache: Dict[int, List[int]] = {}
+        cands = []
+        for idx in st.columns:
+            flip_counts = _bit_counts(st.flips, width, idx, flip_cache[label])
+            rise_counts = _bit_counts(st.rises, width, idx, rise_cache)
+            totals = total_flips(idx)
+            for bit in range(8):
+                flips = flip_counts[bit]
+                if not flips:
+                    continue
+                rises = rise_counts[bit]
+                frequency = flips / st.attempts
+                consistency = max(rises, flips - rises) / flips
+                background = (totals[bit] - flips) / others if others else 0.0
+                cands.append({'idx': idx, 'bit': bit, 'mask': 1 << bit,
+                              'score': frequency * consistency - background,
+                              'frequency': frequency, 'consistency': consistency,
+                              'background': background})
+        cands.sort(key=lambda c: (-c['score'], c['idx'], c['bit']))
+        out[label] = cands if top is None else cands[:top]
+    return out
+
+
+def infer_mappings_batched(labeled_pairs) -> Tuple[Dict[str, List[int]], Dict[str, float]]:
+    """
+    Mapeo {label: [byteIdx, mask]} y confianza {label: 0..1} por etiqueta.
+
+    La máscara incluye los bits del byte ganador con puntuación cercana a la
+    mejor (p. ej. el nibble del D-pad); para botones suele ser un solo bit.
+    """
+    mapping: Dict[str, List[int]] = {}
+    confidence: Dict[str, float] = {}
+    for label, cands in score_candidates(labeled_pairs, top=None).items():
+        if not cands or cands[0]['score'] <= 0:
+            continue
+        best = cands[0]
+        mask = 0
+        for c in cands:
+            if c['idx'] == best['idx'] and c['score'] >= MASK_RATIO * best['score']:
+                mask |= c['mask']
+        mapping[label] = [best['idx'], mask]
+        confidence[label] = round(min(1.0, best['score']), 4)
+    return mapping, confidence
@@ -0,0 +1,340 @@
+"""
+Generador de carga: reportes HID sintéticos de N controles virtuales (Python)
+
+Sustituye a la simulación por eventos del daemon (SIMULATE=1). En lugar de
+emitir eventos ya decodificados genera reportes crudos con la disposición
+del mapeo activo y los pasa por ``Daemon._handle_report``, igual que los
+reportes del dispositivo, a la tasa de un DS4 real:
+
+- SIM_RATE: reportes/s por control (por defecto 250, USB; ~1000 en Bluetooth)
+- SIM_CONTROLLERS: nº de controles virtuales; con más de uno cada control
+  tiene su propio estado y sus eventos llevan ``device`` (``sim-0``, ...)
+- SIM_LENGTH: longitud de los reportes (64 USB; p. ej. 10 para los
+  reportes cortos de Bluetooth)
+
+Cada control alterna reposo (sticks en el centro con ruido de ±2 cuentas) y
+gestos: movimientos suaves de sticks, pulsaciones de gatillos, botones y
+cruceta de duración humana. Los bytes que el mapeo no usa llevan lo que
+lleva un DS4: id de reporte, contador, marca de tiempo, IMU con ruido y batería.
+
+La tasa objetivo y la conseguida (más los reportes descartados si el
+pipeline no da abasto) aparecen en ``io.load`` de /api/status.
+
+CLI de prueba de carga sin servidor::
+
+    python -m python.loadgen --controllers 8 --rate 1000 --seconds 10
+
+@module loadgen
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import struct
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+SIM_RATE = float(os.getenv('SIM_RATE', '250'))
+SIM_CONTROLLERS = int(os.getenv('SIM_CONTROLLERS', '1'))
+SIM_LENGTH = int(os.getenv('SIM_LENGTH', '64'))
+
+# Disposición USB del DS4 para los bytes que no suelen estar en el mapeo
+REPORT_ID = 0x01
+TIMESTAMP_BYTE = 10      # u16, unidades de 5.33 µs
+IMU_BYTE = 13            # giroscopio y acelerómetro: 6 × i16
+IMU = struct.Struct('<6h')
+BATTERY_BYTE = 30        # nivel en el nibble bajo, bit 4 = cable
+BATTERY = 0x08           # 80 %, sin cable
+TIMESTAMP = struct.Struct('<H')
+
+
+class _Gesture:
+    """Segmento de actividad de un control: [inicio, fin) en reportes."""
+
+    __slots__ = ('kind', 'target', 'start', 'end', 'phase', 'freq', 'amp')
+
+    def __init__(self, kind, target, start, end, phase=0.0, freq=0.0, amp=0.0):
+        self.kind, self.target, self.start, self.end = kind, target, start, end
+        self.phase, self.freq, self.amp = phase, freq, amp
+
+
+class SyntheticController:
+    """
+    Genera reportes crudos realistas para un mapeo ``{axes, buttons, dpad}``.
+
+    ``next_report()`` devuelve el siguiente reporte; el tiempo simulado
+    avanza ``1 / rate`` por reporte, así el contenido no depende de la
+    velocidad a la que se pidan.
+    """
+
+    def __init__(self, mapping: Dict[str, Any], rate: float = SIM_RATE, seed: int = 0, length: int = SIM_LENGTH):
+        if length < 1:
+            raise ValueError('length must be >= 1')
+        self.rate = rate
+        self.length = length
+        self._rnd = random.Random(seed)
+        self._k = 0
+        self._buf = bytearray(max(length, 64))
+        axes = {n: i for n, i in (mapping.get('axes') or {}).items() if isinstance(i, int) and 0 <= i < 64}
+        self._sticks = [(n, i) for n, i in axes.items() if 'stick' in n]
+        self._triggers = [(n, i) for n, i in axes.items() if 'stick' not in n]
+        self._buttons = [(n, b[0], b[1]) for n, b in (mapping.get('buttons') or {}).items()
+                         if isinstance(b, (list, tuple)) and len(b) == 2 and 0 <= b[0] < 64]
+        dpad = mapping.get('dpad') or {}
+        self._dpad = (dpad['byte'], dpad['mask']) if isinstance(dpad, dict) and \
+            isinstance(dpad.get('byte'), int) and 0 <= dpad['byte'] < 64 and isinstance(dpad.get('mask'), int) else None
+        used = set(axes.values()) | {b for _, b, _ in self._buttons}
+        if self._dpad:
+            used.add(self._dpad[0])
+        self._used = used
+        # contador en los bits altos del byte 7 si el mapeo sólo usa los bajos (PS, touchpad)
+        masks7 = 0
+        for _, b, m in self._buttons:
+            if b == 7:
+                masks7 |= m
+        self._counter = not masks7 & 0xfc
+        self._active: List[_Gesture] = []
+        self._next_gesture = 0
+        self._reset_rest()
+
+    def _reset_rest(self):
+        buf = self._buf
+        if self._free(0):
+            buf[0] = REPORT_ID
+        if len(buf) > BATTERY_BYTE and self._free(BATTERY_BYTE):
+            buf[BATTERY_BYTE] = BATTERY
+        for _, i in self._sticks:
+            buf[i] = 128
+        for _, i in self._triggers:
+            buf[i] = 0
+        if self._dpad:
+            b, m = self._dpad
+            buf[b] = (buf[b] & ~m & 0xff) | (8 & m)  # neutro
+
+    def _free(self, *idx) -> bool:
+        """True si ningún control del mapeo usa esos bytes."""
+        return self._used.isdisjoint(idx)
+
+    def _start_gesture(self):
+        rnd, k, rate = self._rnd, self._k, self.rate
+        choices = [c for c, ok in (('stick', self._sticks), ('trigger', self._triggers),
+                                   ('button', self._buttons), ('dpad', self._dpad)) if ok]
+        if not choices:
+            return
+        kind = rnd.choice(choices)
+        if kind == 'stick':
+            target = rnd.choice(self._sticks)[1]
+            g = _Gesture(kind, target, k, k + int(rate * rnd.uniform(0.3, 2.0)),
+                         rnd.uniform(0, 2 * math.pi), rnd.uniform(0.3, 2.0), rnd.uniform(30, 127))
+        elif kind == 'trigger':
+            target = rnd.choice(self._triggers)[1]
+            g = _Gesture(kind, target, k, k + int(rate * rnd.uniform(0.1, 0.8)), amp=rnd.uniform(80, 255))
+        elif kind == 'button':
+            target = rnd.choice(self._buttons)
+            g = _Gesture(kind, target, k, k + int(rate * rnd.uniform(0.05, 0.3)))
+        else:
+            g = _Gesture(kind, rnd.randrange(8), k, k + int(rate * rnd.uniform(0.1, 0.5)))
+        if any(a.kind == g.kind and a.target == g.target for a in self._active):
+            return
+        self._active.append(g)
+
+    def _end_gesture(self, g: _Gesture):
+        buf = self._buf
+        if g.kind == 'stick':
+            buf[g.target] = 128
+        elif g.kind == 'trigger':
+            buf[g.target] = 0
+        elif g.kind == 'button':
+            _, b, m = g.target
+            buf[b] &= ~m & 0xff
+        else:
+            b, m = self._dpad
+            buf[b] = (buf[b] & ~m & 0xff) | (8 & m)
+
+    def next_report(self) -> bytes:
+        k = self._k
+        rnd, buf, rate = self._rnd, self._buf, self.rate
+        if k >= self._next_gesture:
+            self._start_gesture()
+            self._next_gesture = k + max(1, int(rnd.expovariate(3.0) * rate))  # ~3 gestos/s
+        moving = set()
+        for g in list(self._active):
+            if k >= g.end:
+                self._active.remove(g)
+                self._end_gesture(g)
+                continue
+            if g.kind == 'stick':
+                t = (k - g.start) / rate
+                env = min(1.0, (k - g.start) / (0.05 * rate), (g.end - k) / (0.05 * rate))  # sale y vuelve al centro
+                pos = 128 + env * g.amp * math.sin(2 * math.pi * g.freq * t + g.phase)
+                buf[g.target] = max(0, min(255, int(pos)))
+                moving.add(g.target)
+            elif g.kind == 'trigger':
+                # rampa de 50 ms, mantener, soltar
+                ramp = min(1.0, (k - g.start) / (0.05 * rate), (g.end - k) / (0.05 * rate))
+                buf[g.target] = int(g.amp * ramp)
+            elif g.kind == 'button':
+                _, b, m = g.target
+                buf[b] |= m
+            else:
+                b, m = self._dpad
+                buf[b] = (buf[b] & ~m & 0xff) | (g.target & m)
+        for _, i in self._sticks:
+            if i not in moving:
+                buf[i] = 128 + rnd.randint(-2, 2)  # ruido del stick en reposo
+        if self._counter:
+            buf[7] = (buf[7] & 0x03) | ((k & 0x3f) << 2)
+        if self.length > TIMESTAMP_BYTE + 1 and self._free(TIMESTAMP_BYTE, TIMESTAMP_BYTE + 1):
+            TIMESTAMP.pack_into(buf, TIMESTAMP_BYTE, int(k / rate / 5.33e-6) & 0xffff)
+        if self.length >= IMU_BYTE + IMU.size and self._free(*range(IMU_BYTE, IMU_BYTE + IMU.size)):
+            IMU.pack_into(buf, IMU_BYTE, rnd.randint(-8, 8), rnd.randint(-8, 8), rnd.randint(-8, 8),
+                          rnd.randint(-40, 40), 8192 + rnd.randint(-40, 40), rnd.randint(-40, 40))
+        self._k = k + 1
+        return bytes(buf[:self.length])
+
+
+class LoadGenerator:
+    """
+    Entrega reportes de ``controllers`` controles a ``rate`` reportes/s cada uno.
+
+    Cada ``tick`` segundos calcula cuántos reportes tocan según el reloj y
+    los pasa a los manejadores; si el pipeline se retrasa más de
+    ``max_backlog`` segundos, los reportes atrasados se descartan (y se
+    cuentan) en lugar de acumularse.
+    """
+
+    def __init__(self, mapping: Dict[str, Any], rate: float = SIM_RATE, controllers: int = SIM_CONTROLLERS,
+                 length: int = SIM_LENGTH, seed: int = 0, tick: float = 0.002, max_backlog: float = 0.1):
+        if rate <= 0 or controllers < 1:
+            raise ValueError('rate must be > 0 and controllers >= 1')
+        self.rate = rate
+        self.tick = tick
+        self.max_backlog = max_backlog
+        self.controllers = [SyntheticController(mapping, rate, seed + i, length) for i in range(controllers)]
+        self.sent = 0
+        self.skipped = 0
+        self._t0: Optional[float] = None
+        self._elapsed = 0.0
+
+    async def run(self, handlers: List[Callable[[bytes], object]], duration: Optional[float] = None):
+        """Genera hasta ``duration`` segundos (None = sin fin); ``handlers[i]`` recibe el control i."""
+        pairs = list(zip(self.controllers, handlers))
+        due_sent = 0  # reportes por control ya entregados o descartados
+        cap = max(1, int(self.max_backlog * self.rate))
+        self._t0 = t0 = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                self._elapsed = now - t0
+                if duration is not None and self._elapsed >= duration:
+                    break
+                n = int(self._elapsed * self.rate) + 1 - due_sent
+                if n > cap:
+                    self.skipped += (n - cap) * len(pairs)
+                    due_sent += n - cap
+                    n = cap
+                for _ in range(n):
+                    for ctrl, handle in pairs:
+                        handle(ctrl.next_report())
+                self.sent += n * len(pairs)
+                due_sent += n
+                await asyncio.sleep(self.tick)
+        finally:
+            self._elapsed = time.monotonic() - t0
+
+    def stats(self) -> dict:
+        elapsed = self._elapsed
+        return {'controllers': len(self.controllers), 'targetRate': self.rate * len(self.controllers),
+                'achievedRate': round(self.sent / elapsed, 1) if elapsed else 0.0,
+                'reports': self.sent, 'skipped': self.skipped, 'elapsed': round(elapsed, 3)}
+
+
+async def simulate(daemon, emit: Callable[[dict], None], rate: Optional[float] = None,
+                   controllers: Optional[int] = None, length: Optional[int] = None,
+                   duration: Optional[float] = None) -> LoadGenerator:
+    """
+    Alimenta ``daemon`` con controles sintéticos hasta ``duration`` (None = sin fin).
+
+    Con un control los reportes van al propio daemon (mismos eventos que un
+    control real); con varios, o si ``daemon`` es un MultiDeviceDaemon, cada
+    uno tiene un Daemon hijo con eventos etiquetados con ``device``.
+    """
+    from python.daemon import Daemon
+    from python.metrics import tracer
+    controllers = controllers or SIM_CONTROLLERS
+    gen = LoadGenerator(daemon.mapping, rate or SIM_RATE, controllers, length or SIM_LENGTH)
+    daemon._io_mode = 'simulate'
+    daemon._load = gen
+    latency = daemon._latency
+    devices = getattr(daemon, 'devices', None)
+
+    def handler(target, target_emit):
+        def handle(report):
+            t = time.monotonic()
+            if tracer.enabled:
+                tracer.begin(t)
+            try:
+                target._handle_report(report, target_emit)
+            except Exception as e:
+                print('Error handling report:', e)
+            latency.add(time.monotonic() - t)
+        return handle
+
+    if controllers == 1 and devices is None:
+        handlers = [handler(daemon, emit)]
+    else:
+        handlers = []
+        for i in range(controllers):
+            dev_id = f'sim-{i}'
+            child = Daemon(daemon.mapping)
+            child._decoder = daemon.decoder
+            child._latency = latency
+
+            def tagged(ev, dev_id=dev_id):
+                ev['device'] = dev_id
+                emit(ev)
+
+            if devices is not None:
+                devices[dev_id] = child
+            emit({'type': 'device', 'id': dev_id, 'value': 1})
+            handlers.append(handler(child, tagged))
+    try:
+        await gen.run(handlers, duration)
+    finally:
+        if devices is not None:
+            for i in range(controllers):
+                devices.pop(f'sim-{i}', None)
+    return gen
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Soak-test Daemon.handle_report with synthetic controllers')
+    ap.add_argument('--controllers', type=int, default=SIM_CONTROLLERS)
+    ap.add_argument('--rate', type=float, default=SIM_RATE, help='reports/s per controller')
+    ap.add_argument('--length', type=int, default=SIM_LENGTH, help='report length (64 USB, 10 short BT)')
+    ap.add_argument('--seconds', type=float, default=10.0)
+    args = ap.parse_args(argv)
+
+    from python.daemon import Daemon
+    daemon = Daemon()
+    events = 0
+
+    def emit(_msg):
+        nonlocal events
+        events += 1
+
+    gen = asyncio.run(simulate(daemon, emit, args.rate, args.controllers, args.length, args.seconds))
+    st = gen.stats()
+    io = daemon.io_stats()
+    print(f"{st['controllers']} controller(s) @ {args.rate:g} Hz: target {st['targetRate']:g} reports/s, "
+          f"achieved {st['achievedRate']:g} reports/s ({st['reports']} reports, {st['skipped']} skipped)")
+    per_sec = events / st['elapsed'] if st['elapsed'] else 0.0
+    print(f"{events} events ({per_sec:.0f}/s), handle_report "
+          f"avg {io['latencyAvgMs']} ms, max {io['latencyMaxMs']} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
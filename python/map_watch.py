@@ -0,0 +1,130 @@
+"""
+Vigilancia de .ds4map.json para recarga en caliente (Python)
+
+Usa inotify (vía ctypes, sólo Linux) vigilando el directorio del archivo,
+lo que cubre tanto escrituras directas como reemplazos por rename. Donde
+inotify no está disponible recurre a sondear mtime/tamaño con ``os.stat``.
+
+Los cambios se agrupan con un pequeño debounce porque los editores suelen
+escribir el archivo en varios pasos.
+
+@module map_watch
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+from typing import Callable, Optional
+
+# Constantes de <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+def _inotify_open(directory: str) -> Optional[int]:
+    """Devuelve un fd inotify que vigila ``directory`` o None si no hay soporte."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def _stat_key(path: str):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class MapWatcher:
+    """
+    Llama a ``on_change()`` en el event loop cuando cambia ``path``.
+
+    ``mode`` queda en 'inotify' o 'poll' al ejecutar ``run()``; se puede
+    forzar el sondeo pasando ``use_inotify=False``.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], None], interval: float = 1.0,
+                 debounce: float = 0.05, use_inotify: bool = True):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.interval = interval
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self.mode: Optional[str] = None
+        self._pending: Optional[asyncio.TimerHandle] = None
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop):
+        if self._pending is None:
+            self._pending = loop.call_later(self.debounce, self._fire)
+
+    def _fire(self):
+        self._pending = None
+        try:
+            self.on_change()
+        except Exception as e:
+            print('Error recargando mapeo:', e)
+
+    async def run(self):
+        fd = _inotify_open(os.path.dirname(self.path)) if self.use_inotify else None
+        if fd is not None:
+            await self._run_inotify(fd)
+        else:
+            await self._run_poll()
+
+    async def _run_inotify(self, fd: int):
+        self.mode = 'inotify'
+        loop = asyncio.get_running_loop()
+        name = os.fsencode(os.path.basename(self.path))
+
+        def on_readable():
+            try:
+                buf = os.read(fd, 4096)
+            except BlockingIOError:
+                return
+            off = 0
+            while off + _EVENT.size <= len(buf):
+                _, _, _, length = _EVENT.unpack_from(buf, off)
+                ev_name = buf[off + _EVENT.size:off + _EVENT.size + length].rstrip(b'\0')
+                off += _EVENT.size + length
+                if ev_name == name:
+                    self._schedule(loop)
+                    return
+
+        loop.add_reader(fd, on_readable)
+        try:
+            await asyncio.Event().wait()  # hasta que cancelen la tarea
+        finally:
+            loop.remove_reader(fd)
+            os.close(fd)
+            if self._pending is not None:
+                self._pending.cancel()
+
+    async def _run_poll(self):
+        self.mode = 'poll'
+        last = _stat_key(self.path)
+        while True:
+            await asyncio.sleep(self.interval)
+            key = _stat_key(self.path)
+            if key is not None and key != last:
+                self._fire()
+            last = key
@@ -0,0 +1,216 @@
+"""
+Trazas de latencia y contadores del camino HID -> WebSocket (Python)
+
+Con TRACE_LATENCY=1 cada reporte lleva la marca monotónica de su lectura
+(``tracer.begin``) y se registra el tiempo transcurrido desde ella al
+llegar a cada etapa:
+
+- decode: reporte decodificado (incluye la espera en la cola del modo thread)
+- emit: evento entregado a broadcast
+- enqueue: evento serializado y encolado en todos los clientes
+- send: ``ws.send_*`` completado, por cliente
+
+Cada etapa alimenta un histograma log2 en microsegundos (añadir una muestra
+es un ``bit_length`` y un incremento) del que salen p50/p99/max. Con la
+traza desactivada el hot path sólo comprueba ``tracer.enabled``.
+
+Los contadores (reportes, eventos, descartes, fallos de envío) están siempre
+activos; las tasas por segundo se calculan entre dos lecturas de métricas.
+
+@module metrics
+"""
+
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+TRACE_LATENCY = os.getenv('TRACE_LATENCY', '0') in ('1', 'true', 'True')
+
+STAGES = ('decode', 'emit', 'enqueue', 'send')
+
+
+class Histogram:
+    """Histograma de latencias con cubetas potencia de 2 en µs (cubeta i: < 2^i µs)."""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    BUCKETS = 32  # la última cubeta acumula todo lo que supera ~18 min
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, dt: float):
+        i = int(dt * 1e6).bit_length()
+        self.counts[i if i < 32 else 31] += 1
+        self.count += 1
+        self.total += dt
+        if dt > self.max:
+            self.max = dt
+
+    def percentile(self, q: float) -> float:
+        """Cota superior (s) del percentil ``q`` (0-1), limitada por el máximo observado."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def buckets(self) -> List[tuple]:
+        """Cubetas acumuladas ``(le_segundos, cuenta)`` hasta la última no vacía."""
+        out, seen = [], 0
+        last = max((i for i, c in enumerate(self.counts) if c), default=-1)
+        for i in range(last + 1):
+            seen += self.counts[i]
+            out.append(((1 << i) / 1e6, seen))
+        return out
+
+    def stats(self) -> dict:
+        avg = self.total / self.count if self.count else 0.0
+        return {'count': self.count, 'avgMs': round(avg * 1000, 3),
+                'p50Ms': round(self.percentile(0.5) * 1000, 3),
+                'p99Ms': round(self.percentile(0.99) * 1000, 3),
+                'maxMs': round(self.max * 1000, 3)}
+
+
+class Tracer:
+    """Marca de lectura del reporte en curso + un histograma por etapa."""
+
+    __slots__ = ('enabled', 't_read', 'stages')
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.t_read = 0.0
+        self.stages: Dict[str, Histogram] = {s: Histogram() for s in STAGES}
+
+    def begin(self, t_read: Optional[float] = None):
+        """Fija la marca de lectura del reporte que se va a procesar."""
+        self.t_read = time.monotonic() if t_read is None else t_read
+
+    def mark(self, stage: str, origin: Optional[float] = None):
+        """Registra el tiempo desde la lectura (o desde ``origin``) hasta ahora."""
+        self.stages[stage].add(time.monotonic() - (self.t_read if origin is None else origin))
+
+    def reset(self):
+        self.stages = {s: Histogram() for s in STAGES}
+
+
+class Counters:
+    """Contadores globales del servidor, siempre activos."""
+
+    __slots__ = ('events', 'send_failures', 'slow_disconnects', '_last')
+
+    def __init__(self):
+        self.events = 0
+        self.send_failures = 0
+        self.slow_disconnects = 0
+        self._last = None  # (t, reportes, eventos, tasas) de la lectura anterior
+
+    def rates(self, reports: int, min_interval: float = 0.5) -> dict:
+        """reportes/s y eventos/s desde la lectura anterior (o la última tasa calculada)."""
+        now = time.monotonic()
+        last = self._last
+        if last is None:
+            self._last = (now, reports, self.events, {'reportsPerSec': 0.0, 'eventsPerSec': 0.0})
+            return self._last[3]
+        t, r, e, rates = last
+        if now - t >= min_interval:
+            rates = {'reportsPerSec': round((reports - r) / (now - t), 1),
+                     'eventsPerSec': round((self.events - e) / (now - t), 1)}
+            self._last = (now, reports, self.events, rates)
+        return rates
+
+
+tracer = Tracer(TRACE_LATENCY)
+counters = Counters()
+
+
+def _io_totals(io: dict) -> Dict[str, int]:
+    """Suma reportes y descartes de io_stats() (incluidos los dispositivos de HID_MULTI)."""
+    queue = io.get('queue') or {}
+    totals = {'reports': io.get('reports', 0), 'dropped': queue.get('dropped', 0),
+              'coalesced': queue.get('coalesced', 0)}
+    for dev in (io.get('devices') or {}).values():
+        for k, v in _io_totals(dev).items():
+            totals[k] += v
+    return totals
+
+
+def collect(io: Optional[dict], groups: Dict[str, Iterable]) -> dict:
+    """
+    Instantánea JSON de métricas.
+
+    ``io`` es ``Daemon.io_stats()`` (None si el daemon no está activo) y
+    ``groups`` los conjuntos de ClientChannel por tipo de cliente.
+    """
+    totals = _io_totals(io or {})
+    clients = [{'id': ch.id, 'group': name, **ch.stats()}
+               for name, group in groups.items() for ch in list(group)]
+    return {
+        'tracing': tracer.enabled,
+        'reports': totals['reports'],
+        'events': counters.events,
+        **counters.rates(totals['reports']),
+        'droppedReports': totals['dropped'],
+        'coalescedReports': totals['coalesced'],
+        'sendFailures': counters.send_failures,
+        'slowClientDisconnects': counters.slow_disconnects,
+        'clients': clients,
+        'latency': {stage: h.stats() for stage, h in tracer.stages.items()},
+    }
+
+
+def _metric(lines: List[str], name: str, kind: str, help_text: str, samples):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    for labels, value in samples:
+        lines.append(f'{name}{labels} {value}')
+
+
+def _labels(**labels) -> str:
+    """``{k="v",...}`` con ``\\``, ``"`` y saltos de línea escapados como pide el formato de texto."""
+    def esc(v) -> str:
+        return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{esc(v)}"' for k, v in labels.items()) + '}'
+
+
+def to_prometheus(snapshot: dict, prefix: str = 'ds4') -> str:
+    """Formato de texto de Prometheus (0.0.4) a partir de ``collect()``."""
+    lines: List[str] = []
+    _metric(lines, f'{prefix}_reports_total', 'counter', 'HID reports handled', [('', snapshot['reports'])])
+    _metric(lines, f'{prefix}_events_total', 'counter', 'Input events broadcast', [('', snapshot['events'])])
+    _metric(lines, f'{prefix}_reports_dropped_total', 'counter', 'Reports dropped by the HID queue',
+            [('', snapshot['droppedReports'])])
+    _metric(lines, f'{prefix}_reports_coalesced_total', 'counter', 'Reports coalesced by the HID queue',
+            [('', snapshot['coalescedReports'])])
+    _metric(lines, f'{prefix}_send_failures_total', 'counter', 'WebSocket send failures',
+            [('', snapshot['sendFailures'])])
+    _metric(lines, f'{prefix}_slow_client_disconnects_total', 'counter',
+            'Clients disconnected for queue overflow or lag', [('', snapshot['slowClientDisconnects'])])
+    clients = snapshot['clients']
+    _metric(lines, f'{prefix}_client_queue_depth', 'gauge', 'Pending messages per WebSocket client',
+            [(_labels(client=c['id'], group=c['group']), c['depth']) for c in clients])
+    _metric(lines, f'{prefix}_client_sent_total', 'counter', 'Messages sent per WebSocket client',
+            [(_labels(client=c['id'], group=c['group']), c['sent']) for c in clients])
+    sinks = [sk for sk in snapshot.get('sinks', ()) if 'depth' in sk]  # sinks en cola
+    if sinks:
+        _metric(lines, f'{prefix}_sink_queue_depth', 'gauge', 'Pending events per queued event sink',
+                [(_labels(sink=sk['name']), sk['depth']) for sk in sinks])
+        _metric(lines, f'{prefix}_sink_dropped_total', 'counter', 'Events dropped by a full event sink queue',
+                [(_labels(sink=sk['name']), sk['dropped']) for sk in sinks])
+    name = f'{prefix}_latency_seconds'
+    lines.append(f'# HELP {name} Time since the HID read at each pipeline stage')
+    lines.append(f'# TYPE {name} histogram')
+    for stage, h in tracer.stages.items():
+        for le, count in h.buckets():
+            lines.append(f'{name}_bucket{_labels(stage=stage, le=f"{le:g}")} {count}')
+        lines.append(f'{name}_bucket{_labels(stage=stage, le="+Inf")} {h.count}')
+        lines.append(f'{name}_sum{_labels(stage=stage)} {h.total:.9f}')
+        lines.append(f'{name}_count{_labels(stage=stage)} {h.count}')
+    return '\n'.join(lines) + '\n'
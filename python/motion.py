@@ -0,0 +1,211 @@
+"""
+Sensores de movimiento (giroscopio/acelerómetro) y batería (Python)
+
+Se declaran en ``.ds4map.json`` junto a ``axes`` y ``buttons``::
+
+    "motion": {"gyro_x": 13, "gyro_y": 15, "gyro_z": 17,
+               "accel_x": 19, "accel_y": 21, "accel_z": 23},
+    "battery": {"byte": 30, "mask": 15, "max": 10, "charging": 16},
+    "motionStream": {"rateHz": 60, "mode": "average", "reportHz": 250}
+
+- motion: índice del primer byte de cada campo int16 little-endian. Los
+  campos se compilan en un único ``struct.Struct`` (con bytes de relleno
+  entre campos no contiguos), así cada reporte se decodifica con un
+  ``unpack_from`` sin trabajo Python por byte.
+- battery: nivel en ``byte & mask`` (0..``max``, se normaliza a 0..1) y,
+  opcionalmente, el bit ``charging`` (cable conectado). Se lee una vez
+  cada ``BATTERY_INTERVAL`` segundos de reportes (evita el parpadeo entre
+  dos niveles) y se emite sólo al cambiar:
+  ``{"type": "battery", "id": "battery", "value": 0.8, "charging": 1}``.
+- motionStream: los sensores se decodifican en cada reporte (250-1000 Hz)
+  pero se emiten a ``rateHz`` (por defecto 60; 0 = cada reporte) como un
+  único evento ``{"type": "motion", "id": "imu", "value": {campo: valor}}``;
+  ``mode`` ``average`` promedia los reportes de cada intervalo (menos
+  ruido) y ``decimate`` envía el último valor crudo.
+
+Los intervalos se cuentan en reportes, no con el reloj: con ``reportHz``
+(la frecuencia nominal del control, 250 en el DS4 por USB) se emite uno de
+cada ``round(reportHz / rateHz)`` reportes. Así los mismos reportes dan
+siempre los mismos eventos, sin depender de cómo lleguen (grabaciones
+reproducidas, hilo lector con retraso).
+
+El mapeo por defecto no incluye ``motion`` ni ``battery``: un flujo
+continuo de 60 eventos/s llenaría el historial de ``StateSync`` en poco
+más de un minuto. ``DS4_MOTION`` y ``DS4_BATTERY`` tienen la disposición
+del DS4 para copiarla en ``.ds4map.json``.
+
+Un reporte más corto que los campos (Bluetooth reducido) no produce
+eventos de movimiento. ``sensors.detect_sensor_candidates`` sigue sirviendo
+para encontrar estos índices en un control desconocido.
+
+@module motion
+"""
+
+import math
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+MODES = ('average', 'decimate')
+DEFAULT_RATE_HZ = 60.0
+# Reportes por segundo del DS4 por USB (para convertir rateHz en nº de reportes)
+DEFAULT_REPORT_HZ = 250.0
+# Segundos (de reportes) entre lecturas del byte de batería
+BATTERY_INTERVAL = 1.0
+
+# Disposición del DS4 (USB): primer byte de cada int16 y byte de batería
+DS4_MOTION = {'gyro_x': 13, 'gyro_y': 15, 'gyro_z': 17, 'accel_x': 19, 'accel_y': 21, 'accel_z': 23}
+DS4_BATTERY = {'byte': 30, 'mask': 0x0f, 'max': 10, 'charging': 0x10}
+
+
+def _rate(value, field: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ValueError(f'{field} must be a non-negative number')
+    return value
+
+
+def _index(value, field: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError(f'{field} must be a non-negative integer')
+    return value
+
+
+def _layout(fields: Dict[str, Any]) -> Tuple[Tuple[str, ...], struct.Struct, int]:
+    """Ids ordenados por posición, struct con los int16 y relleno, y byte inicial."""
+    items = sorted(((_index(off, f'motion.{name}'), name) for name, off in fields.items()))
+    start = pos = items[0][0]
+    fmt = '<'
+    for off, name in items:
+        if off < pos:
+            raise ValueError(f'motion.{name} overlaps the previous field')
+        if off > pos:
+            fmt += f'{off - pos}x'
+        fmt += 'h'
+        pos = off + 2
+    return tuple(name for _, name in items), struct.Struct(fmt), start
+
+
+class MotionDecoder:
+    """Decodificación de IMU y batería por reporte + flujo de movimiento submuestreado."""
+
+    __slots__ = ('ids', 'every', 'average', '_unpack', '_start', '_end', '_battery', '_battery_every',
+                 '_window', '_count', '_last', '_battery_count', '_battery_state')
+
+    def __init__(self, fields: Optional[Dict[str, Any]] = None, battery: Optional[Dict[str, Any]] = None,
+                 rate_hz: float = DEFAULT_RATE_HZ, mode: str = 'average', report_hz: float = DEFAULT_REPORT_HZ):
+        if mode not in MODES:
+            raise ValueError(f'motionStream.mode must be one of {", ".join(MODES)}')
+        rate_hz = _rate(rate_hz, 'motionStream.rateHz')
+        if not _rate(report_hz, 'motionStream.reportHz'):
+            raise ValueError('motionStream.reportHz must be > 0')
+        if fields:
+            self.ids, st, self._start = _layout(fields)
+            self._unpack = st.unpack_from
+            self._end = self._start + st.size
+        else:
+            self.ids, self._unpack, self._start, self._end = (), None, 0, 0
+        self._battery = self._battery_config(battery) if battery else None
+        self.every = max(1, round(report_hz / rate_hz)) if rate_hz else 1  # reportes por evento
+        self.average = mode == 'average' and self.every > 1
+        self._battery_every = max(1, round(report_hz * BATTERY_INTERVAL))
+        self._window: List[Tuple[int, ...]] = []  # muestras del intervalo en curso (modo average)
+        self._count = 0                            # reportes hasta el próximo evento de movimiento
+        self._last: Optional[Tuple[int, ...]] = None
+        self._battery_count = 0                    # reportes hasta la próxima lectura de batería
+        self._battery_state: Optional[Tuple[float, Optional[int]]] = None
+
+    @staticmethod
+    def _battery_config(conf: Dict[str, Any]) -> Tuple[int, int, int, int]:
+        if not isinstance(conf, dict):
+            raise ValueError('battery must be an object {byte, mask, max, charging}')
+        byte = _index(conf.get('byte'), 'battery.byte')
+        mask = _index(conf.get('mask', 0xff), 'battery.mask') & 0xff
+        top = _index(conf.get('max', mask), 'battery.max')
+        charging = _index(conf.get('charging', 0), 'battery.charging') & 0xff
+        if not mask or not top:
+            raise ValueError('battery.mask and battery.max must be > 0')
+        return byte, mask, top, charging
+
+    def decode(self, report: bytes) -> Optional[Tuple[int, ...]]:
+        """Valores int16 crudos en el orden de ``ids`` (None si el reporte es corto)."""
+        if self._unpack is None or len(report) < self._end:
+            return None
+        return self._unpack(report, self._start)
+
+    def battery(self, report: bytes) -> Optional[Tuple[float, Optional[int]]]:
+        """(nivel 0..1, cargando 0/1 o None) o None si no hay batería en el reporte."""
+        conf = self._battery
+        if conf is None or len(report) <= conf[0]:
+            return None
+        byte, mask, top, charging = conf
+        b = report[byte]
+        level = round(min(b & mask, top) / top, 2)
+        return level, (1 if b & charging else 0) if charging else None
+
+    def _battery_events(self, report: bytes) -> List[dict]:
+        st = self.battery(report)
+        if st is None or st == self._battery_state:
+            return []
+        self._battery_state = st
+        ev = {'type': 'battery', 'id': 'battery', 'value': st[0]}
+        if st[1] is not None:
+            ev['charging'] = st[1]
+        return [ev]
+
+    def initial_events(self, report: bytes) -> List[dict]:
+        """Estado de batería del primer reporte (el movimiento llega con el flujo)."""
+        self._last = self.decode(report)
+        return self._battery_events(report) if self._battery is not None else []
+
+    def update(self, report: bytes) -> List[dict]:
+        """Acumula un reporte y devuelve los eventos a emitir (movimiento y/o batería)."""
+        events = []
+        if self._battery is not None:
+            if not self._battery_count:
+                self._battery_count = self._battery_every
+                events = self._battery_events(report)
+            self._battery_count -= 1
+        if self._unpack is None or len(report) < self._end:
+            return events
+        vals = self._last = self._unpack(report, self._start)
+        if self.average:
+            self._window.append(vals)
+        if not self._count:
+            self._count = self.every
+            if self.average:
+                window = self._window
+                n = len(window)
+                value = dict(zip(self.ids, [round(sum(col) / n, 2) for col in zip(*window)]))
+                window.clear()
+            else:
+                value = dict(zip(self.ids, vals))
+            events.append({'type': 'motion', 'id': 'imu', 'value': value})
+        self._count -= 1
+        return events
+
+    def to_dict(self) -> dict:
+        """Último valor crudo de cada campo y estado de la batería (para /api/status)."""
+        out: Dict[str, Any] = {}
+        if self.ids:
+            out['motion'] = dict(zip(self.ids, self._last)) if self._last is not None else None
+        if self._battery is not None:
+            st = self._battery_state
+            out['battery'] = None if st is None else {'level': st[0], 'charging': st[1]}
+        return out
+
+
+def compile_motion(mapping: Dict[str, Any]) -> Optional[MotionDecoder]:
+    """MotionDecoder para ``motion``/``battery``/``motionStream`` del mapeo, o None si no hay."""
+    fields = mapping.get('motion')
+    battery = mapping.get('battery')
+    if not fields and not battery:
+        return None
+    if fields is not None and not isinstance(fields, dict):
+        raise ValueError('motion must be an object {id: byteIndex}')
+    stream = mapping.get('motionStream') or {}
+    if not isinstance(stream, dict):
+        raise ValueError('motionStream must be an object {rateHz, mode, reportHz}')
+    unknown = set(stream) - {'rateHz', 'mode', 'reportHz'}
+    if unknown:
+        raise ValueError(f'motionStream: unknown field {sorted(unknown)[0]!r}')
+    return MotionDecoder(fields, battery, stream.get('rateHz', DEFAULT_RATE_HZ), stream.get('mode', 'average'),
+                         stream.get('reportHz', DEFAULT_REPORT_HZ))
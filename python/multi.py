@@ -0,0 +1,131 @@
+"""
+Soporte multi-control: un lector y un decoder por dispositivo (Python)
+
+MultiDeviceDaemon enumera todos los dispositivos DualShock-like y abre cada
+uno con su propio Daemon hijo (estado previo, reportes recientes, hilo
+lector y cola propios). Los eventos se etiquetan con ``device`` y la
+conexión/desconexión se notifica con eventos ``{'type': 'device', 'id', 'value': 1|0}``.
+
+Los dispositivos nuevos se detectan re-enumerando cada HID_RESCAN segundos;
+los desconectados terminan su lector y se eliminan.
+
+Activar con HID_MULTI=1. Con WORKERS > 1 cada hijo pasa sus reportes a
+``on_report``: la memoria compartida guarda el último reporte de cualquier
+control, y los workers siembran con él su instantánea y /api/status.
+
+@module multi
+"""
+
+import asyncio
+import os
+from typing import Dict, Optional, Any
+
+from python import daemon as _daemon
+from python.daemon import Daemon
+
+HID_MULTI = os.getenv('HID_MULTI', '0') in ('1', 'true', 'True')
+RESCAN_INTERVAL = float(os.getenv('HID_RESCAN', '2.0'))
+
+
+def is_controller(info: dict) -> bool:
+    """Mismo criterio que Daemon.start para reconocer un DualShock."""
+    return 'Sony' in (info.get('manufacturer') or '') or 'Wireless Controller' in (info.get('product') or '')
+
+
+def device_id(info: dict) -> str:
+    """Id estable del dispositivo: número de serie o, si falta, la ruta HID."""
+    serial = info.get('serial_number')
+    if serial:
+        return serial
+    path = info.get('path')
+    return path.decode(errors='replace') if isinstance(path, bytes) else str(path)
+
+
+class MultiDeviceDaemon(Daemon):
+    """Daemon que sirve todos los controles conectados a la vez."""
+
+    def __init__(self, mapping: Optional[Dict[str, Any]] = None):
+        super().__init__(mapping)
+        self.devices: Dict[str, Daemon] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def _run(self, emit, io_mode):
+        if _daemon.SIMULATE:
+            await self._simulate(emit)
+            return
+        try:
+            import hid
+        except Exception as e:
+            print('HID error or not available:', e)
+            await self._simulate(emit)
+            return
+        try:
+            while True:
+                await self._rescan(hid, emit)
+                await asyncio.sleep(RESCAN_INTERVAL)
+        finally:
+            for task in list(self._tasks.values()):
+                task.cancel()
+
+    async def _rescan(self, hid, emit):
+        """Abre un lector para cada control nuevo encontrado por hid.enumerate()."""
+        for info in await asyncio.to_thread(hid.enumerate):
+            if not is_controller(info):
+                continue
+            dev_id = device_id(info)
+            if dev_id not in self._tasks:
+                self._tasks[dev_id] = asyncio.create_task(self._serve(hid, info, dev_id, emit))
+
+    async def _serve(self, hid, info, dev_id, emit):
+        """Lee un dispositivo hasta que se desconecta o se cancela la tarea."""
+        child = Daemon(self.mapping)
+        child._decoder = self._decoder
+        # WORKERS: el último reporte de cualquier control llega a la memoria compartida
+        child.on_report = self.on_report
+
+        def tagged(ev):
+            ev['device'] = dev_id
+            emit(ev)
+
+        h = None
+        try:
+            print('Opening HID:', info)
+            h = hid.device()
+            h.open_path(info['path'])
+            child._device = h
+            self.devices[dev_id] = child
+            emit({'type': 'device', 'id': dev_id, 'value': 1})
+            await child._read_threaded(h, tagged)
+        except Exception as e:
+            print('HID device lost:', dev_id, e)
+        finally:
+            self._tasks.pop(dev_id, None)
+            if self.devices.pop(dev_id, None) is not None:
+                emit({'type': 'device', 'id': dev_id, 'value': 0})
+            if h is not None:
+                try:
+                    h.close()
+                except Exception:
+                    pass
+
+    def _apply_mapping(self, mapping_obj, decoder):
+        super()._apply_mapping(mapping_obj, decoder)
+        for child in self.devices.values():
+            child._apply_mapping(mapping_obj, decoder)
+
+    def io_stats(self) -> dict:
+        """Contadores propios más los de cada dispositivo en ``devices`` (los suma /api/metrics)."""
+        st = super().io_stats()
+        st['devices'] = {dev_id: child.io_stats() for dev_id, child in self.devices.items()}
+        return st
+
+    def get_status(self):
+        """Estado del daemon más, por dispositivo, su estado decodificado y últimos reportes.
+
+        Los contadores de E/S de cada dispositivo van en ``io['devices']``
+        (``io_stats``); el mapeo y la recarga son los del daemon padre.
+        """
+        st = super().get_status()
+        st['devices'] = {dev_id: {k: v for k, v in child.get_status().items() if k not in ('mapping', 'io', 'reload')}
+                         for dev_id, child in self.devices.items()}
+        return st
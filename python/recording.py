@@ -0,0 +1,245 @@
+"""
+Grabación y reproducción de flujos de reportes HID crudos (Python)
+
+Formato de archivo (little-endian), pensado para leerse con ``mmap``:
+
+    cabecera  magic b'DS4R' | versión u16 | ancho u16 | inicio_ns u64 | info_len u32
+    info      JSON con datos del dispositivo (vendor/product id, nombre, serie)
+    relleno   hasta múltiplo de 16 bytes
+    registros t_ns u64 | longitud u16 | reporte relleno con ceros hasta ``ancho``
+
+``t_ns`` es el tiempo monotónico desde el inicio de la grabación e
+``inicio_ns`` el reloj de pared al empezar. Todos los registros miden lo
+mismo, así que el registro i está en ``data_offset + i * record_size`` y un
+registro final incompleto (grabación interrumpida) simplemente se ignora.
+
+Uso con el daemon:
+
+- HID_RECORD=archivo.ds4r graba lo que lee el daemon del dispositivo
+- HID_REPLAY=archivo.ds4r reproduce una grabación en lugar de abrir el
+  dispositivo o simular (HID_REPLAY_SPEED: 1 = tiempo real, 2 = doble
+  velocidad, 0 = lo más rápido posible)
+
+CLI: ``python -m python.recording info|replay archivo.ds4r``
+
+@module recording
+"""
+
+import argparse
+import asyncio
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+MAGIC = b'DS4R'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQI')
+RECORD = struct.Struct('<QH')
+ALIGN = 16
+
+# Campos de hid.enumerate() que se guardan en la cabecera
+DEVICE_FIELDS = ('vendor_id', 'product_id', 'manufacturer_string', 'product_string',
+                 'serial_number', 'interface_number')
+
+
+def device_info(dev: Optional[dict]) -> dict:
+    """Subconjunto serializable de una entrada de ``hid.enumerate()``."""
+    if not dev:
+        return {}
+    info = {k: dev[k] for k in DEVICE_FIELDS if dev.get(k) not in (None, '')}
+    path = dev.get('path')
+    if path is not None:
+        info['path'] = path.decode(errors='replace') if isinstance(path, bytes) else str(path)
+    return info
+
+
+class ReportRecorder:
+    """Escribe reportes con marca de tiempo en un archivo de grabación."""
+
+    def __init__(self, path: str, width: int = 64, device: Optional[dict] = None):
+        if not 1 <= width <= 0xffff:
+            raise ValueError('width must be between 1 and 65535')
+        self.path = path
+        self.width = width
+        self.count = 0
+        self._t0 = time.monotonic_ns()
+        self._buf = bytearray(RECORD.size + width)
+        self._f = open(path, 'wb')
+        info = json.dumps(device_info(device)).encode()
+        header = HEADER.pack(MAGIC, VERSION, width, time.time_ns(), len(info)) + info
+        self._f.write(header + bytes(-len(header) % ALIGN))
+
+    def write(self, report: bytes, t_ns: Optional[int] = None):
+        """Añade un reporte (se trunca a ``width``); ``t_ns`` es monotónico absoluto."""
+        n = min(len(report), self.width)
+        buf = self._buf
+        t = (time.monotonic_ns() if t_ns is None else t_ns) - self._t0
+        RECORD.pack_into(buf, 0, max(0, t), n)
+        buf[RECORD.size:RECORD.size + n] = report[:n]
+        if n < self.width:
+            buf[RECORD.size + n:] = bytes(self.width - n)
+        self._f.write(buf)
+        self.count += 1
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """Grabación abierta con ``mmap``: acceso aleatorio e iteración sin copiar el archivo."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            head = os.pread(f.fileno(), HEADER.size, 0)
+            if len(head) < HEADER.size:
+                raise ValueError(f'{path}: not a report recording')
+            magic, version, width, start_ns, info_len = HEADER.unpack(head)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{path}: not a report recording (version {VERSION})')
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.width = width
+        self.start_ns = start_ns
+        self.device = json.loads(self._mm[HEADER.size:HEADER.size + info_len] or b'{}')
+        end = HEADER.size + info_len
+        self.data_offset = end + (-end % ALIGN)
+        self.record_size = RECORD.size + width
+        self._count = max(0, len(self._mm) - self.data_offset) // self.record_size
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, i: int) -> Tuple[int, bytes]:
+        off = self.data_offset + i * self.record_size
+        t, n = RECORD.unpack_from(self._mm, off)
+        off += RECORD.size
+        return t, self._mm[off:off + n]
+
+    def __getitem__(self, i: int) -> Tuple[int, bytes]:
+        """``(t_ns, reporte)`` del registro i."""
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('Recording index out of range')
+        return self._record(i)
+
+    def __iter__(self) -> Iterator[Tuple[int, bytes]]:
+        record = self._record
+        for i in range(self._count):
+            yield record(i)
+
+    @property
+    def duration(self) -> float:
+        """Segundos entre el primer y el último reporte."""
+        return (self[-1][0] - self[0][0]) / 1e9 if self._count else 0.0
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def replay_sync(recording: Recording, handle: Callable[[bytes], object],
+                speed: Optional[float] = None) -> int:
+    """
+    Pasa cada reporte a ``handle`` y devuelve cuántos se reprodujeron.
+
+    ``speed`` None o 0 reproduce lo más rápido posible; 1.0 en tiempo real,
+    2.0 al doble de velocidad, etc.
+    """
+    if not speed:
+        n = 0
+        for _, report in recording:
+            handle(report)
+            n += 1
+        return n
+    start = time.monotonic()
+    t0 = None
+    n = 0
+    for t, report in recording:
+        if t0 is None:
+            t0 = t
+        delay = start + (t - t0) / 1e9 / speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        handle(report)
+        n += 1
+    return n
+
+
+async def replay(recording: Recording, handle: Callable[[bytes], object],
+                 speed: Optional[float] = 1.0, yield_every: int = 256) -> int:
+    """
+    Versión asyncio de ``replay_sync``.
+
+    En modo rápido cede el event loop cada ``yield_every`` reportes para que
+    los clientes sigan recibiendo eventos.
+    """
+    start = time.monotonic()
+    t0 = None
+    n = 0
+    for t, report in recording:
+        if speed:
+            if t0 is None:
+                t0 = t
+            delay = start + (t - t0) / 1e9 / speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif n % yield_every == yield_every - 1:
+            await asyncio.sleep(0)
+        handle(report)
+        n += 1
+    return n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Inspect or replay a raw HID report recording')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    p_info = sub.add_parser('info', help='show header and record count')
+    p_info.add_argument('path')
+    p_replay = sub.add_parser('replay', help='replay through Daemon.handle_report and report throughput')
+    p_replay.add_argument('path')
+    p_replay.add_argument('--speed', type=float, default=0.0, help='0 = as fast as possible')
+    args = ap.parse_args(argv)
+
+    with Recording(args.path) as rec:
+        if args.cmd == 'info':
+            print(json.dumps({'reports': len(rec), 'width': rec.width, 'duration': rec.duration,
+                              'start_ns': rec.start_ns, 'device': rec.device,
+                              'bytes': os.path.getsize(args.path)}, indent=2))
+            return 0
+        from python.daemon import Daemon
+        daemon = Daemon()
+        events = 0
+
+        def emit(_msg):
+            nonlocal events
+            events += 1
+
+        t = time.perf_counter()
+        n = replay_sync(rec, lambda r: daemon.handle_report(r, emit), args.speed)
+        elapsed = time.perf_counter() - t
+        print(f'{n} reports, {events} events in {elapsed:.3f} s '
+              f'({n / elapsed if elapsed else 0:.0f} reports/s)')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
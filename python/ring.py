@@ -0,0 +1,104 @@
+"""
+Buffer circular de reportes crudos de ancho fijo (Python)
+
+Los reportes se copian en un ``bytearray`` preasignado de ``depth * width``
+bytes, con la longitud real de cada uno en un ``array('H')``. Añadir un
+reporte no crea listas ni enteros Python por byte; leer las últimas N
+entradas es una o dos copias contiguas del buffer.
+
+Los bytes de una ranura más allá de la longitud del reporte valen 0, igual
+que el relleno que usa ``sensors.detect_sensor_candidates`` para reportes
+más cortos.
+
+@module ring
+"""
+
+from array import array
+from typing import List, Optional, Tuple
+
+
+class ReportRing:
+    """Historial circular de los últimos ``depth`` reportes de hasta ``width`` bytes."""
+
+    __slots__ = ('width', 'depth', '_buf', '_mv', '_zeros', '_lens', '_pos', '_count')
+
+    def __init__(self, depth: int = 2048, width: int = 64):
+        if depth < 1 or width < 1:
+            raise ValueError('depth and width must be >= 1')
+        self.width = width
+        self.depth = depth
+        self._buf = bytearray(depth * width)
+        self._mv = memoryview(self._buf)
+        self._zeros = memoryview(bytes(width))
+        self._lens = array('H', bytes(2 * depth))
+        self._pos = 0     # próxima ranura a escribir
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, report: bytes):
+        """Copia ``report`` en la siguiente ranura (se trunca a ``width``)."""
+        n = len(report)
+        width = self.width
+        if n > width:
+            report, n = report[:width], width
+        pos = self._pos
+        off = pos * width
+        self._mv[off:off + n] = report
+        if self._lens[pos] > n:
+            self._mv[off + n:off + width] = self._zeros[:width - n]
+        self._lens[pos] = n
+        pos += 1
+        self._pos = 0 if pos == self.depth else pos
+        if self._count < self.depth:
+            self._count += 1
+
+    def clear(self):
+        self._buf[:] = bytes(len(self._buf))
+        self._lens = array('H', bytes(2 * self.depth))
+        self._pos = 0
+        self._count = 0
+
+    def _slot(self, i: int) -> int:
+        """Ranura física del i-ésimo reporte (0 = más antiguo, -1 = más reciente)."""
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('ReportRing index out of range')
+        return (self._pos - self._count + i) % self.depth
+
+    def __getitem__(self, i: int) -> bytes:
+        slot = self._slot(i)
+        off = slot * self.width
+        return bytes(self._mv[off:off + self._lens[slot]])
+
+    def block(self, n: Optional[int] = None) -> Tuple[bytes, array]:
+        """
+        Últimos ``n`` reportes (todos si se omite) como bloque contiguo.
+
+        Devuelve ``(datos, longitudes)``: ``datos`` tiene ``n * width`` bytes en
+        orden cronológico (fila i = reporte i), ``longitudes`` el tamaño real
+        de cada fila.
+        """
+        n = self._count if n is None else max(0, min(n, self._count))
+        if n == 0:
+            return b'', array('H')
+        start = (self._pos - n) % self.depth
+        end = start + n
+        w = self.width
+        if end <= self.depth:
+            return bytes(self._mv[start * w:end * w]), self._lens[start:end]
+        end -= self.depth
+        return (bytes(self._mv[start * w:]) + bytes(self._mv[:end * w]),
+                self._lens[start:] + self._lens[:end])
+
+    def last(self, n: Optional[int] = None) -> List[bytes]:
+        """Últimos ``n`` reportes con su longitud real, del más antiguo al más reciente."""
+        data, lens = self.block(n)
+        w = self.width
+        return [data[i * w:i * w + ln] for i, ln in enumerate(lens)]
+
+    def to_lists(self, n: Optional[int] = None) -> List[List[int]]:
+        """Como ``last`` pero en listas de enteros (serializable a JSON)."""
+        return [list(r) for r in self.last(n)]
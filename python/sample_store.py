@@ -0,0 +1,309 @@
+"""
+Almacén binario de muestras etiquetadas para el mapeo (Python)
+
+Sustituye a ``.ds4map.samples.json`` (que hay que leer y reescribir entero
+en cada recolección) por un archivo de sólo-añadir con registros de ancho
+fijo, pensado para leerse con ``mmap`` como las grabaciones de
+``recording.py``. Formato (little-endian):
+
+    cabecera  magic b'DS4M' | versión u16 | ancho u16 | nº etiquetas u32 | reservado u32
+    etiquetas LABELS_MAX x (nombre utf-8 32 bytes | nº muestras u32 | última muestra + 1 u32)
+    relleno   hasta múltiplo de 16 bytes
+    registros etiqueta u16 | len_before u16 | len_after u16 | - | anterior + 1 u32 |
+              before | after (cada uno relleno con ceros hasta ``ancho``)
+
+Cada registro apunta al anterior de su misma etiqueta y la tabla de la
+cabecera guarda el último, así:
+
+- añadir una muestra es escribir un registro al final y actualizar 8 bytes
+  de la cabecera: O(1), sin leer lo que ya hay
+- las muestras de una etiqueta se recorren siguiendo la cadena, sin tocar
+  los registros de las demás, y ``pairs(labels)`` se pasa tal cual a
+  ``inference.infer_mappings_batched`` o ``score_candidates``
+
+El registro se escribe antes que la cabecera: un corte a mitad deja como
+mucho un registro final incompleto, que se descarta al abrir, o completo
+pero sin enlazar en la tabla de etiquetas, que se enlaza al abrir (y se
+descarta si no encaja con la cadena de su etiqueta).
+
+CLI::
+
+    python -m python.sample_store import .ds4map.samples.json .ds4map.samples.ds4m
+    python -m python.sample_store info .ds4map.samples.ds4m
+    python -m python.sample_store infer .ds4map.samples.ds4m [--labels cross circle]
+
+@module sample_store
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b'DS4M'
+VERSION = 1
+HEADER = struct.Struct('<4sHHII')
+LABEL = struct.Struct('<32sII')
+RECORD = struct.Struct('<HHHxxI')
+LABELS_MAX = 255
+ALIGN = 16
+DATA_OFFSET = HEADER.size + LABELS_MAX * LABEL.size
+DATA_OFFSET += -DATA_OFFSET % ALIGN
+
+DEFAULT_PATH = '.ds4map.samples.ds4m'
+JSON_PATH = '.ds4map.samples.json'
+
+
+def _as_bytes(report) -> bytes:
+    return report if isinstance(report, (bytes, bytearray)) else bytes(report)
+
+
+class SampleStore:
+    """Muestras (label, before, after) en un archivo de sólo-añadir con índice por etiqueta."""
+
+    def __init__(self, path: str = DEFAULT_PATH, width: Optional[int] = None):
+        """Abre o crea el almacén; ``width`` (64 por defecto al crear) debe coincidir si ya existe."""
+        if width is not None and not 1 <= width <= 0xffff:
+            raise ValueError('width must be between 1 and 65535')
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._f = open(path, 'r+b' if exists else 'w+b')
+        self._fd = self._f.fileno()
+        self._mm: Optional[mmap.mmap] = None
+        self._ids: Dict[str, int] = {}
+        self._counts: List[int] = []
+        self._heads: List[int] = []
+        if exists:
+            try:
+                self._load()
+                if width is not None and width != self.width:
+                    raise ValueError(f'{path}: store width is {self.width}, not {width}')
+            except ValueError:
+                self._f.close()
+                raise
+        else:
+            self.width = width or 64
+            os.pwrite(self._fd, HEADER.pack(MAGIC, VERSION, width, 0, 0), 0)
+            os.ftruncate(self._fd, DATA_OFFSET)
+        self.record_size = RECORD.size + 2 * self.width
+        size = os.fstat(self._fd).st_size
+        self._count = (size - DATA_OFFSET) // self.record_size
+        self._end = DATA_OFFSET + self._count * self.record_size
+        if size != self._end:
+            os.ftruncate(self._fd, self._end)  # registro final incompleto
+        if exists and self._count:
+            self._relink_last()
+
+    def _load(self):
+        head = os.pread(self._fd, DATA_OFFSET, 0)
+        if len(head) < DATA_OFFSET:
+            raise ValueError(f'{self.path}: not a sample store')
+        magic, version, width, n_labels, _ = HEADER.unpack_from(head, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{self.path}: not a sample store (version {VERSION})')
+        self.width = width
+        for i in range(n_labels):
+            name, count, last = LABEL.unpack_from(head, HEADER.size + i * LABEL.size)
+            self._ids[name.rstrip(b'\0').decode()] = i
+            self._counts.append(count)
+            self._heads.append(last)
+
+    def _relink_last(self):
+        """Enlaza el último registro si el corte llegó antes de actualizar la cabecera."""
+        i = self._count - 1
+        lid, _, _, prev = RECORD.unpack(os.pread(self._fd, RECORD.size, DATA_OFFSET + i * self.record_size))
+        if lid < len(self._heads) and self._heads[lid] == i + 1:
+            return
+        if lid < len(self._heads) and prev == self._heads[lid]:
+            self._counts[lid] += 1
+            self._heads[lid] = i + 1
+            os.pwrite(self._fd, struct.pack('<II', self._counts[lid], i + 1),
+                      HEADER.size + lid * LABEL.size + 32)
+        else:  # no pertenece a ninguna cadena: se descarta
+            self._count = i
+            self._end -= self.record_size
+            os.ftruncate(self._fd, self._end)
+
+    def _label_id(self, label: str) -> int:
+        lid = self._ids.get(label)
+        if lid is None:
+            name = label.encode()
+            if not name or len(name) > 32:
+                raise ValueError(f'label must be 1-32 bytes of UTF-8: {label!r}')
+            lid = len(self._counts)
+            if lid >= LABELS_MAX:
+                raise ValueError(f'too many labels (max {LABELS_MAX})')
+            self._ids[label] = lid
+            self._counts.append(0)
+            self._heads.append(0)
+            os.pwrite(self._fd, LABEL.pack(name, 0, 0), HEADER.size + lid * LABEL.size)
+            os.pwrite(self._fd, struct.pack('<I', lid + 1), 8)
+        return lid
+
+    def append(self, label: str, before, after) -> int:
+        """Añade una muestra y devuelve su índice."""
+        before, after = _as_bytes(before), _as_bytes(after)
+        width = self.width
+        if len(before) > width or len(after) > width:
+            raise ValueError(f'report longer than the store width ({width} bytes)')
+        lid = self._label_id(label)
+        i = self._count
+        record = (RECORD.pack(lid, len(before), len(after), self._heads[lid])
+                  + before.ljust(width, b'\0') + after.ljust(width, b'\0'))
+        os.pwrite(self._fd, record, self._end)
+        self._end += self.record_size
+        self._count = i + 1
+        self._counts[lid] += 1
+        self._heads[lid] = i + 1
+        os.pwrite(self._fd, struct.pack('<II', self._counts[lid], i + 1),
+                  HEADER.size + lid * LABEL.size + 32)
+        return i
+
+    def extend(self, pairs: Iterable) -> int:
+        """Añade varias muestras (label, before, after); devuelve cuántas."""
+        n = 0
+        for label, before, after in pairs:
+            self.append(label, before, after)
+            n += 1
+        return n
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def labels(self) -> Dict[str, int]:
+        """{etiqueta: nº de muestras}."""
+        return {label: self._counts[lid] for label, lid in self._ids.items()}
+
+    def _view(self) -> mmap.mmap:
+        mm = self._mm
+        if mm is None or len(mm) != self._end:
+            if mm is not None:
+                mm.close()
+            mm = self._mm = mmap.mmap(self._fd, self._end, access=mmap.ACCESS_READ)
+        return mm
+
+    def indices(self, label: str) -> List[int]:
+        """Índices de las muestras de ``label`` en orden de inserción."""
+        lid = self._ids.get(label)
+        if lid is None:
+            return []
+        mm, size, unpack = self._view(), self.record_size, RECORD.unpack_from
+        out = []
+        nxt = self._heads[lid]
+        while nxt:
+            i = nxt - 1
+            out.append(i)
+            nxt = unpack(mm, DATA_OFFSET + i * size)[3]
+        out.reverse()
+        return out
+
+    def _pair(self, mm, i: int, names: List[str]) -> Tuple[str, bytes, bytes]:
+        off = DATA_OFFSET + i * self.record_size
+        lid, nb, na, _ = RECORD.unpack_from(mm, off)
+        off += RECORD.size
+        return names[lid], mm[off:off + nb], mm[off + self.width:off + self.width + na]
+
+    def __getitem__(self, i: int) -> Tuple[str, bytes, bytes]:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError('SampleStore index out of range')
+        return self._pair(self._view(), i, self._names())
+
+    def _names(self) -> List[str]:
+        names = [''] * len(self._counts)
+        for label, lid in self._ids.items():
+            names[lid] = label
+        return names
+
+    def pairs(self, labels: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, bytes, bytes]]:
+        """
+        (label, before, after) de todas las muestras en orden, o sólo de
+        ``labels`` (agrupadas por etiqueta, siguiendo su cadena).
+        """
+        mm, names = self._view(), self._names()
+        if labels is None:
+            for i in range(self._count):
+                yield self._pair(mm, i, names)
+            return
+        for label in labels:
+            for i in self.indices(label):
+                yield self._pair(mm, i, names)
+
+    def flush(self):
+        os.fsync(self._fd)
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_json_samples(path: str = JSON_PATH) -> Iterator[Tuple[str, bytes, bytes]]:
+    """Pares de ``.ds4map.samples.json`` (lista de {label, before, after})."""
+    with open(path, encoding='utf-8') as f:
+        samples = json.load(f)
+    for s in samples:
+        yield s['label'], bytes(s['before']), bytes(s['after'])
+
+
+def import_json(json_path: str = JSON_PATH, store_path: str = DEFAULT_PATH,
+                width: Optional[int] = None) -> int:
+    """
+    Añade las muestras de un ``.ds4map.samples.json`` al almacén (creándolo
+    con el ancho del reporte más largo si no existe); devuelve cuántas. Un
+    ``width`` explícito distinto del de un almacén existente es un error.
+    """
+    samples = list(read_json_samples(json_path))
+    exists = os.path.exists(store_path) and os.path.getsize(store_path) > 0
+    if width is None and not exists:
+        width = max((max(len(b), len(a)) for _, b, a in samples), default=64)
+    with SampleStore(store_path, width) as store:
+        return store.extend(samples)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Append-only labeled sample store for mapping inference')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    p_import = sub.add_parser('import', help='append the samples of a .ds4map.samples.json file')
+    p_import.add_argument('json_path', nargs='?', default=JSON_PATH)
+    p_import.add_argument('store', nargs='?', default=DEFAULT_PATH)
+    p_import.add_argument('--width', type=int, help='record width for a new store (default: longest report)')
+    p_info = sub.add_parser('info', help='show width, sample count and samples per label')
+    p_info.add_argument('store', nargs='?', default=DEFAULT_PATH)
+    p_infer = sub.add_parser('infer', help='infer {label: [byte, mask]} from the stored samples')
+    p_infer.add_argument('store', nargs='?', default=DEFAULT_PATH)
+    p_infer.add_argument('--labels', nargs='+', help='only these labels')
+    args = ap.parse_args(argv)
+
+    if args.cmd == 'import':
+        n = import_json(args.json_path, args.store, args.width)
+        print(f'Imported {n} samples into {args.store}')
+        return 0
+    if not os.path.exists(args.store):
+        print(f'{args.store}: not found')
+        return 1
+    with SampleStore(args.store) as store:
+        if args.cmd == 'info':
+            print(json.dumps({'samples': len(store), 'width': store.width, 'labels': store.labels,
+                              'bytes': os.path.getsize(args.store)}, indent=2))
+            return 0
+        from python.inference import infer_mappings_batched
+        mapping, confidence = infer_mappings_batched(store.pairs(args.labels))
+        print(json.dumps({'buttons': mapping, 'confidence': confidence}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+"""
+Detección de candidatos a sensores por estadística de bytes (Python)
+
+Un byte casi constante y distinto de cero es candidato a batería; uno con
+mucha varianza, candidato a sensor de movimiento. Tres variantes que dan
+el mismo resultado sobre los mismos reportes:
+
+- detect_sensor_candidates: versión original, listas de reportes
+- detect_sensor_candidates_2d: por lotes sobre una matriz uint8
+  (ndarray de NumPy si está instalado, o bloque ``bytes`` + ancho)
+- SensorStats: acumulador incremental que el daemon actualiza por reporte,
+  con candidatos disponibles en O(ancho)
+
+Las variantes rápidas trabajan con sumas enteras exactas
+(n·Σx² − (Σx)² = n²·var), así que no acumulan error de redondeo.
+
+@module sensors
+"""
+
+import sys
+from array import array
+from collections import deque
+from typing import Optional
+
+# Umbrales de varianza (iguales a la versión original)
+BATTERY_MAX_VAR = 4
+MOTION_MIN_VAR = 20
+
+_SQUARES = tuple(v * v for v in range(256))
+# Tablas de traducción: byte alto y bajo de x² para cada x
+_SQ_LO = bytes(v & 0xff for v in _SQUARES)
+_SQ_HI = bytes(v >> 8 for v in _SQUARES)
+
+
+def detect_sensor_candidates(reports):
+    if not reports:
+        return {'batteryCandidates': [], 'motionCandidates': []}
+    length = max(len(r) for r in reports)
+    means = []
+    variances = []
+    for i in range(length):
+        vals = [(r[i] if i < len(r) else 0) for r in reports]
+        mean = sum(vals)/len(vals)
+        var = sum((v-mean)**2 for v in vals)/len(vals)
+        means.append(mean)
+        variances.append(var)
+    batteryCandidates = [i for i,v in enumerate(variances) if v < 4 and means[i] > 0]
+    motionCandidates = [i for i,v in enumerate(variances) if v > 20]
+    return {'batteryCandidates': batteryCandidates, 'motionCandidates': motionCandidates}
+
+
+def _classify(n, sums, sqsums):
+    """Candidatos a partir de Σx y Σx² por byte sobre n reportes."""
+    n2 = n * n
+    battery, motion = [], []
+    for i, (s, q) in enumerate(zip(sums, sqsums)):
+        var_n2 = n * q - s * s
+        if var_n2 < BATTERY_MAX_VAR * n2 and s > 0:
+            battery.append(i)
+        if var_n2 > MOTION_MIN_VAR * n2:
+            motion.append(i)
+    return {'batteryCandidates': battery, 'motionCandidates': motion}
+
+
+def detect_sensor_candidates_2d(matrix, width: Optional[int] = None):
+    """
+    Versión por lotes sobre una matriz de reportes (fila = reporte).
+
+    ``matrix`` puede ser un ndarray 2-D de uint8 o un bloque ``bytes`` de
+    ``n * width`` bytes (p. ej. ``ReportRing.block()``). Los reportes más
+    cortos deben venir rellenos con ceros.
+    """
+    np = sys.modules.get('numpy')  # un ndarray implica NumPy ya importado
+    if np is not None and isinstance(matrix, np.ndarray):
+        if matrix.size == 0:
+            return {'batteryCandidates': [], 'motionCandidates': []}
+        wide = matrix.astype(np.int64)
+        return _classify(len(matrix), wide.sum(axis=0).tolist(), (wide * wide).sum(axis=0).tolist())
+    if not width:
+        raise ValueError('width is required for a bytes block')
+    n = len(matrix) // width
+    if n == 0:
+        return {'batteryCandidates': [], 'motionCandidates': []}
+    data = bytes(matrix[:n * width])
+    sq = _SQUARES.__getitem__
+    cols = [data[i::width] for i in range(width)]  # una columna por byte, en C
+    return _classify(n, [sum(c) for c in cols], [sum(map(sq, c)) for c in cols])
+
+
+class SensorStats:
+    """
+    Estadística incremental por byte sobre los últimos ``window`` reportes.
+
+    Σx y Σx² de todos los bytes se guardan empaquetados en un entero Python
+    con carriles de 32 bits (uno por byte). Cada reporte se esparce en esos
+    carriles con asignaciones por slice extendido y ``bytes.translate``
+    (x² = alto·256 + bajo), así que añadir o retirar un reporte son unas
+    pocas operaciones en C en lugar de un bucle Python por byte.
+    """
+
+    _LANE = 4  # bytes por carril; 255² · 65536 < 2³²
+
+    def __init__(self, width: int = 64, window: int = 8):
+        if not 1 <= window <= 65536:
+            raise ValueError('window must be between 1 and 65536')
+        self.width = width
+        self.window = window
+        self._rows: deque = deque()
+        self._sum = 0
+        self._sqsum = 0
+        self._sbuf = bytearray(width * self._LANE)
+        self._qbuf = bytearray(width * self._LANE)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def update(self, report: bytes):
+        """Añade un reporte (se trunca a ``width``) y retira el más antiguo si hace falta."""
+        n = len(report)
+        if n != self.width:
+            # carriles alineados aunque el reporte sea más corto (Bluetooth)
+            report = report[:self.width] if n > self.width else report + bytes(self.width - n)
+        sbuf, qbuf = self._sbuf, self._qbuf
+        sbuf[0::4] = report
+        qbuf[0::4] = report.translate(_SQ_LO)
+        qbuf[1::4] = report.translate(_SQ_HI)
+        s = int.from_bytes(sbuf, 'little')
+        q = int.from_bytes(qbuf, 'little')
+        rows = self._rows
+        if len(rows) == self.window:
+            old_s, old_q = rows.popleft()
+            self._sum -= old_s
+            self._sqsum -= old_q
+        rows.append((s, q))
+        self._sum += s
+        self._sqsum += q
+
+    def _lanes(self, packed: int):
+        lanes = array('I')
+        lanes.frombytes(packed.to_bytes(self.width * self._LANE, 'little'))
+        if sys.byteorder == 'big':
+            lanes.byteswap()
+        return lanes
+
+    def candidates(self):
+        """Mismo resultado que detect_sensor_candidates sobre la ventana actual."""
+        n = len(self._rows)
+        if n == 0:
+            return {'batteryCandidates': [], 'motionCandidates': []}
+        return _classify(n, self._lanes(self._sum), self._lanes(self._sqsum))
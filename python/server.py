@@ -1,60 +1,326 @@
 import asyncio
 import json
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
-from python.daemon import Daemon
+from python.binproto import BinaryCodec, TYPE_CODES, timestamp_ms
+from python.daemon import Daemon, DEFAULT_MAP, write_mapping_file
+from python.decoder import compile_mapping
+from python.metrics import collect, counters, to_prometheus, tracer
+from python.multi import HID_MULTI, MultiDeviceDaemon
+from python.shared_state import SharedStatePublisher, SharedStateReader, follow, run_publisher, worker_status
+from python.sinks import EVENT_LOG, EventDispatcher, JsonLinesSink
+from python.subscription import Subscription
+from python.sync_state import StateSync
+from python.ws_channel import ClientChannel, EventBatcher
 
-app = FastAPI()
-base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-app.mount('/docs', StaticFiles(directory=os.path.join(base_dir, 'docs')), name='docs')
-app.mount('/', StaticFiles(directory=os.path.join(base_dir, 'web'), html=True), name='web')
+# Límites por cliente WebSocket: mensajes pendientes y retraso máximo (s)
+WS_QUEUE = int(os.getenv('WS_QUEUE', '1024'))
+WS_MAX_LAG = float(os.getenv('WS_MAX_LAG', '2.0'))
+# Ventana de agrupación para clientes ?batch=1 (0 = un frame por reporte)
+WS_BATCH_WINDOW_MS = float(os.getenv('WS_BATCH_WINDOW_MS', '0'))
 
-clients = set()
+# Nº de procesos worker de uvicorn; con más de 1 el daemon corre en su propio
+# proceso y publica en memoria compartida (ver shared_state.py)
+WORKERS = int(os.getenv('WORKERS', '1'))
+# Nombre del segmento compartido: lo fija el proceso principal para sus workers
+SHARED_STATE = os.getenv('DS4_SHARED_STATE')
 
-def broadcast(msg):
-    data = json.dumps(msg)
+daemon: Optional[Daemon] = None  # Daemon compartido, vive durante el lifespan de la app
+shared: Optional[SharedStateReader] = None  # En modo WORKERS, en lugar de daemon
+dispatcher: Optional[EventDispatcher] = None  # emit del daemon: WebSocket + sinks opcionales
+
+clients = set()            # ClientChannel con un evento por frame (protocolo original)
+batch_clients = set()      # ClientChannel con frames JSON array (?batch=1)
+binary_clients = set()     # ClientChannel con registros binarios (?format=binary)
+binary_ts_clients = set()  # idem con marca de tiempo (?format=binary&ts=1)
+filtered_clients = {}      # ClientChannel del protocolo original con suscripción -> Subscription
+
+# Tabla de ids compartida por todos los clientes binarios
+codec = BinaryCodec(compile_mapping(DEFAULT_MAP).control_ids)
+# Estado completo + historial para la instantánea y la reanudación de /ws
+sync = StateSync()
+
+def _put_all(group, data, key=None, seq=None):
+    to_remove = [ch for ch in group if not ch.put(data, key, seq)]
+    for ch in to_remove:
+        group.discard(ch)
+
+def _schedule(ch, sub):
+    if sub.timer is None and sub.pending:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        sub.timer = loop.call_later(max(0.0, sub.next_due - time.monotonic()), _flush_pending, ch, sub)
+
+def _flush_pending(ch, sub):
+    # throttled axis values whose interval elapsed; stamped with the current seq,
+    # which is correct because no newer event for that axis exists
+    sub.timer = None
+    if filtered_clients.get(ch) is not sub:
+        return
+    for msg in sub.take_due(time.monotonic()):
+        if not ch.put(json.dumps(msg), (msg.get('device'), msg.get('id')), sync.seq):
+            _unsubscribe(ch)
+            return
+    _schedule(ch, sub)
+
+def _put_filtered(msg, key, seq, data):
+    now = time.monotonic()
     to_remove = []
-    for ws in clients:
+    for ch, sub in filtered_clients.items():
+        if not sub.accepts(msg):
+            continue
+        if key is not None and not sub.throttle(key, msg, now):
+            _schedule(ch, sub)
+            continue
+        if data is None:
+            data = json.dumps(msg)  # serialized only if some client wants it, once for all of them
+        if not ch.put(data, key, seq):
+            to_remove.append(ch)
+    for ch in to_remove:
+        _unsubscribe(ch)
+
+def _subscribe(ch, sub):
+    _unsubscribe(ch)
+    if sub is None:
+        clients.add(ch)
+    else:
+        filtered_clients[ch] = sub
+
+def _unsubscribe(ch):
+    clients.discard(ch)
+    sub = filtered_clients.pop(ch, None)
+    if sub is not None:
+        sub.close()
+
+def _send_batch(events):
+    if batch_clients:
+        _put_all(batch_clients, json.dumps(events))  # serialized once, shared by every batch client
+    if binary_clients or binary_ts_clients:
+        known = len(codec.ids)
+        plain = codec.encode(events) if binary_clients else b''
+        stamped = codec.encode(events, timestamp_ms()) if binary_ts_clients else b''
+        if len(codec.ids) != known:
+            # new control ids: resend the table before the frame that uses them
+            _put_all(binary_clients, codec.table(False))
+            _put_all(binary_ts_clients, codec.table(True))
+        if plain:
+            _put_all(binary_clients, plain)
+        if stamped:
+            _put_all(binary_ts_clients, stamped)
+        for msg in events:
+            if msg.get('type') not in TYPE_CODES:
+                data = json.dumps(msg)
+                _put_all(binary_clients, data)
+                _put_all(binary_ts_clients, data)
+    if tracer.enabled:
+        tracer.mark('enqueue')
+
+batcher = EventBatcher(_send_batch, WS_BATCH_WINDOW_MS / 1000)
+
+def broadcast(msg):
+    counters.events += 1
+    seq = sync.apply(msg)
+    if tracer.enabled:
+        tracer.mark('emit')
+    if clients or filtered_clients:
+        # axis updates for the same id may be coalesced per client; everything else is kept
+        key = (msg.get('device'), msg.get('id')) if msg.get('type') == 'axis' else None
+        data = None
+        if clients:
+            data = json.dumps(msg)
+            _put_all(clients, data, key, seq)
+        if filtered_clients:
+            _put_filtered(msg, key, seq, data)
+        if tracer.enabled:
+            tracer.mark('enqueue')
+    if batch_clients or binary_clients or binary_ts_clients:
+        batcher.add(msg)
+
+@asynccontextmanager
+async def lifespan(app):
+    global daemon, shared, dispatcher
+    dispatcher = EventDispatcher()
+    dispatcher.add(broadcast, 'websocket')
+    log = JsonLinesSink(EVENT_LOG) if EVENT_LOG else None
+    if log is not None:
+        dispatcher.add(log, 'log', queued=True)  # escritura a disco fuera del camino de lectura
+    if SHARED_STATE:
+        shared = SharedStateReader(SHARED_STATE)
+        decoder = shared.decoder or compile_mapping(DEFAULT_MAP)
+        # estado actual para la instantánea de los primeros clientes de este worker
+        dec, state = shared.state()
+        for ev in dec.initial_events(state) if state is not None else ():
+            sync.apply(ev)
+        task = asyncio.create_task(follow(shared, dispatcher.emit))
+    else:
+        daemon = MultiDeviceDaemon() if HID_MULTI else Daemon()
+        decoder = daemon.decoder
+        task = asyncio.create_task(daemon.start(dispatcher))
+    for cid in decoder.control_ids:
+        codec.add(cid)
+    try:
+        yield
+    finally:
+        task.cancel()
+        try:
+            await task
+        except BaseException:
+            pass
+        if shared is not None:
+            shared.close()
         try:
-            asyncio.create_task(ws.send_text(data))
-        except Exception:
-            to_remove.append(ws)
-    for ws in to_remove:
-        clients.discard(ws)
+            await asyncio.wait_for(dispatcher.flush(), 1.0)
+        except asyncio.TimeoutError:
+            pass
+        dispatcher.close()
+        if log is not None:
+            log.close()
+        daemon = shared = dispatcher = None
+
+app = FastAPI(lifespan=lifespan)
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 @app.websocket('/ws')
 async def ws_endpoint(websocket: WebSocket):
     await websocket.accept()
-    clients.add(websocket)
+    ch = ClientChannel(websocket, WS_QUEUE, WS_MAX_LAG)
+    writer = asyncio.create_task(ch.run())
+    params = websocket.query_params
+    missed = None
+    sub = None
+    if params.get('format') == 'binary':
+        ts = params.get('ts') in ('1', 'true')
+        group = binary_ts_clients if ts else binary_clients
+        ch.put(codec.table(ts))
+    elif params.get('batch') in ('1', 'true'):
+        group = batch_clients
+    else:
+        group = clients
+        try:
+            sub = Subscription.parse(params)
+        except ValueError as e:
+            ch.put(json.dumps({'type': 'error', 'error': str(e)}))
+        if params.get('since', '').isdigit():
+            missed = sync.since(int(params['since']), params.get('epoch'))
+            if missed and sub is not None:
+                missed = [ev for ev in missed if sub.accepts(ev)]
+    # snapshot (or the missed deltas) and joining the group happen without an
+    # await in between, so no event is lost or sent twice
+    if missed is None:
+        snap = sync.snapshot()
+        ch.put(json.dumps(sub.filter_snapshot(snap) if sub is not None else snap))
+    elif missed:
+        ch.put(json.dumps(missed))
+    if group is clients:
+        _subscribe(ch, sub)
+    else:
+        group.add(ch)
     try:
-        while True:
-            await websocket.receive_text()  # not used, just keep alive
+        while not ch.closed:
+            _on_message(ch, group, await websocket.receive_text())
     except Exception:
-        clients.discard(websocket)
+        pass
+    finally:
+        group.discard(ch)
+        _unsubscribe(ch)
+        ch.close()
+        writer.cancel()
+
+def _on_message(ch, group, text):
+    """Client messages: only ``{"type": "subscribe", ...}`` is understood, anything else is ignored."""
+    try:
+        obj = json.loads(text)
+    except ValueError:
+        return
+    if not isinstance(obj, dict) or obj.get('type') != 'subscribe':
+        return
+    if group is not clients:
+        ch.put(json.dumps({'type': 'error', 'error': 'subscribe: only supported on the JSON protocol'}))
+        return
+    try:
+        sub = Subscription.parse(obj)
+    except ValueError as e:
+        ch.put(json.dumps({'type': 'error', 'error': str(e)}))
+        return
+    # new view: fresh (filtered) snapshot, then deltas; no await in between
+    snap = sync.snapshot()
+    ch.put(json.dumps(sub.filter_snapshot(snap) if sub is not None else snap))
+    _subscribe(ch, sub)
 
 @app.get('/api/status')
 async def status():
     try:
-        d = Daemon()
-        return d.get_status()
+        if shared is not None:
+            return worker_status(shared)
+        return daemon.get_status()
     except Exception as e:
         return { 'error': str(e) }
 
+@app.get('/api/metrics')
+async def metrics(format: str = 'json'):
+    """Contadores y latencias por etapa (?format=prometheus para texto de Prometheus)."""
+    groups = {'json': clients, 'json_filtered': filtered_clients, 'batch': batch_clients, 'binary': binary_clients, 'binary_ts': binary_ts_clients}
+    if shared is not None:
+        io = shared.meta().get('io')
+    else:
+        io = daemon.io_stats() if daemon is not None else None
+    snapshot = collect(io, groups)
+    snapshot['sync'] = sync.stats()
+    if dispatcher is not None:
+        snapshot['sinks'] = dispatcher.stats()['sinks']
+    if shared is not None:
+        snapshot['shared'] = shared.stats()
+    if format == 'prometheus':
+        return PlainTextResponse(to_prometheus(snapshot), media_type='text/plain; version=0.0.4')
+    return snapshot
+
 @app.post('/api/save-map')
 async def save_map(payload: dict):
     try:
-        d = Daemon()
-        d.save_mapping(payload)
+        if shared is not None:
+            # el proceso del daemon vigila .ds4map.json y lo recarga
+            decoder = write_mapping_file(payload)
+        else:
+            daemon.save_mapping(payload)
+            decoder = daemon.decoder
+        for cid in decoder.control_ids:
+            codec.add(cid)
         return { 'ok': True }
     except Exception as e:
         return { 'error': str(e) }
 
+# Static files last so the '/' mount does not shadow /ws and /api/*
+app.mount('/docs', StaticFiles(directory=os.path.join(base_dir, 'docs')), name='docs')
+app.mount('/', StaticFiles(directory=os.path.join(base_dir, 'web'), html=True), name='web')
+
+def serve_workers(workers: int, host: str = '0.0.0.0', port: int = 8080):
+    """
+    Daemon en un proceso propio + ``workers`` procesos uvicorn que leen de
+    memoria compartida; cada worker atiende su parte de los clientes.
+    """
+    import multiprocessing
+    publisher = SharedStatePublisher(f'ds4_{os.getpid()}')
+    os.environ['DS4_SHARED_STATE'] = publisher.name  # lo heredan los workers
+    proc = multiprocessing.Process(target=run_publisher, args=(publisher.name, HID_MULTI),
+                                   name='ds4-daemon', daemon=True)
+    proc.start()
+    try:
+        uvicorn.run('python.server:app', host=host, port=port, reload=False, workers=workers)
+    finally:
+        proc.terminate()
+        proc.join(5)
+        publisher.close()
+
 if __name__ == '__main__':
-    d = Daemon()
-    async def emit(m):
-        broadcast(m)
-    loop = asyncio.get_event_loop()
-    loop.create_task(d.start(emit))
-    uvicorn.run('python.server:app', host='0.0.0.0', port=8080, reload=False)
+    if WORKERS > 1:
+        serve_workers(WORKERS)
+    else:
+        uvicorn.run('python.server:app', host='0.0.0.0', port=8080, reload=False)
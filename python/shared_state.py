@@ -0,0 +1,349 @@
+"""
+Estado y eventos del daemon en memoria compartida para varios workers (Python)
+
+Con ``WORKERS=N`` (N > 1) ``server.py`` lanza el daemon en un proceso
+propio que publica en un segmento ``multiprocessing.shared_memory``; cada
+worker de uvicorn se conecta al segmento y difunde los eventos a sus
+propios clientes WebSocket, así el envío se reparte entre núcleos sin
+abrir el dispositivo HID más de una vez.
+
+Disposición del segmento (little-endian, un único escritor)::
+
+    cabecera  magic b'DS4S' | versión u16 | ancho u16 | ranuras u32 | tamaño_ranura u32
+              | tamaño_meta u32 | próxima_seq u64 | seq_reporte u64 | seq_meta u64
+              | long_reporte u16
+    reporte   último reporte crudo (``ancho`` bytes)
+    meta      long u32 | JSON {mapping, io, sensors, reload} (``tamaño_meta`` bytes)
+    anillo    ``ranuras`` × (seq u64 | long u32 | evento JSON)
+
+El evento número ``s`` va en la ranura ``s % ranuras``; el escritor marca
+la ranura como inválida (seq ``INVALID``), copia el evento, escribe su seq
+y después publica ``próxima_seq``; el lector comprueba la seq de la ranura
+antes y después de copiarla, así nunca acepta un evento a medio escribir. El reporte y el meta usan un
+seqlock (contador impar mientras se escribe): el lector copia y reintenta
+si el contador cambió. Un worker que se retrasa más de ``ranuras`` eventos
+salta al final del anillo y reenvía el estado completo decodificado del
+último reporte (como al conectar un control), así sus clientes no se quedan
+con valores viejos.
+
+@module shared_state
+"""
+
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from python.decoder import compile_mapping
+
+MAGIC = b'DS4S'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIQQQH')
+SLOT = struct.Struct('<QI')
+SEQ = struct.Struct('<Q')
+# seq de una ranura que el escritor está sobrescribiendo
+INVALID = 0xffffffffffffffff
+META_LEN = struct.Struct('<I')
+
+# Offsets de los campos que cambian en la cabecera
+_NEXT_SEQ = 20
+_REPORT_SEQ = 28
+_META_SEQ = 36
+_REPORT_LEN = 44
+
+SHM_SLOTS = int(os.getenv('SHM_SLOTS', '4096'))
+SHM_SLOT_SIZE = int(os.getenv('SHM_SLOT_SIZE', '256'))
+SHM_META_SIZE = int(os.getenv('SHM_META_SIZE', str(64 * 1024)))
+# Cada cuánto sondea un worker el anillo y publica el daemon el meta (s)
+SHM_POLL = float(os.getenv('SHM_POLL_MS', '1')) / 1000
+SHM_META_INTERVAL = float(os.getenv('SHM_META_INTERVAL', '0.5'))
+
+
+def _layout(width: int, slots: int, slot_size: int, meta_size: int) -> Tuple[int, int, int, int]:
+    """(offset_reporte, offset_meta, offset_anillo, tamaño_total)."""
+    report = HEADER.size
+    meta = report + width
+    ring = meta + META_LEN.size + meta_size
+    ring += -ring % 8
+    return report, meta, ring, ring + slots * slot_size
+
+
+def _open(name: str) -> shared_memory.SharedMemory:
+    """Abre un segmento existente y comprueba la cabecera."""
+    # el segmento lo libera quien lo creó: abrirlo no debe registrarlo en el
+    # resource_tracker (que lo borraría al salir este proceso, y que los
+    # procesos hijos comparten con el padre)
+    if sys.version_info >= (3, 13):
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args: None
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+    magic, version = HEADER.unpack_from(shm.buf, 0)[:2]
+    if magic != MAGIC or version != VERSION:
+        shm.close()
+        raise ValueError(f'{name}: not a shared state segment (version {VERSION})')
+    return shm
+
+
+class SharedStatePublisher:
+    """Lado del daemon: crea el segmento y escribe eventos, reporte y meta."""
+
+    def __init__(self, name: Optional[str] = None, slots: int = SHM_SLOTS, slot_size: int = SHM_SLOT_SIZE,
+                 meta_size: int = SHM_META_SIZE, width: int = 64):
+        if slots < 1 or slot_size <= SLOT.size or width < 1 or meta_size < 2:
+            raise ValueError('invalid shared state layout')
+        size = _layout(width, slots, slot_size, meta_size)[3]
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, width, slots, slot_size, meta_size, 0, 0, 0, 0)
+        self._setup()
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedStatePublisher':
+        """Escritor sobre un segmento ya creado (p. ej. por el proceso padre); no lo borra al cerrar."""
+        self = cls.__new__(cls)
+        self.shm = _open(name)
+        self._setup()
+        return self
+
+    def _setup(self):
+        self.name = self.shm.name
+        self._buf = self.shm.buf
+        _, _, self.width, self.slots, self.slot_size, self.meta_size, self.seq, self._report_seq, \
+            self._meta_seq, _ = HEADER.unpack_from(self._buf, 0)
+        self._report_off, self._meta_off, self._ring_off, _ = _layout(
+            self.width, self.slots, self.slot_size, self.meta_size)
+        self.oversize = 0  # eventos descartados por no caber en una ranura
+
+    def publish(self, event: dict):
+        """Añade un evento al anillo (callback ``emit`` del daemon)."""
+        data = json.dumps(event).encode()
+        n = len(data)
+        if n > self.slot_size - SLOT.size:
+            self.oversize += 1
+            return
+        seq = self.seq
+        off = self._ring_off + (seq % self.slots) * self.slot_size
+        buf = self._buf
+        SLOT.pack_into(buf, off, INVALID, n)
+        buf[off + SLOT.size:off + SLOT.size + n] = data
+        SLOT.pack_into(buf, off, seq, n)
+        self.seq = seq + 1
+        SEQ.pack_into(buf, _NEXT_SEQ, self.seq)
+
+    def publish_report(self, report: bytes):
+        """Copia el último reporte crudo (se trunca a ``width``)."""
+        n = min(len(report), self.width)
+        buf = self._buf
+        self._report_seq += 1
+        SEQ.pack_into(buf, _REPORT_SEQ, self._report_seq)  # impar: escribiendo
+        off = self._report_off
+        buf[off:off + n] = report[:n]
+        struct.pack_into('<H', buf, _REPORT_LEN, n)
+        self._report_seq += 1
+        SEQ.pack_into(buf, _REPORT_SEQ, self._report_seq)
+
+    def publish_meta(self, meta: Dict[str, Any]):
+        """Publica mapeo y estadísticas (lo que /api/status no puede decodificar del reporte)."""
+        data = json.dumps(meta).encode()
+        if len(data) > self.meta_size:
+            raise ValueError(f'shared state meta is {len(data)} bytes, SHM_META_SIZE is {self.meta_size}')
+        buf = self._buf
+        self._meta_seq += 1
+        SEQ.pack_into(buf, _META_SEQ, self._meta_seq)
+        off = self._meta_off
+        META_LEN.pack_into(buf, off, len(data))
+        buf[off + META_LEN.size:off + META_LEN.size + len(data)] = data
+        self._meta_seq += 1
+        SEQ.pack_into(buf, _META_SEQ, self._meta_seq)
+
+    def close(self, unlink: bool = True):
+        self._buf = None
+        self.shm.close()
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedStateReader:
+    """Lado del worker: sigue el anillo de eventos y lee el último estado."""
+
+    def __init__(self, name: str):
+        self.shm = _open(name)
+        self._buf = self.shm.buf
+        _, _, width, slots, slot_size, meta_size, next_seq, _, _, _ = HEADER.unpack_from(self._buf, 0)
+        self.width = width
+        self.slots = slots
+        self.slot_size = slot_size
+        self._report_off, self._meta_off, self._ring_off, _ = _layout(width, slots, slot_size, meta_size)
+        self.next = next_seq   # los clientes de este worker empiezan por lo que llegue a partir de ahora
+        self.lost = 0          # eventos perdidos por retraso
+        self.resyncs = 0
+        self._decoder = None
+        self._decoder_mapping = None
+
+    def _snapshot(self, seq_off: int, read: Callable[[], Any]):
+        buf = self._buf
+        while True:
+            before = SEQ.unpack_from(buf, seq_off)[0]
+            if before & 1:
+                time.sleep(0)
+                continue
+            value = read()
+            if SEQ.unpack_from(buf, seq_off)[0] == before:
+                return value
+
+    def report(self) -> bytes:
+        """Último reporte crudo publicado (b'' si aún no hay ninguno)."""
+        off = self._report_off
+        return self._snapshot(_REPORT_SEQ, lambda: bytes(
+            self._buf[off:off + struct.unpack_from('<H', self._buf, _REPORT_LEN)[0]]))
+
+    def meta(self) -> Dict[str, Any]:
+        """Último meta publicado ({} si aún no hay ninguno)."""
+        off = self._meta_off
+
+        def read():
+            n = META_LEN.unpack_from(self._buf, off)[0]
+            return bytes(self._buf[off + META_LEN.size:off + META_LEN.size + n])
+
+        data = self._snapshot(_META_SEQ, read)
+        return json.loads(data) if data else {}
+
+    @property
+    def decoder(self):
+        """Decoder del mapeo publicado (se recompila sólo cuando cambia)."""
+        mapping = self.meta().get('mapping')
+        if mapping is not None and mapping != self._decoder_mapping:
+            self._decoder = compile_mapping(mapping)
+            self._decoder_mapping = mapping
+        return self._decoder
+
+    def state(self) -> Tuple[Optional[Any], Any]:
+        """``(decoder, State)`` del último reporte, o ``(decoder, None)``."""
+        dec = self.decoder
+        report = self.report()
+        if dec is None or not report:
+            return dec, None
+        return dec, dec.decode(report)
+
+    def poll(self) -> List[dict]:
+        """Eventos publicados desde la última llamada, en orden."""
+        buf = self._buf
+        end = SEQ.unpack_from(buf, _NEXT_SEQ)[0]
+        seq = self.next
+        if end - seq > self.slots:
+            return self._resync(end)
+        events = []
+        ring, slots, size = self._ring_off, self.slots, self.slot_size
+        while seq < end:
+            off = ring + (seq % slots) * size
+            slot_seq, n = SLOT.unpack_from(buf, off)
+            data = bytes(buf[off + SLOT.size:off + SLOT.size + n])
+            if slot_seq != seq or SEQ.unpack_from(buf, off)[0] != seq:
+                # el escritor está reutilizando o ya reutilizó la ranura: nos hemos quedado atrás
+                self.next = seq
+                return events + self._resync(SEQ.unpack_from(buf, _NEXT_SEQ)[0])
+            try:
+                events.append(json.loads(data))
+            except ValueError:
+                self.next = seq
+                return events + self._resync(SEQ.unpack_from(buf, _NEXT_SEQ)[0])
+            seq += 1
+        self.next = seq
+        return events
+
+    def _resync(self, end: int) -> List[dict]:
+        self.lost += end - self.next
+        self.resyncs += 1
+        self.next = end
+        dec, state = self.state()
+        return dec.initial_events(state) if state is not None else []
+
+    def resync(self) -> List[dict]:
+        """Salta al final del anillo y devuelve el estado completo del último reporte."""
+        return self._resync(SEQ.unpack_from(self._buf, _NEXT_SEQ)[0])
+
+    def stats(self) -> dict:
+        return {'segment': self.shm.name, 'next': self.next, 'lost': self.lost, 'resyncs': self.resyncs}
+
+    def close(self):
+        self._buf = None
+        self.shm.close()
+
+
+async def follow(reader: SharedStateReader, emit: Callable[[dict], None], interval: float = SHM_POLL):
+    """
+    Pasa a ``emit`` los eventos del anillo, sondeando cada ``interval`` s.
+
+    Un error al leer o emitir no termina el reenvío: se registra y el
+    worker se resincroniza con el estado actual.
+    """
+    while True:
+        try:
+            for ev in reader.poll():
+                emit(ev)
+        except Exception as e:
+            print('Shared state follow error, resyncing:', repr(e))
+            try:
+                for ev in reader.resync():
+                    emit(ev)
+            except Exception as e:
+                print('Shared state resync error:', repr(e))
+        await asyncio.sleep(interval)
+
+
+def worker_status(reader: SharedStateReader) -> dict:
+    """/api/status de un worker: meta publicado + estado decodificado del último reporte."""
+    status = reader.meta()
+    dec, state = reader.state()
+    status['state'] = dec.to_dict(state) if state is not None else None
+    status['shared'] = reader.stats()
+    return status
+
+
+async def publish_daemon(daemon, publisher: SharedStatePublisher, meta_interval: float = SHM_META_INTERVAL):
+    """Corre ``daemon`` publicando sus eventos, su último reporte y su meta."""
+    daemon.on_report = publisher.publish_report
+
+    async def meta_loop():
+        while True:
+            status = daemon.get_status()
+            publisher.publish_meta({k: status.get(k) for k in ('mapping', 'io', 'sensors', 'reload', 'devices')
+                                    if k in status})
+            await asyncio.sleep(meta_interval)
+
+    from python import daemon as _daemon
+    meta = asyncio.create_task(meta_loop())
+    # los workers guardan el mapeo en disco: el daemon lo recarga al cambiar
+    # (con MAP_WATCH=1 ya lo vigila start())
+    watch = None if _daemon.MAP_WATCH else asyncio.create_task(daemon.watch_mapping())
+    try:
+        await daemon.start(publisher.publish)
+    finally:
+        meta.cancel()
+        if watch is not None:
+            watch.cancel()
+
+
+def run_publisher(name: str, multi: bool = False):
+    """Entrada del proceso del daemon en modo ``WORKERS`` (el segmento lo crea y borra el padre)."""
+    from python.daemon import Daemon
+    from python.multi import MultiDeviceDaemon
+    publisher = SharedStatePublisher.attach(name)
+    daemon = MultiDeviceDaemon() if multi else Daemon()
+    try:
+        asyncio.run(publish_daemon(daemon, publisher))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.close(unlink=False)
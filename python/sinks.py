@@ -0,0 +1,238 @@
+"""
+Pipeline de sinks para los eventos del daemon (Python)
+
+El daemon llama a un único ``emit(evento)`` de forma síncrona desde el
+camino de lectura HID. ``EventDispatcher`` es ese ``emit`` y reparte cada
+evento entre varios sinks:
+
+- sinks síncronos en línea (por defecto): se llaman directamente; deben
+  ser rápidos, como ``server.broadcast`` que sólo encola en los clientes
+- sinks en cola: las funciones ``async def`` y los síncronos añadidos con
+  ``queued=True`` (p. ej. escribir a disco) tienen una cola acotada propia
+  y una única tarea que la vacía en orden; no se crea una tarea por evento
+  y, si la cola se llena, se descarta el evento más antiguo (contador
+  ``dropped``) en lugar de frenar la lectura
+
+Un error en un sink se cuenta en sus estadísticas y no afecta a los demás.
+``Daemon.start`` envuelve en un EventDispatcher cualquier ``emit`` que no
+lo sea, así un ``async def emit`` se espera de verdad en lugar de crear
+corrutinas que nunca se ejecutan.
+
+Con EVENT_LOG=archivo.jsonl el servidor añade un sink en cola que escribe
+cada evento como una línea JSON.
+
+@module sinks
+"""
+
+import asyncio
+import inspect
+import json
+import os
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+SINK_QUEUE = int(os.getenv('SINK_QUEUE', '1024'))
+EVENT_LOG = os.getenv('EVENT_LOG')
+
+# Eventos seguidos que entrega una tarea de sink antes de ceder el event loop
+_YIELD_EVERY = 64
+
+
+def is_async_sink(fn: Callable) -> bool:
+    """True si ``fn`` (función o callable) es ``async def``."""
+    return inspect.iscoroutinefunction(fn) or inspect.iscoroutinefunction(getattr(fn, '__call__', None))
+
+
+class Sink:
+    """Un destino de eventos: en línea o con cola propia y tarea de vaciado."""
+
+    __slots__ = ('fn', 'name', 'is_async', 'queued', 'maxsize', 'delivered', 'dropped', 'errors',
+                 'max_depth', 'last_error', '_items', '_wake', '_waiting', '_task', '_busy')
+
+    def __init__(self, fn: Callable[[dict], Any], name: Optional[str] = None, queued: Optional[bool] = None,
+                 maxsize: int = SINK_QUEUE):
+        if maxsize < 1:
+            raise ValueError('maxsize must be >= 1')
+        self.fn = fn
+        self.name = name or getattr(fn, '__name__', type(fn).__name__)
+        self.is_async = is_async_sink(fn)
+        self.queued = self.is_async or bool(queued)
+        self.maxsize = maxsize
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.last_error: Optional[str] = None
+        self._items: deque = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._waiting = False
+        self._task: Optional[asyncio.Task] = None
+        self._busy = False
+
+    def _error(self, e: Exception):
+        self.errors += 1
+        if self.last_error is None:
+            print(f'Error in event sink {self.name}: {e}')
+        self.last_error = str(e)
+
+    def push(self, event: dict):
+        """Encola un evento (sinks en cola) sin esperar al sink."""
+        items = self._items
+        if len(items) >= self.maxsize:
+            items.popleft()
+            self.dropped += 1
+        items.append(event)
+        if len(items) > self.max_depth:
+            self.max_depth = len(items)
+        if self._waiting:
+            self._waiting = False
+            self._wake.set()
+        elif self._task is None or self._task.done():
+            self._start()
+
+    def _start(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # sin event loop todavía: los eventos esperan en la cola
+        self._wake = asyncio.Event()
+        self._waiting = False
+        self._task = loop.create_task(self._drain())
+
+    async def _drain(self):
+        items, fn, is_async = self._items, self.fn, self.is_async
+        n = 0
+        try:
+            while True:
+                if not items:
+                    self._wake.clear()
+                    self._waiting = True
+                    await self._wake.wait()
+                    continue
+                event = items.popleft()
+                self._busy = True
+                try:
+                    if is_async:
+                        await fn(event)
+                    else:
+                        fn(event)
+                except Exception as e:
+                    self._error(e)
+                finally:
+                    self._busy = False
+                self.delivered += 1
+                n += 1
+                if n % _YIELD_EVERY == 0:
+                    await asyncio.sleep(0)  # un sink rápido con mucha cola no acapara el loop
+        finally:
+            self._waiting = False  # tarea terminada (p. ej. fin del loop): push() la reinicia
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._items) or self._busy
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._waiting = False
+
+    def stats(self) -> dict:
+        st = {'name': self.name, 'mode': 'async' if self.is_async else 'queued' if self.queued else 'inline',
+              'errors': self.errors, 'lastError': self.last_error}
+        if self.queued:
+            st.update(depth=len(self._items), maxDepth=self.max_depth, delivered=self.delivered,
+                      dropped=self.dropped)
+        return st
+
+
+class EventDispatcher:
+    """
+    Entrega cada evento a todos los sinks.
+
+    ``emit`` es la función para el hot path (una closure: llamar a la
+    instancia pasa por ``__call__`` y cuesta bastante más por evento); ve
+    los sinks añadidos o quitados después de obtenerla.
+    """
+
+    __slots__ = ('sinks', 'emit', '_inline', '_queued')
+
+    def __init__(self, sinks: Iterable[Callable[[dict], Any]] = ()):
+        self.sinks: List[Sink] = []
+        self._inline: tuple = ()
+        self._queued: tuple = ()
+        self.emit = self._make_emit()
+        for fn in sinks:
+            self.add(fn)
+
+    def add(self, fn: Callable[[dict], Any], name: Optional[str] = None, queued: Optional[bool] = None,
+            maxsize: int = SINK_QUEUE) -> Sink:
+        """Registra un sink; ``queued=True`` desacopla un sink síncrono lento."""
+        sink = fn if isinstance(fn, Sink) else Sink(fn, name, queued, maxsize)
+        self.sinks.append(sink)
+        self._rebuild()
+        return sink
+
+    def remove(self, sink: Sink):
+        self.sinks.remove(sink)
+        sink.close()
+        self._rebuild()
+
+    def _rebuild(self):
+        # tuplas precalculadas: el bucle por evento no filtra ni crea listas
+        self._inline = tuple(s for s in self.sinks if not s.queued)
+        self._queued = tuple(s for s in self.sinks if s.queued)
+
+    def _make_emit(self) -> Callable[[dict], None]:
+        d = self
+
+        def emit(event: dict):
+            for sink in d._inline:
+                try:
+                    sink.fn(event)
+                except Exception as e:
+                    sink._error(e)
+            for sink in d._queued:
+                sink.push(event)
+
+        return emit
+
+    def __call__(self, event: dict):
+        self.emit(event)
+
+    async def flush(self):
+        """Espera a que los sinks en cola entreguen todo lo pendiente."""
+        for sink in self._queued:
+            if sink.pending and (sink._task is None or sink._task.done()):
+                sink._start()
+        while any(s.pending for s in self._queued):
+            await asyncio.sleep(0)
+
+    def close(self):
+        """Cancela las tareas de los sinks en cola (lo pendiente se pierde)."""
+        for sink in self._queued:
+            sink.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'sinks': [s.stats() for s in self.sinks]}
+
+
+class JsonLinesSink:
+    """Sink síncrono (usar en cola) que escribe un evento JSON por línea."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.__name__ = f'jsonl:{path}'
+        self._f = open(path, 'a', encoding='utf-8', buffering=1 << 16)
+
+    def __call__(self, event: dict):
+        self._f.write(json.dumps(event) + '\n')
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+
+def print_sink(event: dict):
+    """Sink de depuración: imprime cada evento."""
+    print('emit:', event)
@@ -0,0 +1,156 @@
+"""
+Suscripciones por cliente WebSocket: controles, tipos de evento y tasa (Python)
+
+Un cliente ``/ws`` (protocolo JSON de un evento por frame) puede limitar lo
+que recibe con un mensaje::
+
+    {"type": "subscribe", "ids": ["l2", "r2", "cross"], "types": ["axis", "button"],
+     "maxRate": {"l2": 30, "*": 60}}
+
+o con los mismos campos en la URL al conectar:
+``/ws?ids=l2,r2,cross&types=axis,button&maxRate=30``.
+
+- ids: ejes y botones a recibir (los demás tipos de evento no se filtran
+  por id); sin ``ids`` llegan todos
+- types: tipos de evento a recibir (``axis``, ``button``, ``device``...)
+- maxRate: eventos/s máximos por eje, un número para todos o un objeto por
+  id con ``"*"`` por defecto; el último valor retenido se envía al cumplirse
+  el intervalo, así el cliente nunca se queda con un valor viejo
+
+``{"type": "subscribe"}`` sin campos vuelve a recibir todo. Cada
+suscripción se compila a ``frozenset`` y a un dict de intervalos, así
+decidir si un evento va a un cliente es O(1).
+
+@module subscription
+"""
+
+import math
+from typing import Any, Dict, Optional, Tuple
+
+CONTROL_TYPES = ('axis', 'button')
+
+
+def _names(value: Any, field: str) -> Optional[frozenset]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [v for v in value.split(',') if v]
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f'subscribe: {field} must be a list of strings')
+    return frozenset(value)
+
+
+def _rate(value: Any, field: str) -> float:
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f'subscribe: {field} must be a number') from None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < 0:
+        raise ValueError(f'subscribe: {field} must be a non-negative number')
+    return float(value)
+
+
+class Subscription:
+    """Filtro compilado de un cliente + valores de eje retenidos por ``maxRate``."""
+
+    __slots__ = ('ids', 'types', '_interval', '_default', '_last', 'pending', 'throttled', 'timer')
+
+    def __init__(self, ids: Optional[frozenset] = None, types: Optional[frozenset] = None,
+                 max_rate: Optional[Dict[str, float]] = None):
+        self.ids = ids
+        self.types = types
+        rates = dict(max_rate or {})
+        default = rates.pop('*', 0.0)
+        self._default = 1.0 / default if default else 0.0
+        self._interval = {cid: 1.0 / r if r else 0.0 for cid, r in rates.items()}
+        self._last: Dict[Tuple, float] = {}    # clave de eje -> último envío (monotónico)
+        self.pending: Dict[Tuple, dict] = {}   # clave de eje -> último evento retenido
+        self.throttled = 0
+        self.timer = None                      # asyncio.TimerHandle del próximo envío retenido
+
+    @classmethod
+    def parse(cls, obj: Dict[str, Any]) -> Optional['Subscription']:
+        """Suscripción de un mensaje o de los parámetros de la URL; None = sin filtro."""
+        ids = _names(obj.get('ids'), 'ids')
+        types = _names(obj.get('types'), 'types')
+        rate = obj.get('maxRate')
+        if isinstance(rate, dict):
+            max_rate = {str(k): _rate(v, f'maxRate.{k}') for k, v in rate.items()}
+        elif rate is not None:
+            max_rate = {'*': _rate(rate, 'maxRate')}
+        else:
+            max_rate = None
+        if ids is None and types is None and not max_rate:
+            return None
+        return cls(ids, types, max_rate)
+
+    def accepts(self, msg: dict) -> bool:
+        """True si el evento pasa los filtros de tipo e id."""
+        kind = msg.get('type')
+        if self.types is not None and kind not in self.types:
+            return False
+        if self.ids is not None and kind in CONTROL_TYPES and msg.get('id') not in self.ids:
+            return False
+        return True
+
+    def interval(self, cid: str) -> float:
+        return self._interval.get(cid, self._default)
+
+    def throttle(self, key: Tuple, msg: dict, now: float) -> bool:
+        """
+        True si el evento de eje se puede enviar ya; si no, queda retenido en
+        ``pending`` (sustituyendo al anterior) hasta ``due(key)``.
+        """
+        interval = self.interval(key[1])
+        if not interval or now - self._last.get(key, -math.inf) >= interval:
+            self._last[key] = now
+            self.pending.pop(key, None)
+            return True
+        self.pending[key] = msg
+        self.throttled += 1
+        return False
+
+    def due(self, key: Tuple) -> float:
+        return self._last.get(key, -math.inf) + self.interval(key[1])
+
+    def take_due(self, now: float) -> list:
+        """Eventos retenidos cuyo intervalo ya pasó (y los marca como enviados)."""
+        out = []
+        for key in [k for k in self.pending if self.due(k) <= now]:
+            out.append(self.pending.pop(key))
+            self._last[key] = now
+        return out
+
+    @property
+    def next_due(self) -> Optional[float]:
+        return min((self.due(k) for k in self.pending), default=None)
+
+    def filter_snapshot(self, snap: dict) -> dict:
+        """Instantánea (sync_state) reducida a los controles suscritos."""
+        def reduce(controls):
+            out = {}
+            for field, kind in (('axes', 'axis'), ('buttons', 'button')):
+                if self.types is not None and kind not in self.types:
+                    out[field] = {}
+                elif self.ids is not None:
+                    out[field] = {k: v for k, v in controls[field].items() if k in self.ids}
+                else:
+                    out[field] = controls[field]
+            return out
+
+        snap = dict(snap, **reduce(snap))
+        if 'devices' in snap:
+            snap['devices'] = {dev: reduce(c) for dev, c in snap['devices'].items()}
+        return snap
+
+    def close(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self.pending.clear()
+
+    def stats(self) -> dict:
+        return {'ids': sorted(self.ids) if self.ids is not None else None,
+                'types': sorted(self.types) if self.types is not None else None,
+                'throttled': self.throttled, 'pending': len(self.pending)}
@@ -0,0 +1,88 @@
+"""
+Estado completo versionado para sincronizar clientes WebSocket (Python)
+
+El servidor pasa cada evento por ``StateSync.apply``, que le asigna un
+número de secuencia, actualiza el valor actual de cada eje y botón (por
+dispositivo con HID_MULTI) y lo guarda en un historial acotado.
+
+Al conectar, un cliente ``/ws`` recibe una instantánea::
+
+    {"type": "snapshot", "seq": 812, "epoch": "...", "axes": {...}, "buttons": {...}}
+
+y después los deltas habituales con su ``seq``. Un cliente que reconecta
+con ``/ws?since=812&epoch=...`` recibe sólo los eventos que se perdió (en
+un único frame JSON array) si siguen en el historial; si no (historial
+desbordado, otro ``epoch`` porque el servidor se reinició o un ``seq``
+desconocido) recibe una instantánea nueva.
+
+@module sync_state
+"""
+
+import itertools
+import os
+import secrets
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+SYNC_HISTORY = int(os.getenv('SYNC_HISTORY', '4096'))
+
+
+def _empty() -> Dict[str, Dict[str, Any]]:
+    return {'axes': {}, 'buttons': {}}
+
+
+class StateSync:
+    """Valores actuales de los controles + historial de los últimos eventos."""
+
+    __slots__ = ('epoch', 'seq', '_controls', '_history')
+
+    def __init__(self, history: int = SYNC_HISTORY):
+        self.epoch = secrets.token_hex(4)  # cambia en cada arranque: invalida los seq anteriores
+        self.seq = 0
+        self._controls: Dict[Optional[str], Dict[str, Dict[str, Any]]] = {}  # dispositivo -> {axes, buttons}
+        self._history: deque = deque(maxlen=max(1, history))                # (seq, evento)
+
+    def apply(self, msg: dict) -> int:
+        """Registra un evento y devuelve su número de secuencia."""
+        self.seq = seq = self.seq + 1
+        kind = msg.get('type')
+        if kind == 'axis' or kind == 'button':
+            dev = msg.get('device')
+            controls = self._controls.get(dev)
+            if controls is None:
+                controls = self._controls[dev] = _empty()
+            controls['axes' if kind == 'axis' else 'buttons'][msg['id']] = msg['value']
+        elif kind == 'device' and not msg.get('value'):
+            self._controls.pop(msg.get('id'), None)  # control desconectado
+        self._history.append((seq, msg))
+        return seq
+
+    def snapshot(self) -> dict:
+        """Instantánea de todos los valores conocidos con el ``seq`` del último evento."""
+        main = self._controls.get(None) or _empty()
+        snap = {'type': 'snapshot', 'seq': self.seq, 'epoch': self.epoch,
+                'axes': dict(main['axes']), 'buttons': dict(main['buttons'])}
+        devices = {dev: {'axes': dict(c['axes']), 'buttons': dict(c['buttons'])}
+                   for dev, c in self._controls.items() if dev is not None}
+        if devices:
+            snap['devices'] = devices
+        return snap
+
+    def since(self, seq: int, epoch: Optional[str]) -> Optional[List[dict]]:
+        """
+        Eventos posteriores a ``seq`` (con su ``seq``), o None si no se
+        pueden reconstruir y hay que enviar una instantánea.
+        """
+        if epoch != self.epoch or not 0 <= seq <= self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        history = self._history
+        if not history or history[0][0] > seq + 1:
+            return None  # ya salieron del historial
+        start = seq + 1 - history[0][0]
+        return [dict(msg, seq=s) for s, msg in itertools.islice(history, start, None)]
+
+    def stats(self) -> dict:
+        return {'seq': self.seq, 'epoch': self.epoch, 'history': len(self._history),
+                'oldest': self._history[0][0] if self._history else None}
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+from python import auto_map
+from python.auto_map_core import choose_candidate, infer_mappings_from_labeled_reports, stream_diffs
+
+def test_import_has_no_side_effects():
+    code = 'import sys, python.auto_map; print(sorted(m for m in ("hid", "numpy", "fastapi") if m in sys.modules))'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
+
+def test_stream_diffs_skips_unchanged_reports():
+    reports = [[0,0,0], [0,0,0], [0,4,0], [0,4,0], [1,4,0]]
+    diffs = list(stream_diffs(reports))
+    assert diffs == [[{'idx':1,'before':0,'after':4,'xor':4}], [{'idx':0,'before':0,'after':1,'xor':1}]]
+    first = next(stream_diffs(iter([[0,0,9]]), baseline=[0,0,0]))
+    assert first[0]['idx'] == 2
+
+def test_choose_candidate_prefers_single_bit():
+    diffs = [{'idx':1,'xor':3}, {'idx':4,'xor':16}]
+    assert choose_candidate(diffs)['idx'] == 4
+    assert choose_candidate([{'idx':1,'xor':7}, {'idx':2,'xor':3}])['idx'] == 2
+    assert choose_candidate([]) is None
+
+def test_cli_mapper_with_fake_diffs(capsys):
+    diffs = iter(stream_diffs([[0,0], [0,1], [0,0], [2,0]] * 20))
+    def next_diff():
+        d = next(diffs, None)
+        if d is None:
+            raise TimeoutError()
+        return d
+    mapping = auto_map.run_mapper(next_diff, ask=lambda _: None)
+    assert mapping['buttons']['square'] == [1, 1]
+    assert set(mapping['axes']) == set(auto_map.AXES)
+    assert auto_map.infer_mappings_from_labeled_reports is infer_mappings_from_labeled_reports
@@ -11,3 +11,22 @@ def test_infer_mappings_from_labeled_reports():
     assert 'cross' in mapping and mapping['cross'][0] == 5 and mapping['cross'][1] == 32
     assert mapping['circle'][1] == 64
     assert mapping['square'][1] == 16
+
+def test_map_from_samples_prefers_the_store(tmp_path, monkeypatch, capsys):
+    import json
+    from python.sample_store import SampleStore
+    monkeypatch.chdir(tmp_path)
+    before = bytes(7)
+    (tmp_path / '.ds4map.samples.json').write_text(json.dumps(
+        [{'label': 'cross', 'before': list(before), 'after': [0, 0, 0, 0, 0, 0, 1]}]))
+    assert [p[0] for p in auto_map.load_samples()] == ['cross']  # sin almacén: JSON
+    with SampleStore('.ds4map.samples.ds4m', width=7) as store:
+        for label, mask in (('cross', 32), ('circle', 64), ('cross', 32)):
+            store.append(label, before, bytes([0, 0, 0, 0, 0, mask, 0]))
+    assert [p[0] for p in auto_map.load_samples(['cross'])] == ['cross', 'cross']
+    (tmp_path / '.ds4map.json').write_text(json.dumps({'axes': {'lx': 1}, 'buttons': {'square': [5, 16]}}))
+    assert auto_map.main(['--from-samples']) == 0
+    mapping = json.loads((tmp_path / '.ds4map.json').read_text())
+    assert mapping['axes'] == {'lx': 1}
+    assert mapping['buttons'] == {'square': [5, 16], 'cross': [5, 32], 'circle': [5, 64]}
+    assert 'Mapped cross -> [5, 32]' in capsys.readouterr().out
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from python.axis_filter import AxisFilter, _axis_config, compile_axis_filter
+from python.benchmarks.bench_axis_filter import FILTERS, jittery_reports, run
+from python.daemon import DEFAULT_MAP, Daemon
+from python.decoder import compile_mapping
+
+def make(**conf):
+    return AxisFilter(['x'], [True], [_axis_config('x', {'*': conf})])
+
+def test_deadzone_and_step():
+    f = make(deadzone=0.1, step=0.05)
+    assert f._shape(0, 0.05) == 0.0 and f._shape(0, -0.09) == 0.0
+    assert f._shape(0, 0.1) == 0.0          # rescaled: starts at 0 on the edge
+    assert f._shape(0, 1.0) == 1.0 and f._shape(0, -1.0) == -1.0
+    assert f._shape(0, 0.55) == 0.5
+
+def test_hysteresis_holds_then_settles():
+    f = make(hysteresis=0.1, settleMs=30)
+    assert f.update([0.5], 0.0) == [{'type':'axis','id':'x','value':0.5}]
+    assert f.update([0.55], 0.004) == [] and f.npending == 1
+    assert f.update([0.5], 0.008) == [] and f.npending == 0      # jitter back: nothing to send
+    assert f.update([0.56], 0.012) == []
+    assert f.deadline == pytest.approx(0.042)
+    assert f.flush(0.041) == []
+    assert f.flush(0.042) == [{'type':'axis','id':'x','value':0.56}]
+    assert f.update([0.0], 0.05) == [{'type':'axis','id':'x','value':0.0}]  # rest always sent
+
+def test_stick_extremes_always_pass_hysteresis():
+    from python.decoder import STICK_SCALE
+    lo, hi = STICK_SCALE[0], STICK_SCALE[255]   # -1.01 y 1.0
+    f = make(hysteresis=0.2)
+    assert f.update([-0.9], 0.0)[0]['value'] == -0.9
+    assert f.update([lo], 0.004) == [{'type':'axis','id':'x','value':lo}]
+    assert f.update([0.9], 0.008)[0]['value'] == 0.9
+    assert f.update([hi], 0.012) == [{'type':'axis','id':'x','value':hi}]
+    assert f.npending == 0
+
+def test_max_rate_keeps_latest_value():
+    f = make(maxRate=50)   # 20 ms
+    events = []
+    for k in range(10):
+        events += f.update([k / 10], k * 0.004)
+    while f.npending:
+        events += f.flush(f.deadline)
+    times_values = [e['value'] for e in events]
+    assert times_values[-1] == 0.9
+    assert len(events) <= 4
+
+def test_invalid_config_rejected():
+    dec = compile_mapping(DEFAULT_MAP)
+    for bad in ({'*': {'deadzone': -1}}, {'*': {'bogus': 1}}, {'lstick_x': 3}, [], {'*': {'deadzone': 1}}):
+        with pytest.raises(ValueError):
+            compile_axis_filter(dict(DEFAULT_MAP, axisFilters=bad), dec)
+    assert compile_axis_filter(DEFAULT_MAP, dec) is None
+
+def test_idle_jitter_cut_by_order_of_magnitude():
+    idle = jittery_reports(4, 250, noise=3)
+    legacy = run(idle, 250, DEFAULT_MAP)
+    filtered = run(idle, 250, dict(DEFAULT_MAP, axisFilters=FILTERS))
+    assert len(filtered) * 10 <= len(legacy)
+
+def test_daemon_flushes_settled_value_without_new_reports():
+    mapping = dict(DEFAULT_MAP, axisFilters={'*': {'hysteresis': 0.2, 'settleMs': 10}})
+    events = []
+    async def run_daemon():
+        d = Daemon(mapping)
+        r = bytearray(64); r[1:5] = bytes([128] * 4)
+        d.handle_report(bytes(r), events.append)
+        r[1] = 140                                   # +0.09: below hysteresis, held
+        d.handle_report(bytes(r), events.append)
+        held = [e for e in events if e['id'] == 'lstick_x']
+        await asyncio.sleep(0.05)
+        return held
+    held = asyncio.run(run_daemon())
+    values = [e['value'] for e in events if e['id'] == 'lstick_x']
+    assert len(held) == 1 and values[-1] == 0.09
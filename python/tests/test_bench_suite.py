@@ -0,0 +1,26 @@
+from python.benchmarks import suite
+
+def test_compare_flags_only_large_regressions():
+    base = {'a': {'value': 100.0, 'unit': 'reports/s', 'better': 'higher'},
+            'b': {'value': 10.0, 'unit': 'ms', 'better': 'lower'}}
+    ok = {'a': {'value': 80.0, 'unit': 'reports/s', 'better': 'higher'},
+          'b': {'value': 12.0, 'unit': 'ms', 'better': 'lower'},
+          'new': {'value': 1.0, 'unit': 'ms', 'better': 'lower'}}
+    assert suite.compare(ok, base, 0.5) == []
+    info = {'a': {'value': 1.0, 'unit': 'ns/event', 'better': 'info'}}  # informativa: nunca se compara
+    assert suite.compare(info, base, 0.5) == []
+    bad = {'a': {'value': 50.0, 'unit': 'reports/s', 'better': 'higher'},
+           'b': {'value': 16.0, 'unit': 'ms', 'better': 'lower'}}
+    lines = suite.compare(bad, base, 0.5)
+    assert len(lines) == 2 and lines[0].startswith('a:') and '2.00x worse' in lines[0]
+
+def test_quick_run_is_machine_readable():
+    results = suite.run(['handle_report', 'broadcast'], quick=True, repeat=1)
+    assert {'handle_report.usb', 'handle_report.bt'} <= set(results)
+    assert {f'broadcast.{n}' for n in suite.FANOUT_CLIENTS} <= set(results)
+    assert all(r['value'] > 0 and r['better'] in ('higher', 'lower') for r in results.values())
+
+def test_dispatch_is_relative_to_direct_call():
+    results = suite.run(['dispatch'], quick=True, repeat=1)
+    assert results['dispatch.direct']['better'] == 'info'
+    assert all(results[f'dispatch.{k}']['unit'] == 'x direct' for k in ('inline1', 'inline3', 'async1'))
@@ -0,0 +1,50 @@
+import asyncio
+import json
+from python import server
+from python.binproto import BinaryCodec, RECORD, RECORD_TS
+from python.ws_channel import ClientChannel
+
+class FakeWS:
+    def __init__(self): self.sent = []
+    async def send_text(self, data): self.sent.append(data)
+    async def send_bytes(self, data): self.sent.append(data)
+    async def close(self, code=1000): pass
+
+def test_roundtrip():
+    c = BinaryCodec(['lstick_x', 'cross'])
+    events = [{'type':'axis','id':'lstick_x','value':-0.42}, {'type':'button','id':'cross','value':1}]
+    frame = c.encode(events)
+    assert len(frame) == 2 * RECORD.size
+    assert c.decode(frame) == events
+    framets = c.encode(events, 77)
+    assert len(framets) == 2 * RECORD_TS.size
+    assert [e['ts'] for e in c.decode(framets, ts=True)] == [77, 77]
+
+def test_unknown_id_extends_table():
+    c = BinaryCodec(['cross'])
+    c.encode([{'type':'button','id':'touchpad','value':1}, {'type':'collect_status'}])
+    assert c.ids == ['cross', 'touchpad']
+
+def test_binary_clients_get_records_and_new_table(monkeypatch):
+    monkeypatch.setattr(server, 'codec', BinaryCodec(['cross']))
+    async def run():
+        ch = ClientChannel(FakeWS())
+        server.binary_clients.add(ch)
+        server.broadcast({'type':'button','id':'cross','value':1})
+        server.broadcast({'type':'button','id':'brand_new','value':1})
+        task = asyncio.create_task(ch.run())
+        await asyncio.sleep(0.01)
+        ch.close(); await task
+        return ch
+    try:
+        ch = asyncio.run(run())
+        table, frame = ch.ws.sent
+        assert json.loads(table)['ids'][-1] == 'brand_new'
+        assert [e['id'] for e in server.codec.decode(frame)] == ['cross', 'brand_new']
+    finally:
+        server.binary_clients.clear()
+
+def test_device_tag_namespaces_ids():
+    c = BinaryCodec(['cross'])
+    frame = c.encode([{'type':'button','id':'cross','value':1,'device':'pad1'}])
+    assert c.decode(frame)[0]['id'] == 'pad1/cross'
@@ -10,12 +10,35 @@ def make_report(length=12, changes=None):
         for k,v in changes.items(): r[int(k)] = v
     return r
 
+# mapping recorded from full Bluetooth reports (buttons two bytes further in)
+BT_MAP = {'axes': {'lstick_x': 3}, 'buttons': {'cross': [14, 0x20], 'circle': [14, 0x40], 'l1': [15, 0x01]},
+          'dpad': {'byte': 7, 'mask': 0x0f}}
+
 def test_bluetooth_button_heuristic():
-    d = Daemon()
+    d = Daemon(BT_MAP)
     c = Collector()
     d.handle_report(make_report(8, {5:0}), c.emit)
     d.handle_report(make_report(12, {10:0x20}), c.emit)
-    assert any(e['type']=='button' for e in c.events)
+    assert [e for e in c.events if e['type']=='button'] == [{'type':'button','id':'cross','value':1}]
+    c.events.clear()
+    d.handle_report(make_report(12, {}), c.emit)
+    assert c.events == [{'type':'button','id':'cross','value':0}]
+
+def test_fallback_ignores_multi_bit_and_mapped_bytes():
+    d = Daemon(BT_MAP)
+    c = Collector()
+    d.handle_report(make_report(12), c.emit)
+    c.events.clear()
+    d.handle_report(make_report(12, {10:0x60}), c.emit)   # two bits at once: not a button
+    d.handle_report(make_report(12, {3:0x01}), c.emit)    # lstick_x byte is never a candidate
+    assert not [e for e in c.events if e['type']=='button']
+    d.handle_report(make_report(12, {3:0x01, 9:0x01}), c.emit)
+    assert c.events[-1] == {'type':'button','id':'l1','value':1}
+
+def test_no_fallback_when_everything_fits():
+    d = Daemon(BT_MAP)
+    assert d.decoder._plan(64).fallback is None
+    assert d.decoder._plan(12).fallback is not None
 
 def test_bluetooth_axis_heuristic():
     d = Daemon()
@@ -0,0 +1,49 @@
+from python.daemon import DEFAULT_MAP
+from python.decoder import compile_mapping, DPAD_NEUTRAL
+from python.benchmarks.bench_decoder import make_reports, run_legacy, run_compiled
+
+def make_report(length=12, changes=None):
+    r = [0]*length
+    if changes:
+        for k,v in changes.items(): r[int(k)] = v
+    return bytes(r)
+
+def test_matches_legacy_path():
+    reports = make_reports(2000, 64, seed=7)
+    a, b = [], []
+    run_legacy(DEFAULT_MAP, reports, a.append)
+    run_compiled(DEFAULT_MAP, reports, b.append)
+    assert a == b and a
+
+def test_dpad_diagonal():
+    dec = compile_mapping(DEFAULT_MAP)
+    prev = dec.decode(make_report(12, {5:0x08}))
+    cur = dec.decode(make_report(12, {5:0x03}))
+    events = dec.diff(prev, cur)
+    pressed = {e['id'] for e in events if e['value'] == 1}
+    assert pressed == {'dpad_down', 'dpad_right'}
+    assert prev.dpad == DPAD_NEUTRAL
+
+def test_short_report_skips_out_of_range():
+    dec = compile_mapping(DEFAULT_MAP)
+    st = dec.decode(make_report(6, {1:255}))
+    assert st.axes[dec.axis_ids.index('lstick_x')] == 1.0
+    assert st.axes[dec.axis_ids.index('r2')] is None
+    assert st.buttons == 0
+
+def test_invalid_entries_dropped_at_compile():
+    dec = compile_mapping({'axes': {'lstick_x': None, 'l2': 8}, 'buttons': {'x': [5], 'cross': [5, 32]}, 'dpad': {'byte': None, 'mask': None}})
+    assert dec.axis_ids == ('l2',)
+    assert dec.button_ids == ('cross',)
+    assert dec.decode(make_report(12)).dpad == DPAD_NEUTRAL
+
+def test_digital_changed_ignores_axes_and_sensors():
+    dec = compile_mapping(DEFAULT_MAP)
+    a = bytearray(64); a[5] = 0x08
+    b = bytearray(a); b[1] = 255; b[13] = 7            # eje e IMU
+    assert not dec.digital_changed(bytes(a), bytes(b))
+    b[5] = 0x02                                        # D-pad
+    assert dec.digital_changed(bytes(a), bytes(b))
+    b = bytearray(a); b[6] = 0x01                      # l1
+    assert dec.digital_changed(bytes(a), bytes(b))
+    assert dec.digital_changed(bytes(a), bytes(a[:10]))
@@ -0,0 +1,108 @@
+import os
+import socket
+import subprocess
+import sys
+import pytest
+from python.headless import DatagramSink, FrameReader, parse_target
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def receiver(tmp_path):
+    path = str(tmp_path / 'ds4.sock')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(path)
+    sock.settimeout(1)
+    yield f'unix:{path}', sock
+    sock.close()
+
+def frames(sock, reader):
+    sock.setblocking(False)
+    out = []
+    try:
+        while True:
+            out.append(reader.read(sock.recv(65536)))
+    except BlockingIOError:
+        return out
+
+def test_parse_target():
+    assert parse_target('unix:/tmp/x.sock') == (socket.AF_UNIX, '/tmp/x.sock')
+    assert parse_target('udp:10.0.0.2:9000') == (socket.AF_INET, ('10.0.0.2', 9000))
+    assert parse_target('udp::9000') == (socket.AF_INET, ('127.0.0.1', 9000))
+    for bad in ('unix:', 'udp:host', 'tcp:1.2.3.4:5', '/tmp/x.sock'):
+        with pytest.raises(ValueError):
+            parse_target(bad)
+    with pytest.raises(ValueError):
+        DatagramSink('udp:127.0.0.1:9', frames='json')
+
+def test_events_frames_and_table(receiver):
+    target, sock = receiver
+    sink, reader = DatagramSink(target, 'events'), FrameReader()
+    sink.add('lstick_x', 'axis')
+    sink.send_table()
+    sink({'type': 'axis', 'id': 'lstick_x', 'value': -0.5})
+    sink({'type': 'button', 'id': 'cross', 'value': 1, 'device': 'ds4-2'})  # id nuevo: tabla antes
+    sink({'type': 'battery', 'id': 'battery', 'value': 0.8, 'charging': 1})
+    sink({'type': 'motion', 'id': 'imu', 'value': {'gyro_x': -3.4, 'accel_y': 8192}})
+    sink({'type': 'device', 'id': 'ds4-2', 'status': 'connected'})          # sin registro binario
+    got = frames(sock, reader)
+    assert [f['kind'] for f in got] == ['table', 'events', 'table', 'events', 'table', 'events', 'table', 'events']
+    events = [e for f in got if f['kind'] == 'events' for e in f['events']]
+    assert events == [
+        {'type': 'axis', 'id': 'lstick_x', 'value': -0.5},
+        {'type': 'button', 'id': 'ds4-2/cross', 'value': 1},
+        {'type': 'battery', 'id': 'battery', 'value': 0.8},
+        {'type': 'button', 'id': 'charging', 'value': 1},
+        {'type': 'motion', 'id': 'gyro_x', 'value': -3},
+        {'type': 'motion', 'id': 'accel_y', 'value': 8192}]
+    assert reader.lost == 0 and sink.stats()['dropped'] == 0
+    assert [f['seq'] for f in got] == list(range(1, 9))
+    assert all(a['t_ns'] <= b['t_ns'] for a, b in zip(got, got[1:]))
+    sink.close()
+
+def test_state_frame_per_report(receiver):
+    import asyncio
+    target, sock = receiver
+    sink, reader = DatagramSink(target, 'state'), FrameReader()
+    sink.add('lstick_x', 'axis')
+    sink.add('cross')
+    sink.send_table()
+
+    async def report():
+        sink({'type': 'axis', 'id': 'lstick_x', 'value': 1.0})
+        sink({'type': 'button', 'id': 'cross', 'value': 1})
+        await asyncio.sleep(0)
+
+    asyncio.run(report())
+    got = frames(sock, reader)
+    assert [f['kind'] for f in got] == ['table', 'state']
+    assert got[1]['state'] == {'lstick_x': 1.0, 'cross': 1}
+    sink({'type': 'axis', 'id': 'lstick_x', 'value': 7})    # sin event loop: envío inmediato, saturado
+    assert frames(sock, reader)[-1]['state'] == {'lstick_x': 32767 / 10000, 'cross': 1}
+    sink.close()
+
+def test_no_listener_is_counted_not_raised(tmp_path):
+    sink = DatagramSink(f'unix:{tmp_path}/nobody.sock')
+    sink({'type': 'button', 'id': 'cross', 'value': 1})
+    assert sink.stats() == {'target': f'unix:{tmp_path}/nobody.sock', 'frames': 'events',
+                            'sent': 0, 'dropped': 2, 'controls': 1}
+    sink.close()
+
+def test_reader_counts_lost_datagrams(receiver):
+    target, sock = receiver
+    sink, reader = DatagramSink(target), FrameReader()
+    sink.add('cross')
+    sink.send_table()
+    sink.seq += 3  # tres datagramas "perdidos"
+    sink({'type': 'button', 'id': 'cross', 'value': 0})
+    frames(sock, reader)
+    assert reader.lost == 3
+    with pytest.raises(ValueError):
+        reader.read(b'XX' + bytes(14))
+    sink.close()
+
+def test_headless_import_does_not_load_web_stack():
+    code = ('import sys, python.headless, python.daemon; '
+            'print(sorted(m for m in ("fastapi", "uvicorn", "starlette", "hid") if m in sys.modules))')
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
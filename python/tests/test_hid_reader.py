@@ -0,0 +1,69 @@
+import asyncio
+import time
+import pytest
+from python.daemon import Daemon
+from python.hid_reader import ReportQueue
+
+class Collector:
+    def __init__(self): self.events = []
+    def emit(self, m): self.events.append(m)
+
+class FakeDevice:
+    """Blocking-read fake: returns queued reports, then raises like an unplugged pad."""
+    def __init__(self, reports):
+        self.reports = list(reports)
+    def set_nonblocking(self, v): pass
+    def read(self, size, timeout_ms=0):
+        if self.reports:
+            return self.reports.pop(0)
+        time.sleep(0.01)
+        raise OSError('device disconnected')
+
+def test_queue_drop_oldest():
+    q = ReportQueue(2, 'drop_oldest')
+    assert q.put((0, b'a')) is True
+    assert q.put((1, b'b')) is False
+    q.put((2, b'c'))
+    assert [r for _, r in q.drain()] == [b'b', b'c']
+    assert q.stats()['dropped'] == 1
+
+def test_queue_coalesce_keeps_latest():
+    q = ReportQueue(2, 'coalesce')
+    for i, r in enumerate([b'a', b'b', b'c', b'd']):
+        q.put((i, r))
+    assert [r for _, r in q.drain()] == [b'a', b'd']
+    assert q.stats()['coalesced'] == 2
+
+def test_queue_coalesce_keeps_button_edges():
+    from python.daemon import DEFAULT_MAP
+    from python.decoder import compile_mapping
+    dec = compile_mapping(DEFAULT_MAP)
+    q = ReportQueue(2, 'coalesce', dec.digital_changed)
+    idle = bytearray(64); idle[1:5] = bytes([128] * 4); idle[5] = 0x08
+    press = bytearray(idle); press[5] |= 0x20
+    moved = bytearray(idle); moved[1] = 200
+    for i, r in enumerate([idle, idle, press, idle]):  # cross pulsado en un único reporte
+        q.put((i, bytes(r)))
+    assert [r[5] for _, r in q.drain()] == [0x28, 0x08]  # se descartó el más antiguo, no la pulsación
+    assert q.stats()['dropped'] == 2 and q.stats()['coalesced'] == 0
+    for i, r in enumerate([idle, idle, moved]):          # sólo cambia un eje: se reemplaza
+        q.put((i, bytes(r)))
+    assert [r[1] for _, r in q.drain()] == [128, 200] and q.stats()['coalesced'] == 1
+
+def test_queue_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        ReportQueue(4, 'newest')
+
+def test_threaded_reader_feeds_handle_report():
+    d = Daemon()
+    c = Collector()
+    base = [0]*12
+    press = list(base); press[5] = 0x20
+    dev = FakeDevice([base, press, base])
+    with pytest.raises(OSError):
+        asyncio.run(d._read_threaded(dev, c.emit))
+    crosses = [e['value'] for e in c.events if e['id'] == 'cross']
+    assert crosses == [1, 0]
+    st = d.io_stats()
+    assert st['mode'] == 'thread' and st['reports'] == 3
+    assert st['queue']['enqueued'] == 3
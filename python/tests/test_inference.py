@@ -0,0 +1,37 @@
+from python.benchmarks.bench_inference import accuracy, make_pairs
+from python.inference import infer_mappings_batched, score_candidates
+
+LABELED = [
+    ('cross', [0,0,0,0,0,0], [0,0,0,0,0,32]),
+    ('circle', [0,0,0,0,0,0], [0,0,0,0,0,64]),
+    ('square', [0,0,0,0,0,0], [0,0,0,0,0,16]),
+]
+
+def test_simple_labels():
+    mapping, confidence = infer_mappings_batched(LABELED)
+    assert mapping == {'cross': [5,32], 'circle': [5,64], 'square': [5,16]}
+    assert set(confidence) == set(mapping)
+    assert all(0 < c <= 1 for c in confidence.values())
+
+def test_noisy_sessions():
+    pairs = make_pairs(2000, seed=7)
+    mapping, confidence = infer_mappings_batched(pairs)
+    assert accuracy(mapping) == 1.0
+    assert min(confidence.values()) > 0.5
+
+def test_background_bytes_rank_below_button():
+    # byte 2 changes on every attempt of every label (counter-like)
+    pairs = []
+    for k in range(20):
+        for label, bit in (('cross', 5), ('circle', 6)):
+            before = bytes([0, 0, k, 0])
+            after = bytes([0, 0, k + 1, 1 << bit])
+            pairs.append((label, before, after))
+    cands = score_candidates(pairs)
+    assert cands['cross'][0]['idx'] == 3 and cands['cross'][0]['bit'] == 5
+    assert all(c['score'] < cands['cross'][0]['score'] for c in cands['cross'] if c['idx'] == 2)
+
+def test_mixed_lengths_and_empty():
+    mapping, _ = infer_mappings_batched([('x', b'\x00\x00', b'\x00\x00\x00\x04'), ('y', b'\x00', b'\x02')])
+    assert mapping == {'x': [3, 4], 'y': [0, 2]}
+    assert infer_mappings_batched([]) == ({}, {})
@@ -0,0 +1,69 @@
+import asyncio
+import time
+from python.daemon import DEFAULT_MAP, Daemon
+from python.decoder import compile_mapping
+from python.loadgen import LoadGenerator, SyntheticController, simulate
+from python.multi import MultiDeviceDaemon
+
+def test_synthetic_reports_exercise_every_kind_of_control():
+    ctrl = SyntheticController(DEFAULT_MAP, rate=250, seed=3)
+    dec = compile_mapping(DEFAULT_MAP)
+    reports = [ctrl.next_report() for _ in range(250 * 20)]
+    assert {len(r) for r in reports} == {64} and reports[0][0] == 0x01
+    seen, prev = set(), None
+    for r in reports:
+        state = dec.decode(r)
+        if prev is not None:
+            seen.update((e['type'], e['id'][:4]) for e in dec.diff(prev, state))
+        prev = state
+    assert {('button', 'dpad'), ('axis', 'lsti'), ('axis', 'rsti'), ('axis', 'l2'), ('axis', 'r2')} <= seen
+    assert sum(1 for t, i in seen if t == 'button' and i != 'dpad') >= 5
+    assert len({r[7] >> 2 for r in reports[:64]}) == 64                    # contador de reportes
+    again = SyntheticController(DEFAULT_MAP, rate=250, seed=3)
+    assert reports == [again.next_report() for _ in reports]                # determinista por semilla
+
+def test_short_reports_keep_length():
+    ctrl = SyntheticController(DEFAULT_MAP, rate=1000, length=10)
+    assert all(len(ctrl.next_report()) == 10 for _ in range(100))
+
+def test_generator_paces_to_target_rate_and_counts_skips():
+    gen = LoadGenerator(DEFAULT_MAP, rate=500, controllers=2)
+    got = [0, 0]
+    handlers = [lambda r, i=i: got.__setitem__(i, got[i] + 1) for i in range(2)]
+    asyncio.run(gen.run(handlers, duration=0.4))
+    assert got[0] == got[1] == gen.sent // 2
+    assert 150 <= got[0] <= 210 and gen.skipped == 0
+
+    slow = LoadGenerator(DEFAULT_MAP, rate=2000, controllers=1, max_backlog=0.01)
+    asyncio.run(slow.run([lambda r: time.sleep(0.001)], duration=0.3))
+    assert slow.skipped > 0 and slow.stats()['achievedRate'] < 2000
+
+def test_simulate_feeds_real_pipeline_with_tagged_devices():
+    d = Daemon(DEFAULT_MAP)
+    events = []
+    gen = asyncio.run(simulate(d, events.append, rate=250, controllers=3, duration=0.5))
+    assert [e['id'] for e in events if e['type'] == 'device'] == ['sim-0', 'sim-1', 'sim-2']
+    assert {e.get('device') for e in events if e['type'] == 'axis'} == {'sim-0', 'sim-1', 'sim-2'}
+    io = d.io_stats()
+    assert io['mode'] == 'simulate' and io['reports'] == gen.sent and io['load']['controllers'] == 3
+
+def test_single_controller_events_are_untagged_and_multi_lists_devices():
+    d = Daemon(DEFAULT_MAP)
+    events = []
+    asyncio.run(simulate(d, events.append, rate=250, controllers=1, duration=0.2))
+    assert events and all('device' not in e for e in events) and d.prev_state is not None
+
+    m = MultiDeviceDaemon(DEFAULT_MAP)
+    async def run():
+        task = asyncio.create_task(simulate(m, lambda e: None, rate=250, controllers=2))
+        await asyncio.sleep(0.1)
+        devices = set(m.get_status()['devices'])
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return devices
+    assert asyncio.run(run()) == {'sim-0', 'sim-1'} and not m.devices
+
+def test_cli_zero_seconds_reports_zero_rates(capsys):
+    from python.loadgen import main
+    assert main(['--seconds', '0']) == 0
+    assert '0 reports/s' in capsys.readouterr().out
@@ -0,0 +1,53 @@
+import asyncio
+import json
+import pytest
+from python.daemon import Daemon
+from python.map_watch import MapWatcher
+
+class Collector:
+    def __init__(self): self.events = []
+    def emit(self, m): self.events.append(m)
+
+def write_map(path, buttons):
+    path.write_text(json.dumps({'axes': {}, 'buttons': buttons, 'dpad': {'byte': 5, 'mask': 15}}))
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_watcher_fires_on_change(tmp_path, use_inotify):
+    target = tmp_path / '.ds4map.json'
+    write_map(target, {})
+    hits = []
+    async def run():
+        w = MapWatcher(str(target), lambda: hits.append(1), interval=0.01, debounce=0.01, use_inotify=use_inotify)
+        task = asyncio.create_task(w.run())
+        await asyncio.sleep(0.05)
+        write_map(target, {'cross': [5, 32]})
+        for _ in range(50):
+            if hits: break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        return w
+    w = asyncio.run(run())
+    assert hits
+    if not use_inotify:
+        assert w.mode == 'poll'
+
+def test_reload_swaps_decoder_and_keeps_stream(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_map(tmp_path / '.ds4map.json', {'cross': [5, 32]})
+    d = Daemon()
+    c = Collector()
+    d.handle_report([0]*12, c.emit)
+    write_map(tmp_path / '.ds4map.json', {'circle': [5, 64]})
+    assert d.reload_mapping() is True
+    d.handle_report([0,0,0,0,0,64,0,0,0,0,0,0], c.emit)
+    assert c.events == [{'type':'button','id':'circle','value':1}]
+    assert d.reload_stats()['count'] == 1
+
+def test_invalid_reload_keeps_current(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_map(tmp_path / '.ds4map.json', {'cross': [5, 32]})
+    d = Daemon()
+    (tmp_path / '.ds4map.json').write_text('{broken')
+    assert d.reload_mapping() is False
+    assert d.decoder.button_ids == ('cross',)
+    assert d.reload_stats()['lastError']
@@ -0,0 +1,73 @@
+import asyncio
+from python import server
+from python.daemon import DEFAULT_MAP, Daemon
+from python.metrics import Histogram, collect, to_prometheus, tracer
+from python.ws_channel import ClientChannel
+
+class FakeWS:
+    def __init__(self): self.sent = []
+    async def send_text(self, data): self.sent.append(data)
+    async def close(self, code=1000): pass
+
+def test_histogram_percentiles():
+    h = Histogram()
+    for _ in range(98): h.add(0.0001)   # 100 us
+    h.add(0.005); h.add(0.020)
+    st = h.stats()
+    assert st['count'] == 100 and st['maxMs'] == 20.0
+    assert 0.1 <= st['p50Ms'] <= 0.128
+    assert 4.0 <= st['p99Ms'] <= 8.192
+    assert h.buckets()[-1][1] == 100
+
+def test_traced_pipeline_records_every_stage(monkeypatch):
+    monkeypatch.setattr(tracer, 'enabled', True)
+    tracer.reset()
+    async def run():
+        ch = ClientChannel(FakeWS())
+        server.clients.add(ch)
+        task = asyncio.create_task(ch.run())
+        d = Daemon(DEFAULT_MAP)
+        d.handle_report(bytes(64), server.broadcast)
+        d.handle_report(bytes([0, 255] + [0] * 62), server.broadcast)
+        await asyncio.sleep(0.01)
+        ch.close(); await task
+        return ch
+    try:
+        ch = asyncio.run(run())
+    finally:
+        server.clients.clear()
+    assert ch.ws.sent
+    for stage in ('decode', 'emit', 'enqueue', 'send'):
+        assert tracer.stages[stage].count > 0, stage
+    tracer.reset()
+
+def test_disabled_tracer_records_nothing():
+    assert not tracer.enabled
+    tracer.reset()
+    Daemon(DEFAULT_MAP).handle_report(bytes(64), lambda m: None)
+    assert all(h.count == 0 for h in tracer.stages.values())
+
+def test_metrics_endpoint_json_and_prometheus(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+    monkeypatch.chdir(tmp_path)
+    with TestClient(server.app) as client:
+        data = client.get('/api/metrics').json()
+        assert {'reports', 'events', 'reportsPerSec', 'droppedReports', 'sendFailures', 'clients', 'latency'} <= set(data)
+        assert set(data['latency']) == {'decode', 'emit', 'enqueue', 'send'}
+        resp = client.get('/api/metrics?format=prometheus')
+        assert resp.headers['content-type'].startswith('text/plain')
+        assert '# TYPE ds4_latency_seconds histogram' in resp.text
+        assert 'ds4_latency_seconds_count{stage="send"}' in resp.text
+
+def test_prometheus_client_labels():
+    snap = collect({'reports': 3, 'queue': {'dropped': 2, 'coalesced': 0}}, {'json': [ClientChannel(FakeWS())]})
+    text = to_prometheus(snap)
+    assert 'ds4_reports_dropped_total 2' in text
+    assert 'ds4_client_queue_depth{client="' in text and 'group="json"' in text
+
+def test_prometheus_label_values_are_escaped():
+    snap = collect(None, {})
+    snap['sinks'] = [{'name': 'jsonl:C:\\logs\\"ev"\n.jsonl', 'depth': 1, 'dropped': 0}]
+    text = to_prometheus(snap)
+    assert 'ds4_sink_queue_depth{sink="jsonl:C:\\\\logs\\\\\\"ev\\"\\n.jsonl"} 1' in text
+    assert all(line.count('"') % 2 == 0 for line in text.splitlines())
@@ -0,0 +1,92 @@
+import struct
+import pytest
+from python.daemon import DEFAULT_MAP, Daemon
+from python.motion import DEFAULT_REPORT_HZ, DS4_BATTERY, DS4_MOTION, compile_motion
+
+DS4_MAP = dict(DEFAULT_MAP, motion=DS4_MOTION, battery=DS4_BATTERY)
+
+def report(imu=(0, 0, 0, 0, 0, 0), battery=0x08, length=64):
+    r = bytearray(length)
+    r[1:5] = b'\x80' * 4
+    struct.pack_into('<6h', r, 13, *imu)
+    r[30] = battery
+    return bytes(r)
+
+def test_decode_signed_fields_with_gaps():
+    m = compile_motion({'motion': {'accel_x': 20, 'gyro_x': 13, 'gyro_y': 15}})
+    assert m.ids == ('gyro_x', 'gyro_y', 'accel_x')  # por posición en el reporte
+    r = bytearray(24)
+    struct.pack_into('<hh', r, 13, -2, 300)
+    struct.pack_into('<h', r, 20, -32768)
+    assert m.decode(bytes(r)) == (-2, 300, -32768)
+    assert m.decode(bytes(21)) is None
+    assert compile_motion({'axes': {}}) is None
+    for bad in ({'motion': {'a': 13, 'b': 14}}, {'motion': {'a': -1}}, {'motion': [13]},
+                {'motion': {'a': 13}, 'motionStream': {'mode': 'median'}},
+                {'motion': {'a': 13}, 'motionStream': {'rateHz': -5}},
+                {'motion': {'a': 13}, 'motionStream': {'reportHz': 0}},
+                {'battery': {'byte': 30, 'mask': 0}}):
+        with pytest.raises(ValueError):
+            compile_motion(bad)
+
+def test_average_stream_and_battery():
+    m = compile_motion(dict(DS4_MAP, motionStream={'reportHz': 600}))
+    assert m.every == 10
+    assert m.initial_events(report(battery=0x18)) == [
+        {'type': 'battery', 'id': 'battery', 'value': 0.8, 'charging': 1}]
+    out = []
+    for i in range(11):  # 600 reportes/s a 60 Hz: un evento promediado cada 10 reportes
+        out += m.update(report((i if i < 10 else 100, -i if i < 10 else 0, 0, 0, 8192, 0), battery=0x18))
+    assert [e['type'] for e in out] == ['motion', 'motion']
+    assert out[0]['value']['gyro_x'] == 0                     # el primero sale ya
+    assert out[1]['value'] == {'gyro_x': 14.5, 'gyro_y': -4.5, 'gyro_z': 0.0,
+                               'accel_x': 0.0, 'accel_y': 8192.0, 'accel_z': 0.0}
+    battery = lambda evs: [e for e in evs if e['type'] == 'battery']
+    got = [battery(m.update(report(battery=0x05))) for _ in range(600)]  # batería: 1 lectura cada 600 reportes
+    assert [i for i, ev in enumerate(got) if ev] == [589]
+    assert got[589] == [{'type': 'battery', 'id': 'battery', 'value': 0.5, 'charging': 0}]
+    assert m.to_dict()['battery'] == {'level': 0.5, 'charging': 0}
+
+def test_decimate_and_full_rate():
+    m = compile_motion({'motion': {'gyro_x': 13}, 'motionStream': {'rateHz': 0}})
+    assert [e['value']['gyro_x'] for r in (1, 2, 3) for e in m.update(report((r, 0, 0, 0, 0, 0)))] == [1, 2, 3]
+    m = compile_motion({'motion': {'gyro_x': 13}, 'motionStream': {'rateHz': 10, 'mode': 'decimate', 'reportHz': 100}})
+    got = [e['value']['gyro_x'] for i in range(25) for e in m.update(report((i, 0, 0, 0, 0, 0)))]
+    assert got == [0, 10, 20]
+    assert compile_motion({'motion': {'gyro_x': 13}}).every == round(DEFAULT_REPORT_HZ / 60)
+
+def test_stream_depends_on_reports_not_pacing(monkeypatch):
+    import time
+    reports = [report((i, 0, 0, 0, 0, 0), battery=i // 100) for i in range(1000)]
+    runs = []
+    for step in (0.0, 0.1):  # lector al día y lector 100 ms por reporte atrasado
+        clock = iter(range(10 ** 6))
+        monkeypatch.setattr(time, 'monotonic', lambda: next(clock) * step)
+        d, got = Daemon(DS4_MAP), []
+        for r in reports:
+            d.handle_report(r, got.append)
+        runs.append([e for e in got if e['type'] in ('motion', 'battery')])
+    assert runs[0] == runs[1] and len(runs[0]) > 200
+
+def test_default_map_has_no_motion_stream():
+    assert 'motion' not in DEFAULT_MAP and 'battery' not in DEFAULT_MAP
+    d, got = Daemon(DEFAULT_MAP), []
+    for i in range(100):
+        d.handle_report(report((i, 0, 0, 0, 0, 0)), got.append)
+    assert not [e for e in got if e['type'] in ('motion', 'battery')] and 'motion' not in d.get_status()
+
+def test_daemon_emits_motion_battery_and_reloads(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    d = Daemon(DS4_MAP)
+    got = []
+    d.handle_report(report(), got.append)
+    d.handle_report(report((5, 0, 0, 0, 0, 0)), got.append)
+    assert {'type': 'battery', 'id': 'battery', 'value': 0.8, 'charging': 0} in got
+    assert [e['value']['gyro_x'] for e in got if e['type'] == 'motion'] == [5.0]
+    assert d.get_status()['motion']['gyro_x'] == 5
+    d.save_mapping(DEFAULT_MAP)
+    got.clear()
+    d.handle_report(report((9, 0, 0, 0, 0, 0)), got.append)
+    assert got == [] and 'motion' not in d.get_status()
+    with pytest.raises(ValueError):
+        d.save_mapping(dict(DS4_MAP, motion={'gyro_x': 'x'}))
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from python.daemon import Daemon
+from python.hid_reader import ReportQueue
+from python.metrics import collect
+from python.multi import MultiDeviceDaemon, device_id
+
+class FakeDevice:
+    """Returns its scripted reports, then fails like an unplugged pad."""
+    def __init__(self, reports):
+        self.reports = list(reports)
+        self.closed = False
+    def open_path(self, path):
+        self.reports = list(FakeHID.scripts[path])
+    def set_nonblocking(self, v): pass
+    def read(self, size, timeout_ms=0):
+        if self.reports:
+            return self.reports.pop(0)
+        time.sleep(0.005)
+        raise OSError('unplugged')
+    def close(self): self.closed = True
+
+class FakeHID:
+    scripts = {}
+    infos = []
+    @staticmethod
+    def enumerate(): return FakeHID.infos
+    @staticmethod
+    def device(): return FakeDevice([])
+
+def test_device_id_prefers_serial():
+    assert device_id({'serial_number': 'abc', 'path': b'/dev/hidraw0'}) == 'abc'
+    assert device_id({'serial_number': '', 'path': b'/dev/hidraw0'}) == '/dev/hidraw0'
+
+def test_one_reader_per_device_with_tagged_events():
+    base = [0]*12
+    press = list(base); press[5] = 0x20
+    FakeHID.scripts = {b'p0': [base, press], b'p1': [base, base, press]}
+    FakeHID.infos = [
+        {'manufacturer': 'Sony', 'product': 'Wireless Controller', 'path': b'p0', 'serial_number': 'pad0'},
+        {'manufacturer': 'Sony', 'product': 'Wireless Controller', 'path': b'p1', 'serial_number': 'pad1'},
+        {'manufacturer': 'Logitech', 'product': 'Mouse', 'path': b'm', 'serial_number': 'mouse'},
+    ]
+    events, reports = [], []
+    async def run():
+        d = MultiDeviceDaemon({'axes': {}, 'buttons': {'cross': [5, 32]}, 'dpad': {'byte': 5, 'mask': 15}})
+        d.on_report = reports.append  # como publish_daemon en modo WORKERS
+        await d._rescan(FakeHID, events.append)
+        assert set(d._tasks) == {'pad0', 'pad1'}
+        await asyncio.gather(*list(d._tasks.values()))
+        return d
+    d = asyncio.run(run())
+    presses = sorted(e['device'] for e in events if e['type'] == 'button' and e['id'] == 'cross')
+    assert presses == ['pad0', 'pad1']
+    lifecycle = [(e['id'], e['value']) for e in events if e['type'] == 'device']
+    assert sorted(lifecycle) == [('pad0', 0), ('pad0', 1), ('pad1', 0), ('pad1', 1)]
+    assert d.devices == {} and d._tasks == {}
+    assert len(reports) == 5
+
+def test_io_stats_sum_every_device():
+    d = MultiDeviceDaemon({'axes': {}, 'buttons': {'cross': [5, 32]}})
+    for dev_id, n in (('pad0', 3), ('pad1', 5)):
+        child = d.devices[dev_id] = Daemon(d.mapping)
+        for _ in range(n):
+            child._latency.add(0.001)
+    queue = d.devices['pad1']._queue = ReportQueue(4)
+    queue.dropped = 2
+    io = d.io_stats()
+    assert set(io['devices']) == {'pad0', 'pad1'}
+    snap = collect(io, {})
+    assert snap['reports'] == 8 and snap['droppedReports'] == 2
+
+def test_status_reports_each_device_state():
+    d = MultiDeviceDaemon({'axes': {'lstick_x': 1}, 'buttons': {'cross': [5, 32]}})
+    for dev_id, b in (('pad0', 0x20), ('pad1', 0)):
+        child = d.devices[dev_id] = Daemon(d.mapping)
+        r = bytearray(12); r[1] = 255; r[5] = b
+        child.handle_report(bytes(12), lambda ev: None)
+        child.handle_report(bytes(r), lambda ev: None)
+    st = d.get_status()
+    assert st['state'] is None  # el padre no lee ningún dispositivo
+    assert st['devices']['pad0']['state']['buttons'] == {'cross': 1}
+    assert st['devices']['pad1']['state'] == {'axes': {'lstick_x': 1.0}, 'buttons': {'cross': 0}, 'dpad': []}
+    assert len(st['devices']['pad0']['recentReports']) == 1
+    assert 'io' not in st['devices']['pad0'] and set(st['io']['devices']) == {'pad0', 'pad1'}
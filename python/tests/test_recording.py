@@ -0,0 +1,74 @@
+import asyncio
+import time
+from python.benchmarks.bench_decoder import make_reports
+from python.daemon import DEFAULT_MAP, Daemon
+from python.recording import Recording, ReportRecorder, replay, replay_sync
+
+class Collector:
+    def __init__(self): self.events = []
+    def emit(self, m): self.events.append(m)
+
+def test_roundtrip_and_header(tmp_path):
+    path = str(tmp_path / 'a.ds4r')
+    dev = {'vendor_id': 0x054c, 'product_id': 0x05c4, 'product_string': 'Wireless Controller', 'path': b'/dev/hidraw0'}
+    reports = [b'\x01\x02\x03', bytes(range(64)), bytes(range(70))]
+    with ReportRecorder(path, width=64, device=dev) as rec:
+        for i, r in enumerate(reports):
+            rec.write(r, t_ns=rec._t0 + i * 4_000_000)
+    with Recording(path) as rec:
+        assert len(rec) == 3 and rec.width == 64
+        assert rec.device['product_id'] == 0x05c4 and rec.device['path'] == '/dev/hidraw0'
+        assert [r for _, r in rec] == [reports[0], reports[1], reports[2][:64]]
+        assert rec[1][0] == 4_000_000 and abs(rec.duration - 0.008) < 1e-9
+
+def test_truncated_tail_is_ignored(tmp_path):
+    path = tmp_path / 'b.ds4r'
+    with ReportRecorder(str(path), width=16) as rec:
+        rec.write(b'\x01' * 16)
+        rec.write(b'\x02' * 16)
+    data = path.read_bytes()
+    path.write_bytes(data[:-5])
+    with Recording(str(path)) as rec:
+        assert len(rec) == 1 and rec[0][1] == b'\x01' * 16
+
+def test_other_files_rejected_before_mapping(tmp_path, monkeypatch):
+    import pytest
+    from python import recording
+    path = tmp_path / 'c.ds4r'
+    with ReportRecorder(str(path), width=16) as rec:
+        rec.write(b'\x01' * 16)
+    data = bytearray(path.read_bytes())
+    maps = []
+    monkeypatch.setattr(recording.mmap, 'mmap', lambda *a, **k: maps.append(a))
+    for bad in (b'nope' + bytes(data[4:]), bytes(data[:4]) + b'\xff\xff' + bytes(data[6:]), b'\0' * 3):
+        path.write_bytes(bad)
+        with pytest.raises(ValueError):
+            Recording(str(path))
+    assert maps == []  # nunca se llega a mapear (ni a dejar abierto) un archivo ajeno
+
+def test_daemon_record_then_replay_matches(tmp_path):
+    path = str(tmp_path / 'c.ds4r')
+    reports = make_reports(500, 64, seed=3)
+    live, again = Collector(), Collector()
+    d = Daemon(DEFAULT_MAP)
+    d.start_recording(path)
+    for r in reports:
+        d.handle_report(r, live.emit)
+    d.stop_recording()
+    with Recording(path) as rec:
+        d2 = Daemon(DEFAULT_MAP)
+        assert replay_sync(rec, lambda r: d2.handle_report(r, again.emit)) == len(reports)
+    assert again.events == live.events and live.events
+
+def test_async_replay_scaled_time(tmp_path):
+    path = str(tmp_path / 'd.ds4r')
+    with ReportRecorder(path, width=8) as rec:
+        for i in range(5):
+            rec.write(bytes([i]), t_ns=rec._t0 + i * 50_000_000)  # 200 ms en total
+    got = []
+    with Recording(path) as rec:
+        t = time.monotonic()
+        assert asyncio.run(replay(rec, got.append, speed=4.0)) == 5
+        elapsed = time.monotonic() - t
+    assert got[-1] == b'\x04'
+    assert 0.04 <= elapsed < 0.5
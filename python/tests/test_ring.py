@@ -0,0 +1,27 @@
+import pytest
+from python.ring import ReportRing
+
+def test_wraps_and_keeps_order():
+    ring = ReportRing(depth=3, width=4)
+    for i in range(5):
+        ring.append(bytes([i] * 4))
+    assert len(ring) == 3
+    assert ring.last() == [bytes([2]*4), bytes([3]*4), bytes([4]*4)]
+    assert ring[-1] == bytes([4]*4) and ring[0] == bytes([2]*4)
+    with pytest.raises(IndexError):
+        ring[3]
+
+def test_short_reports_are_zero_padded_in_block():
+    ring = ReportRing(depth=2, width=4)
+    ring.append(b'\xff\xff\xff\xff')
+    ring.append(b'\xff\xff\xff\xff')
+    ring.append(b'\x01\x02')  # overwrites a full-width slot
+    data, lens = ring.block()
+    assert data == b'\xff\xff\xff\xff\x01\x02\x00\x00'
+    assert list(lens) == [4, 2]
+    assert ring.to_lists(1) == [[1, 2]]
+
+def test_long_reports_truncated():
+    ring = ReportRing(depth=2, width=2)
+    ring.append(b'\x01\x02\x03')
+    assert ring[-1] == b'\x01\x02'
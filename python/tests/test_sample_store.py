@@ -0,0 +1,100 @@
+import json
+import os
+import pytest
+from python.inference import infer_mappings_batched
+from python.sample_store import DATA_OFFSET, SampleStore, import_json, main
+
+def report(**bits):
+    r = bytearray(10)
+    for idx, mask in bits.values():
+        r[idx] |= mask
+    return bytes(r)
+
+def test_append_and_query_per_label(tmp_path):
+    path = str(tmp_path / 's.ds4m')
+    with SampleStore(path, width=10) as s:
+        assert s.append('cross', bytes(10), report(b=(5, 0x20))) == 0
+        s.append('circle', bytes(10), report(b=(5, 0x40)))
+        s.append('cross', b'\0' * 4, report(b=(5, 0x20)))
+        assert len(s) == 3 and s.labels == {'cross': 2, 'circle': 1}
+        assert s.indices('cross') == [0, 2] and s.indices('nope') == []
+        assert s[2] == ('cross', b'\0' * 4, report(b=(5, 0x20)))
+        assert [p[0] for p in s.pairs()] == ['cross', 'circle', 'cross']
+        assert [p[0] for p in s.pairs(['circle', 'cross'])] == ['circle', 'cross', 'cross']
+        with pytest.raises(ValueError):
+            s.append('cross', bytes(11), bytes(10))
+        with pytest.raises(ValueError):
+            s.append('x' * 33, bytes(10), bytes(10))
+    # reabrir: la cabecera y las cadenas persisten; un registro incompleto se descarta
+    with open(path, 'ab') as f:
+        f.write(b'\1\2\3')
+    with SampleStore(path) as s:
+        assert s.width == 10 and len(s) == 3 and s.labels == {'cross': 2, 'circle': 1}
+        s.append('circle', bytes(10), report(b=(5, 0x40)))
+        assert s.indices('circle') == [1, 3]
+    assert os.path.getsize(path) == DATA_OFFSET + 4 * s.record_size
+
+def _crash_before_header(path, label, before, after):
+    """append() cortado entre escribir el registro y actualizar la cabecera."""
+    with SampleStore(path) as s:
+        s._label_id(label)  # la etiqueta nueva se registra antes que el registro
+        with open(path, 'rb') as f:
+            head = f.read(DATA_OFFSET)
+        s.append(label, before, after)
+    with open(path, 'r+b') as f:
+        f.write(head)
+
+def test_unlinked_final_record_is_relinked_on_open(tmp_path):
+    path = str(tmp_path / 's.ds4m')
+    with SampleStore(path, width=10) as s:
+        s.append('a', bytes(10), report(b=(5, 0x20)))
+    _crash_before_header(path, 'a', bytes(10), report(b=(5, 0x40)))
+    with SampleStore(path) as s:
+        assert len(s) == 2 and s.labels == {'a': 2}
+        assert len(list(s.pairs())) == len(list(s.pairs(['a']))) == 2
+    _crash_before_header(path, 'b', bytes(10), report(b=(6, 1)))  # etiqueta nueva
+    with SampleStore(path) as s:
+        assert len(s) == 3 and s.labels == {'a': 2, 'b': 1} and s.indices('b') == [2]
+        s.append('a', bytes(10), bytes(10))
+        assert s.indices('a') == [0, 1, 3]
+    # un registro que no encaja con la cadena de su etiqueta se descarta
+    _crash_before_header(path, 'b', bytes(10), bytes(10))
+    with open(path, 'r+b') as f:
+        f.seek(DATA_OFFSET + 4 * s.record_size + 6)
+        f.write(b'\x09\0\0\0')
+    with SampleStore(path) as s:
+        assert len(s) == 4 and s.labels == {'a': 3, 'b': 1}
+    assert os.path.getsize(path) == DATA_OFFSET + 4 * s.record_size
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'x.bin'
+    path.write_bytes(b'nope' * 4000)
+    with pytest.raises(ValueError):
+        SampleStore(str(path))
+
+def test_explicit_width_must_match_existing_store(tmp_path):
+    path = str(tmp_path / 's.ds4m')
+    with SampleStore(path, width=10) as s:
+        s.append('cross', bytes(10), bytes(10))
+    with SampleStore(path) as s, SampleStore(path, width=10) as same:
+        assert s.width == same.width == 10
+    with pytest.raises(ValueError, match='width is 10'):
+        SampleStore(path, width=64)
+    jpath = tmp_path / 'samples.json'
+    jpath.write_text(json.dumps([{'label': 'circle', 'before': [0] * 8, 'after': [0] * 8}]))
+    with pytest.raises(ValueError):
+        import_json(str(jpath), path, width=64)
+    assert import_json(str(jpath), path) == 1  # sin width: el del almacén
+
+def test_import_json_and_infer(tmp_path, capsys):
+    samples = [{'label': lbl, 'before': [0] * 8, 'after': list(report(b=(5, m)))[:8]}
+               for lbl, m in (('cross', 0x20), ('circle', 0x40)) for _ in range(3)]
+    jpath, spath = tmp_path / 'samples.json', str(tmp_path / 'samples.ds4m')
+    jpath.write_text(json.dumps(samples))
+    assert import_json(str(jpath), spath) == 6
+    with SampleStore(spath) as s:
+        assert s.width == 8
+        mapping, _ = infer_mappings_batched(s.pairs(['cross']))
+        assert mapping == {'cross': [5, 0x20]}
+    assert main(['infer', spath]) == 0
+    assert json.loads(capsys.readouterr().out)['buttons'] == {'cross': [5, 0x20], 'circle': [5, 0x40]}
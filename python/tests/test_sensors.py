@@ -0,0 +1,39 @@
+import random
+from python.ring import ReportRing
+from python.sensors import SensorStats, detect_sensor_candidates, detect_sensor_candidates_2d
+
+def make_reports(n, seed):
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        length = rnd.choice((10, 12, 12, 16))
+        r = [0]*length
+        r[1] = 200 + rnd.randint(-1, 1)         # battery-like: near constant
+        r[3] = rnd.randrange(256)               # motion-like: noisy
+        r[5] = 128 + rnd.randint(-6, 6)         # borderline variance
+        out.append(bytes(r))
+    return out
+
+def test_variants_match_reference():
+    for seed in range(20):
+        reports = make_reports(8, seed)
+        expected = detect_sensor_candidates([list(r) for r in reports])
+        ring = ReportRing(depth=8, width=16)
+        stats = SensorStats(width=16, window=8)
+        for r in reports:
+            ring.append(r)
+            stats.update(r)
+        data, _ = ring.block()
+        assert detect_sensor_candidates_2d(data, 16) == expected
+        assert stats.candidates() == expected
+
+def test_stats_window_slides():
+    stats = SensorStats(width=4, window=2)
+    stats.update(b'\x00\xff\x00\x00')
+    stats.update(b'\x05\x00\x00\x00')
+    stats.update(b'\x05\x00\x00\x00')
+    assert stats.candidates() == detect_sensor_candidates([[5,0,0,0],[5,0,0,0]])
+
+def test_empty():
+    assert SensorStats().candidates() == {'batteryCandidates': [], 'motionCandidates': []}
+    assert detect_sensor_candidates_2d(b'', 4) == {'batteryCandidates': [], 'motionCandidates': []}
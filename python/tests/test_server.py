@@ -0,0 +1,60 @@
+import asyncio
+import json
+from python import server
+from python.ws_channel import ClientChannel
+
+class FakeWS:
+    def __init__(self): self.sent = []
+    async def send_text(self, data): self.sent.append(data)
+    async def close(self, code=1000): pass
+
+def test_broadcast_drops_closed_channels():
+    async def run():
+        live, dead = ClientChannel(FakeWS()), ClientChannel(FakeWS())
+        dead.close('send failed')
+        server.clients.clear()
+        server.clients.update({live, dead})
+        server.broadcast({'type':'button','id':'cross','value':1})
+        task = asyncio.create_task(live.run())
+        await asyncio.sleep(0.01)
+        live.close(); await task
+        return live, dead
+    try:
+        live, dead = asyncio.run(run())
+        assert server.clients == {live}
+        assert json.loads(live.ws.sent[0])['id'] == 'cross'
+    finally:
+        server.clients.clear()
+
+def test_batch_clients_get_one_array_frame_per_report():
+    async def run():
+        legacy, batched = ClientChannel(FakeWS()), ClientChannel(FakeWS())
+        server.clients.add(legacy)
+        server.batch_clients.add(batched)
+        for ev in ({'type':'button','id':'cross','value':1}, {'type':'axis','id':'lstick_x','value':0.5}, {'type':'axis','id':'lstick_y','value':-0.5}):
+            server.broadcast(ev)
+        tasks = [asyncio.create_task(ch.run()) for ch in (legacy, batched)]
+        await asyncio.sleep(0.01)
+        for ch in (legacy, batched): ch.close()
+        await asyncio.gather(*tasks)
+        return legacy, batched
+    try:
+        legacy, batched = asyncio.run(run())
+        assert len(legacy.ws.sent) == 3
+        assert len(batched.ws.sent) == 1
+        assert [e['id'] for e in json.loads(batched.ws.sent[0])] == ['cross', 'lstick_x', 'lstick_y']
+    finally:
+        server.clients.clear()
+        server.batch_clients.clear()
+
+def test_save_map_updates_shared_daemon(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    monkeypatch.chdir(tmp_path)
+    with TestClient(server.app) as client:
+        shared = server.daemon
+        monkeypatch.setattr(server, 'Daemon', None)  # endpoints must not build a new daemon
+        mapping = {'axes': {'l2': 8}, 'buttons': {'cross': [5, 32]}, 'dpad': {'byte': 5, 'mask': 15}}
+        assert client.post('/api/save-map', json=mapping).json() == {'ok': True}
+        assert server.daemon is shared
+        assert shared.decoder.button_ids == ('cross',)
+        assert json.loads((tmp_path / '.ds4map.json').read_text()) == mapping
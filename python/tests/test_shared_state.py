@@ -0,0 +1,199 @@
+import asyncio
+import multiprocessing
+import pytest
+from python.daemon import DEFAULT_MAP, Daemon
+from python.sync_state import StateSync
+from python import shared_state
+from python.shared_state import SharedStatePublisher, SharedStateReader, follow, publish_daemon, worker_status
+
+@pytest.fixture
+def publisher():
+    pub = SharedStatePublisher(slots=8, slot_size=128, meta_size=4096)
+    yield pub
+    pub.close()
+
+def test_events_report_and_meta_roundtrip(publisher):
+    reader = SharedStateReader(publisher.name)
+    try:
+        assert reader.poll() == [] and reader.report() == b'' and reader.meta() == {}
+        publisher.publish({'type': 'button', 'id': 'cross', 'value': 1})
+        publisher.publish({'type': 'axis', 'id': 'lstick_x', 'value': 0.5})
+        assert [e['id'] for e in reader.poll()] == ['cross', 'lstick_x']
+        assert reader.poll() == []
+        r = bytearray(64); r[5] = 0x28
+        publisher.publish_report(bytes(r))
+        publisher.publish_meta({'mapping': DEFAULT_MAP})
+        assert reader.report() == bytes(r)
+        status = worker_status(reader)
+        assert status['mapping'] == DEFAULT_MAP
+        assert status['state']['buttons']['cross'] == 1
+    finally:
+        reader.close()
+
+def test_new_reader_starts_at_current_event(publisher):
+    publisher.publish({'type': 'button', 'id': 'old', 'value': 1})
+    reader = SharedStateReader(publisher.name)
+    try:
+        publisher.publish({'type': 'button', 'id': 'new', 'value': 1})
+        assert [e['id'] for e in reader.poll()] == ['new']
+    finally:
+        reader.close()
+
+def test_lagging_reader_resyncs_from_snapshot(publisher):
+    reader = SharedStateReader(publisher.name)
+    try:
+        publisher.publish_meta({'mapping': DEFAULT_MAP})
+        r = bytearray(64); r[1:5] = bytes([128] * 4); r[5] = 0x28
+        publisher.publish_report(bytes(r))
+        for i in range(20):  # más que las 8 ranuras
+            publisher.publish({'type': 'axis', 'id': 'lstick_x', 'value': i})
+        events = reader.poll()
+        assert reader.lost == 20 and reader.resyncs == 1
+        assert {'type': 'button', 'id': 'cross', 'value': 1} in events
+        assert not any(e['id'] == 'lstick_x' and e['value'] == 19 for e in events)
+        publisher.publish({'type': 'button', 'id': 'after', 'value': 1})
+        assert [e['id'] for e in reader.poll()] == ['after']
+    finally:
+        reader.close()
+
+class _Preempted(Exception):
+    pass
+
+class _StopBeforeSlotSeq:
+    """SLOT que interrumpe publish() tras copiar el evento, antes de escribir su seq."""
+    slot = shared_state.SLOT
+    size = slot.size
+    unpack_from = slot.unpack_from
+
+    def pack_into(self, buf, off, seq, n):
+        if seq != shared_state.INVALID:
+            raise _Preempted
+        self.slot.pack_into(buf, off, seq, n)
+
+def _publish_interrupted(publisher, event, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(shared_state, 'SLOT', _StopBeforeSlotSeq())
+        with pytest.raises(_Preempted):
+            publisher.publish(event)
+
+def test_reader_lapped_by_exactly_slots_skips_torn_slot(publisher, monkeypatch):
+    reader = SharedStateReader(publisher.name)
+    try:
+        publisher.publish_meta({'mapping': DEFAULT_MAP})
+        r = bytearray(64); r[1:5] = bytes([128] * 4); r[5] = 0x28
+        publisher.publish_report(bytes(r))
+        for i in range(8):  # exactamente las 8 ranuras: el lector sigue en la seq 0
+            publisher.publish({'type': 'note', 'id': 'old', 'value': 'x' * 60 + str(i)})
+        # el escritor empieza a reutilizar la ranura de la seq 0 y el lector lee en ese momento
+        _publish_interrupted(publisher, {'type': 'note', 'id': 'new', 'value': 8}, monkeypatch)
+        events = reader.poll()
+        assert all(e['id'] not in ('old', 'new') for e in events)
+        assert {'type': 'button', 'id': 'cross', 'value': 1} in events
+        assert reader.lost == 8 and reader.resyncs == 1
+    finally:
+        reader.close()
+
+def test_undecodable_slot_is_lost_not_raised(publisher):
+    reader = SharedStateReader(publisher.name)
+    try:
+        publisher.publish({'type': 'button', 'id': 'cross', 'value': 1})
+        publisher.publish({'type': 'button', 'id': 'circle', 'value': 1})
+        off = publisher._ring_off + publisher.slot_size + shared_state.SLOT.size
+        publisher._buf[off:off + 4] = b'\xff\xfe{['
+        assert [e['id'] for e in reader.poll()] == ['cross']
+        assert reader.lost == 1 and reader.resyncs == 1 and reader.next == 2
+    finally:
+        reader.close()
+
+def test_follow_survives_errors(publisher, capsys):
+    reader = SharedStateReader(publisher.name)
+    got = []
+
+    def emit(ev):
+        if ev['id'] == 'boom':
+            raise RuntimeError('sink failed')
+        got.append(ev['id'])
+
+    async def run():
+        task = asyncio.create_task(follow(reader, emit, interval=0.001))
+        publisher.publish({'type': 'button', 'id': 'boom', 'value': 1})
+        await asyncio.sleep(0.02)
+        publisher.publish({'type': 'button', 'id': 'after', 'value': 1})
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+    try:
+        asyncio.run(run())
+        assert got == ['after'] and reader.resyncs == 1
+        assert 'sink failed' in capsys.readouterr().out
+    finally:
+        reader.close()
+
+def test_oversize_event_is_counted_not_written(publisher):
+    publisher.publish({'type': 'note', 'id': 'x' * 200})
+    assert publisher.oversize == 1 and publisher.seq == 0
+
+def _child_poll(name, conn):
+    reader = SharedStateReader(name)
+    got = []
+    while len(got) < 3:
+        got += reader.poll()
+    conn.send([e['value'] for e in got])
+    reader.close()
+
+def test_reader_in_another_process(publisher):
+    parent, child = multiprocessing.Pipe()
+    proc = multiprocessing.Process(target=_child_poll, args=(publisher.name, child))
+    proc.start()
+    import time; time.sleep(0.3)
+    for v in (1, 2, 3):
+        publisher.publish({'type': 'axis', 'id': 'lstick_x', 'value': v})
+    assert parent.poll(10) and parent.recv() == [1, 2, 3]
+    proc.join(5)
+    assert proc.exitcode == 0
+
+def test_publish_daemon_feeds_reader(publisher, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    reader = SharedStateReader(publisher.name)
+    d = Daemon(DEFAULT_MAP)
+    async def idle(emit):
+        await asyncio.Event().wait()
+    d._simulate = idle  # sólo los reportes de la prueba
+    async def run():
+        task = asyncio.create_task(publish_daemon(d, publisher, meta_interval=0.01))
+        await asyncio.sleep(0.05)
+        r = bytearray(64); r[1:5] = bytes([128] * 4)
+        d.handle_report(bytes(r), publisher.publish)
+        r[5] = 0x20
+        d.handle_report(bytes(r), publisher.publish)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    try:
+        asyncio.run(run())
+        assert {'type': 'button', 'id': 'cross', 'value': 1} in reader.poll()
+        assert worker_status(reader)['state']['buttons']['cross'] == 1
+    finally:
+        reader.close()
+
+def test_server_worker_mode_serves_from_shared_state(publisher, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from python import server
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(server, 'SHARED_STATE', publisher.name)
+    monkeypatch.setattr(server, 'sync', StateSync())
+    publisher.publish_meta({'mapping': DEFAULT_MAP, 'io': {'reports': 7}})
+    r = bytearray(64); r[5] = 0x20
+    publisher.publish_report(bytes(r))
+    with TestClient(server.app) as client:
+        assert server.daemon is None
+        assert client.get('/api/status').json()['state']['buttons']['cross'] == 1
+        assert client.get('/api/metrics').json()['reports'] == 7
+        with client.websocket_connect('/ws') as ws:
+            snap = ws.receive_json()
+            assert snap['type'] == 'snapshot' and snap['buttons'] == {'cross': 1}
+            publisher.publish({'type': 'button', 'id': 'circle', 'value': 1})
+            assert ws.receive_json() == {'type': 'button', 'id': 'circle', 'value': 1, 'seq': snap['seq'] + 1}
+        mapping = {'axes': {'l2': 8}, 'buttons': {'cross': [5, 32]}, 'dpad': {'byte': 5, 'mask': 15}}
+        assert client.post('/api/save-map', json=mapping).json() == {'ok': True}
+        assert (tmp_path / '.ds4map.json').exists()
@@ -0,0 +1,91 @@
+import asyncio
+import json
+import time
+from python.daemon import DEFAULT_MAP, Daemon
+from python.sinks import EventDispatcher, JsonLinesSink
+
+def events(n):
+    return [{'type': 'axis', 'id': 'lstick_x', 'value': i} for i in range(n)]
+
+def test_sync_and_async_sinks_get_every_event_in_order():
+    got_sync, got_async = [], []
+
+    async def async_sink(ev):
+        await asyncio.sleep(0)
+        got_async.append(ev['value'])
+
+    async def run():
+        d = EventDispatcher([lambda ev: got_sync.append(ev['value']), async_sink])
+        tasks_before = len(asyncio.all_tasks())
+        for ev in events(500):
+            d.emit(ev)
+        assert len(asyncio.all_tasks()) == tasks_before + 1  # una tarea por sink, no por evento
+        await d.flush()
+        d.close()
+        return d
+    d = asyncio.run(run())
+    assert got_sync == got_async == list(range(500))
+    assert [s['mode'] for s in d.stats()['sinks']] == ['inline', 'async']
+
+def test_slow_sink_does_not_stall_emit_and_drops_oldest():
+    got = []
+
+    async def slow(ev):
+        await asyncio.sleep(0.005)
+        got.append(ev['value'])
+
+    async def run():
+        d = EventDispatcher()
+        sink = d.add(slow, 'slow', maxsize=10)
+        t = time.perf_counter()
+        for ev in events(2000):
+            d.emit(ev)
+        elapsed = time.perf_counter() - t
+        await d.flush()
+        d.close()
+        return sink, elapsed
+    sink, elapsed = asyncio.run(run())
+    assert elapsed < 0.1
+    assert sink.dropped == 1990 and got == list(range(1990, 2000))
+
+def test_failing_sink_is_isolated():
+    got = []
+
+    def bad(ev):
+        raise RuntimeError('boom')
+
+    d = EventDispatcher([bad, lambda ev: got.append(ev)])
+    for ev in events(3):
+        d(ev)
+    assert len(got) == 3
+    assert d.stats()['sinks'][0]['errors'] == 3 and d.stats()['sinks'][0]['lastError'] == 'boom'
+
+def test_queued_sync_sink_and_jsonl_log(tmp_path):
+    path = tmp_path / 'events.jsonl'
+    log = JsonLinesSink(str(path))
+
+    async def run():
+        d = EventDispatcher()
+        d.add(log, 'log', queued=True)
+        for ev in events(100):
+            d.emit(ev)
+        assert not path.read_text()  # nada se escribe dentro de emit
+        await d.flush()
+        d.close()
+    asyncio.run(run())
+    log.close()
+    assert [json.loads(line)['value'] for line in path.read_text().splitlines()] == list(range(100))
+
+def test_daemon_start_awaits_async_emit():
+    got = []
+
+    async def emit(ev):
+        got.append(ev)
+
+    async def run():
+        task = asyncio.create_task(Daemon(DEFAULT_MAP).start(emit))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    asyncio.run(run())
+    assert got and all(e['type'] in ('axis', 'button') for e in got)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import pytest
+from python import server
+from python.subscription import Subscription
+from python.sync_state import StateSync
+
+def ev(kind, cid, value, **extra):
+    return {'type': kind, 'id': cid, 'value': value, **extra}
+
+def test_parse_and_accepts():
+    assert Subscription.parse({}) is None
+    assert Subscription.parse({'type': 'subscribe'}) is None
+    sub = Subscription.parse({'ids': ['l2', 'cross'], 'types': ['axis', 'button', 'device']})
+    assert sub.accepts(ev('axis', 'l2', 0.5)) and sub.accepts(ev('button', 'cross', 1))
+    assert not sub.accepts(ev('axis', 'r2', 0.5))
+    assert sub.accepts(ev('device', 'A', 1))              # ids sólo filtran ejes y botones
+    assert not Subscription.parse({'types': 'button'}).accepts(ev('axis', 'l2', 0.5))
+    q = Subscription.parse({'ids': 'l2,r2', 'maxRate': '20'})  # parámetros de la URL
+    assert q.ids == {'l2', 'r2'} and q.interval('l2') == pytest.approx(0.05)
+    for bad in ({'ids': 'x', 'maxRate': -1}, {'ids': [1]}, {'maxRate': {'l2': 'fast'}}, {'maxRate': True}):
+        with pytest.raises(ValueError):
+            Subscription.parse(bad)
+
+def test_throttle_keeps_latest_value_until_due():
+    sub = Subscription.parse({'maxRate': {'*': 10, 'l2': 0}})
+    key = (None, 'lstick_x')
+    assert sub.throttle(key, ev('axis', 'lstick_x', 0.1), 1.0)
+    assert not sub.throttle(key, ev('axis', 'lstick_x', 0.2), 1.05)
+    assert not sub.throttle(key, ev('axis', 'lstick_x', 0.3), 1.08)
+    assert sub.throttle((None, 'l2'), ev('axis', 'l2', 0.3), 1.08)  # 0 = sin límite
+    assert sub.next_due == pytest.approx(1.1)
+    assert sub.take_due(1.09) == []
+    assert sub.take_due(1.1) == [ev('axis', 'lstick_x', 0.3)]
+    assert sub.throttled == 2 and not sub.pending
+
+def test_filter_snapshot():
+    sub = Subscription.parse({'ids': ['l2', 'cross'], 'types': ['axis']})
+    snap = {'type': 'snapshot', 'seq': 3, 'axes': {'l2': 1.0, 'r2': 0.5}, 'buttons': {'cross': 1},
+            'devices': {'A': {'axes': {'l2': 0.1, 'lstick_x': 0}, 'buttons': {}}}}
+    out = sub.filter_snapshot(snap)
+    assert out['axes'] == {'l2': 1.0} and out['buttons'] == {} and out['seq'] == 3
+    assert out['devices'] == {'A': {'axes': {'l2': 0.1}, 'buttons': {}}}
+    assert snap['axes'] == {'l2': 1.0, 'r2': 0.5}  # la instantánea original no cambia
+
+class ScriptedWS:
+    """WebSocket falso que recibe los mensajes de ``inbox`` (una asyncio.Queue)."""
+    def __init__(self, **params):
+        self.sent = []
+        self.query_params = params
+        self.inbox = asyncio.Queue()
+    async def accept(self): pass
+    async def send_text(self, data): self.sent.append(json.loads(data))
+    async def receive_text(self): return await self.inbox.get()
+    async def close(self, code=1000): pass
+
+@pytest.fixture
+def fresh(monkeypatch):
+    monkeypatch.setattr(server, 'sync', StateSync())
+    server.clients.clear()
+    server.filtered_clients.clear()
+    yield
+    server.clients.clear()
+    server.filtered_clients.clear()
+
+def test_ws_subscribe_message_filters_and_rate_limits(fresh):
+    async def run():
+        plain, narrow = ScriptedWS(), ScriptedWS()
+        tasks = [asyncio.create_task(server.ws_endpoint(ws)) for ws in (plain, narrow)]
+        await asyncio.sleep(0.01)
+        narrow.inbox.put_nowait(json.dumps({'type': 'subscribe', 'ids': ['l2', 'cross'], 'maxRate': {'l2': 20}}))
+        await asyncio.sleep(0.01)
+        assert list(server.filtered_clients) and len(server.clients) == 1
+        for m in (ev('button', 'cross', 1), ev('axis', 'r2', 0.5), ev('axis', 'l2', 0.1),
+                  ev('axis', 'l2', 0.2), ev('axis', 'l2', 0.3)):
+            server.broadcast(m)
+        await asyncio.sleep(0.01)
+        before_flush = list(narrow.sent)
+        await asyncio.sleep(0.08)  # intervalo de 50 ms: se envía el último valor retenido
+        narrow.inbox.put_nowait(json.dumps({'type': 'subscribe', 'ids': 5}))
+        narrow.inbox.put_nowait(json.dumps({'type': 'subscribe'}))
+        await asyncio.sleep(0.01)
+        server.broadcast(ev('axis', 'r2', 0.0))
+        await asyncio.sleep(0.01)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return plain.sent, before_flush, narrow.sent
+    plain, before, narrow = asyncio.run(run())
+    assert len(plain) == 5  # instantánea + todos los eventos (l2 colapsado en la cola)
+    assert [m['type'] for m in before[:2]] == ['snapshot', 'snapshot']
+    assert [(m['id'], m['value'], m['seq']) for m in before[2:]] == [('cross', 1, 1), ('l2', 0.1, 3)]
+    flushed = narrow[len(before)]
+    assert (flushed['id'], flushed['value'], flushed['seq']) == ('l2', 0.3, 5)
+    assert narrow[len(before) + 1]['type'] == 'error'
+    assert narrow[-2]['type'] == 'snapshot' and narrow[-2]['axes'] == {'l2': 0.3, 'r2': 0.5}
+    assert narrow[-1]['id'] == 'r2'                      # sin filtro otra vez
+    assert not server.filtered_clients and not server.clients
+
+def test_ws_query_subscription_filters_snapshot_and_resume(fresh):
+    server.sync.apply(ev('button', 'cross', 1))
+    server.sync.apply(ev('axis', 'l2', 0.4))
+    epoch = server.sync.epoch
+
+    async def run(**params):
+        ws = ScriptedWS(**params)
+        task = asyncio.create_task(server.ws_endpoint(ws))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return ws.sent
+    first = asyncio.run(run(types='button'))
+    assert first[0]['buttons'] == {'cross': 1} and first[0]['axes'] == {}
+    resumed = asyncio.run(run(since='0', epoch=epoch, ids='l2'))
+    assert resumed == [[dict(ev('axis', 'l2', 0.4), seq=2)]]
@@ -0,0 +1,87 @@
+import asyncio
+import json
+from python import server
+from python.sync_state import StateSync
+from python.ws_channel import ClientChannel
+
+def ev(kind, cid, value, **extra):
+    return {'type': kind, 'id': cid, 'value': value, **extra}
+
+def test_snapshot_tracks_latest_values_per_device():
+    s = StateSync()
+    for m in (ev('button', 'cross', 1), ev('axis', 'lstick_x', 0.5), ev('button', 'cross', 0),
+              ev('axis', 'l2', 1.0, device='A'), ev('device', 'B', 1), ev('axis', 'l2', 0.2, device='B'),
+              ev('device', 'B', 0)):
+        s.apply(m)
+    snap = s.snapshot()
+    assert snap['seq'] == 7 and snap['epoch'] == s.epoch
+    assert snap['axes'] == {'lstick_x': 0.5} and snap['buttons'] == {'cross': 0}
+    assert snap['devices'] == {'A': {'axes': {'l2': 1.0}, 'buttons': {}}}
+
+def test_since_returns_missed_events_or_none():
+    s = StateSync(history=4)
+    for i in range(6):
+        s.apply(ev('axis', 'lstick_x', i))
+    assert [m['seq'] for m in s.since(4, s.epoch)] == [5, 6]
+    assert s.since(4, s.epoch)[0]['value'] == 4
+    assert s.since(6, s.epoch) == []
+    assert s.since(2, s.epoch) == [dict(ev('axis', 'lstick_x', i), seq=i + 1) for i in range(2, 6)]
+    assert s.since(1, s.epoch) is None          # seq 2 ya salió del historial
+    assert s.since(4, 'other') is None          # servidor reiniciado
+    assert s.since(9, s.epoch) is None
+
+class FakeWS:
+    def __init__(self, **params):
+        self.sent = []
+        self.query_params = params
+    async def accept(self): pass
+    async def send_text(self, data): self.sent.append(json.loads(data))
+    async def receive_text(self): await asyncio.Event().wait()
+    async def close(self, code=1000): pass
+
+def test_coalesced_axis_keeps_its_queue_seq():
+    async def run():
+        ch = ClientChannel(FakeWS())
+        ch.put('{"type":"axis","id":"x","value":0.1}', 'x', 5)
+        ch.put('{"type":"button","id":"cross","value":1}', None, 6)
+        ch.put('{"type":"axis","id":"x","value":0.9}', 'x', 7)
+        task = asyncio.create_task(ch.run())
+        await asyncio.sleep(0.01)
+        ch.close(); await task
+        return ch.ws.sent
+    sent = asyncio.run(run())
+    assert [(m['id'], m['value'], m['seq']) for m in sent] == [('x', 0.9, 5), ('cross', 1, 6)]
+
+def connect(**params):
+    """Conecta un cliente a server.ws_endpoint, difunde los eventos de ``after`` y devuelve lo recibido."""
+    async def run(events):
+        ws = FakeWS(**params)
+        task = asyncio.create_task(server.ws_endpoint(ws))
+        await asyncio.sleep(0.01)
+        for m in events:
+            server.broadcast(m)
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return ws.sent
+    return run
+
+def test_ws_snapshot_then_deltas_and_resume(monkeypatch):
+    monkeypatch.setattr(server, 'sync', StateSync(history=8))
+    server.clients.clear()
+    server.sync.apply(ev('button', 'cross', 1))
+    server.sync.apply(ev('axis', 'lstick_x', -0.5))
+    first = asyncio.run(connect()([ev('button', 'circle', 1)]))
+    assert first[0]['type'] == 'snapshot' and first[0]['seq'] == 2
+    assert first[0]['buttons'] == {'cross': 1} and first[0]['axes'] == {'lstick_x': -0.5}
+    assert first[1] == dict(ev('button', 'circle', 1), seq=3)
+    epoch = first[0]['epoch']
+
+    for m in (ev('button', 'circle', 0), ev('axis', 'lstick_x', 0.0)):
+        server.broadcast(m)  # mientras el cliente está desconectado
+    resumed = asyncio.run(connect(since='3', epoch=epoch)([]))
+    assert resumed == [[dict(ev('button', 'circle', 0), seq=4), dict(ev('axis', 'lstick_x', 0.0), seq=5)]]
+    assert asyncio.run(connect(since='5', epoch=epoch)([])) == []
+    stale = asyncio.run(connect(since='3', epoch='old')([]))
+    assert stale[0]['type'] == 'snapshot' and stale[0]['buttons'] == {'cross': 1, 'circle': 0}
+    server.clients.clear()
@@ -0,0 +1,66 @@
+import asyncio
+import json
+from python.ws_channel import ClientChannel
+
+class FakeWS:
+    def __init__(self, fail=False):
+        self.sent = []
+        self.fail = fail
+        self.closed_code = None
+    async def send_text(self, data):
+        if self.fail:
+            raise ConnectionError('gone')
+        self.sent.append(data)
+    async def close(self, code=1000):
+        self.closed_code = code
+
+def axis(id, v): return json.dumps({'type':'axis','id':id,'value':v})
+def button(id, v): return json.dumps({'type':'button','id':id,'value':v})
+
+def test_axis_coalesced_buttons_kept():
+    async def run():
+        ws = FakeWS()
+        ch = ClientChannel(ws)
+        ch.put(axis('lstick_x', 0.1), 'lstick_x')
+        ch.put(button('cross', 1))
+        ch.put(axis('lstick_x', 0.2), 'lstick_x')
+        ch.put(axis('lstick_x', 0.3), 'lstick_x')
+        ch.put(button('cross', 0))
+        task = asyncio.create_task(ch.run())
+        await asyncio.sleep(0.01)
+        ch.close(); await task
+        return ws, ch
+    ws, ch = asyncio.run(run())
+    assert [json.loads(m)['value'] for m in ws.sent] == [0.3, 1, 0]
+    assert ch.coalesced == 2
+
+def test_overflow_disconnects_slow_client():
+    async def run():
+        ws = FakeWS()
+        ch = ClientChannel(ws, maxsize=3)
+        results = [ch.put(button('cross', i % 2)) for i in range(5)]
+        await ch.run()
+        return ws, ch, results
+    ws, ch, results = asyncio.run(run())
+    assert results == [True, True, True, False, False]
+    assert ch.close_reason == 'queue overflow' and ws.closed_code == 1013
+    assert len(ch) == 0
+
+def test_lag_disconnects_slow_client():
+    async def run():
+        ch = ClientChannel(FakeWS(), max_lag=0.01)
+        ch.put(button('cross', 1))
+        await asyncio.sleep(0.02)
+        return ch.put(button('cross', 0)), ch
+    ok, ch = asyncio.run(run())
+    assert not ok and ch.close_reason == 'lagging'
+
+def test_send_failure_closes_channel():
+    async def run():
+        ch = ClientChannel(FakeWS(fail=True))
+        ch.put(button('cross', 1))
+        await ch.run()
+        return ch
+    ch = asyncio.run(run())
+    assert ch.closed and ch.send_failures == 1
+    assert ch.put(button('cross', 0)) is False
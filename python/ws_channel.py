@@ -0,0 +1,180 @@
+"""
+Canal de salida por cliente WebSocket (Python)
+
+Cada cliente tiene su propia cola acotada y una tarea escritora, de modo que
+un navegador lento no acumula tareas sin límite en el event loop:
+
+- Los eventos de eje pendientes con el mismo ``id`` se colapsan en el último
+  valor (mantienen su posición en la cola).
+- Los flancos de botón y cualquier otro mensaje nunca se descartan; si la
+  cola supera ``maxsize`` el cliente se desconecta.
+- Si el mensaje más antiguo pendiente supera ``max_lag`` segundos el cliente
+  se considera lento y se desconecta.
+- Un fallo de envío cierra el canal en lugar de perderse dentro de una tarea.
+- Con ``seq`` (ver sync_state.py) el número de secuencia se añade al JSON
+  al enviar. Un eje colapsado conserva el ``seq`` de su posición en la
+  cola, así los ``seq`` llegan en orden y un cliente que reanuda desde el
+  último recibido no se salta ningún evento anterior.
+
+EventBatcher agrupa los eventos de un mismo reporte (o de una ventana de
+tiempo) para enviarlos como un único frame JSON serializado una sola vez.
+
+@module ws_channel
+"""
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Callable, List, Optional, Union
+
+from python.metrics import counters, tracer
+
+# Código de cierre WebSocket "Try Again Later" para clientes lentos
+CLOSE_SLOW_CLIENT = 1013
+
+_ids = itertools.count(1)
+
+
+class ClientChannel:
+    """Cola de salida acotada + tarea escritora para un WebSocket."""
+
+    def __init__(self, ws, maxsize: int = 1024, max_lag: float = 2.0):
+        self.ws = ws
+        self.maxsize = maxsize
+        self.max_lag = max_lag
+        self.id = next(_ids)
+        self._queue: deque = deque()  # (t_encolado, clave_eje | None, datos | None, t_lectura | None, seq | None)
+        self._axes = {}               # clave_eje -> (últimos datos pendientes, t_lectura | None)
+        self._wake = asyncio.Event()
+        self.closed = False
+        self.close_reason: Optional[str] = None
+        self.sent = 0
+        self.coalesced = 0
+        self.send_failures = 0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, data: Union[str, bytes], key: Optional[str] = None, seq: Optional[int] = None) -> bool:
+        """
+        Encola un mensaje ya serializado.
+
+        ``key`` identifica mensajes colapsables (ids de eje); ``None`` para
+        mensajes que no se pueden descartar. ``seq`` (sólo con ``data`` un
+        objeto JSON) se añade como campo ``"seq"`` al enviar. Devuelve False
+        si el canal está (o acaba de quedar) cerrado.
+        """
+        if self.closed:
+            return False
+        q = self._queue
+        now = time.monotonic()
+        origin = tracer.t_read if tracer.enabled else None
+        if key is not None:
+            if key in self._axes:
+                self._axes[key] = (data, origin)
+                self.coalesced += 1
+                return True
+            self._axes[key] = (data, origin)
+            q.append((now, key, None, None, seq))
+        else:
+            q.append((now, None, data, origin, seq))
+        if len(q) > self.maxsize:
+            self.close('queue overflow')
+            return False
+        if now - q[0][0] > self.max_lag:
+            self.close('lagging')
+            return False
+        self._wake.set()
+        return True
+
+    def close(self, reason: str = 'closed'):
+        """Marca el canal como cerrado, libera la cola y despierta al escritor."""
+        if self.closed:
+            return
+        self.closed = True
+        self.close_reason = reason
+        if reason in ('queue overflow', 'lagging'):
+            counters.slow_disconnects += 1
+        self._queue.clear()
+        self._axes.clear()
+        self._wake.set()
+
+    async def _send(self, data: Union[str, bytes]):
+        if isinstance(data, str):
+            await self.ws.send_text(data)
+        else:
+            await self.ws.send_bytes(data)
+
+    async def run(self):
+        """Tarea escritora: envía en orden hasta que el canal se cierra."""
+        q, axes = self._queue, self._axes
+        try:
+            while not self.closed:
+                if not q:
+                    self._wake.clear()
+                    await self._wake.wait()
+                    continue
+                _, key, data, origin, seq = q.popleft()
+                if key is not None:
+                    data, origin = axes.pop(key)
+                if seq is not None:
+                    data = f'{data[:-1]},"seq":{seq}}}'
+                await self._send(data)
+                self.sent += 1
+                if origin is not None:
+                    tracer.mark('send', origin)
+        except asyncio.CancelledError:
+            self.close('cancelled')
+            raise
+        except Exception as e:
+            self.send_failures += 1
+            counters.send_failures += 1
+            self.close(f'send failed: {e}')
+        if self.close_reason in ('queue overflow', 'lagging'):
+            try:
+                await self.ws.close(code=CLOSE_SLOW_CLIENT)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        return {'depth': len(self._queue), 'sent': self.sent, 'coalesced': self.coalesced,
+                'sendFailures': self.send_failures, 'closed': self.closed}
+
+
+class EventBatcher:
+    """
+    Acumula eventos y los entrega en lote a ``flush``.
+
+    Con ``window`` <= 0 el lote se vacía en la siguiente vuelta del event
+    loop: como el daemon emite todos los eventos de un reporte de forma
+    síncrona, cada lote corresponde a un reporte (o a los reportes que el
+    modo HID_IO=thread drena de una vez). Con
+    ``window`` > 0 se agrupan los eventos de esa ventana (segundos).
+    """
+
+    def __init__(self, flush: Callable[[List[dict]], None], window: float = 0.0):
+        self.flush = flush
+        self.window = window
+        self._pending: List[dict] = []
+        self._handle: Optional[asyncio.Handle] = None
+        self._origin = 0.0
+
+    def add(self, msg: dict):
+        self._pending.append(msg)
+        if self._handle is None:
+            if tracer.enabled:
+                self._origin = tracer.t_read  # el lote se atribuye a su primer reporte
+            loop = asyncio.get_running_loop()
+            if self.window > 0:
+                self._handle = loop.call_later(self.window, self._flush)
+            else:
+                self._handle = loop.call_soon(self._flush)
+
+    def _flush(self):
+        self._handle = None
+        batch, self._pending = self._pending, []
+        if tracer.enabled:
+            tracer.t_read = self._origin
+        if batch:
+            self.flush(batch)
@@ -2,12 +2,12 @@ const fs = require('fs');
 const path = require('path');
 const core = require('./auto_map_core');
 const utils = require('./auto_map_utils');
+const sampleStore = require('./sample_store');
 
 const DEFAULT_MAP = require('./daemon').mapping || null;
 
 async function collectSamples({ label, count = 3, timeout = 8000, simulate = process.env.SIMULATE === '1', save = true }, progressCb = ()=>{}){
   // returns mapping delta (object)
-  const samplesPath = path.join(process.cwd(), '.ds4map.samples.json');
   const pairs = [];
   if (simulate) {
     // deterministic simulation using default mapping if available, else use byte 5 mask 0x20 for cross
@@ -27,11 +27,9 @@ async function collectSamples({ label, count = 3, timeout = 8000, simulate = pro
     throw new Error('Non-simulated collection not implemented in collect_lib; use collect_samples.js or ensure device is accessible.');
   }
 
-  // Save samples (always persist samples)
-  let existing = [];
-  try { if (fs.existsSync(samplesPath)) existing = JSON.parse(fs.readFileSync(samplesPath,'utf8')); } catch (e) { existing = []; }
-  existing.push(...pairs);
-  fs.writeFileSync(samplesPath, JSON.stringify(existing, null, 2));
+  // Save samples (always persist samples; appended in O(1) when the .ds4m store exists)
+  sampleStore.appendSamples(pairs);
+  const existing = sampleStore.loadSamples();
 
   progressCb({ step: 'inferring' });
   const inferredButtons = core.inferMappingsFromLabeledReports(existing.map(p => ({ label: p.label, before: p.before, after: p.after })));
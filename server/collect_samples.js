@@ -8,6 +8,7 @@ const readline = require('readline');
 const HID = (() => { try { return require('node-hid'); } catch (e) { return null; } })();
 const core = require('./auto_map_core');
 const collectLib = require('./collect_lib');
+const sampleStore = require('./sample_store');
 
 function prompt(q){
   const rl = readline.createInterface({ input: process.stdin, output: process.stdout });
@@ -65,11 +66,8 @@ async function collect(label, count = 3, timeout = 8000){
   }
 
   // save samples
-  const samplesPath = path.join(process.cwd(), '.ds4map.samples.json');
-  let existing = [];
-  try { if (fs.existsSync(samplesPath)) existing = JSON.parse(fs.readFileSync(samplesPath,'utf8')); } catch(e){}
-  existing.push(...pairs);
-  fs.writeFileSync(samplesPath, JSON.stringify(existing, null, 2));
+  const samplesPath = sampleStore.appendSamples(pairs);
+  const existing = sampleStore.loadSamples();
   console.log('Saved samples to', samplesPath);
 
   // attempt inference using core
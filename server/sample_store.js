@@ -0,0 +1,248 @@
+/**
+ * Almacén binario de muestras etiquetadas (Node)
+ *
+ * Mismo formato que python/sample_store.py (.ds4map.samples.ds4m): registros
+ * de ancho fijo de sólo-añadir, cada uno enlazado al anterior de su etiqueta,
+ * y una tabla de etiquetas en la cabecera. Añadir una muestra escribe un
+ * registro al final y 8 bytes de la cabecera, sin leer ni reescribir lo que
+ * ya hay (a diferencia de .ds4map.samples.json).
+ *
+ * Los recolectores usan el almacén si existe (crearlo con
+ * `python -m python.sample_store import`) y si no, el JSON de siempre.
+ *
+ * @module sample_store
+ */
+
+const fs = require('fs');
+const path = require('path');
+
+const MAGIC = 'DS4M';
+const VERSION = 1;
+const HEADER_SIZE = 16;   // magic | versión u16 | ancho u16 | nº etiquetas u32 | reservado u32
+const LABEL_SIZE = 40;    // nombre 32 bytes | nº muestras u32 | última muestra + 1 u32
+const RECORD_SIZE = 12;   // etiqueta u16 | len_before u16 | len_after u16 | - | anterior + 1 u32
+const LABELS_MAX = 255;
+const DATA_OFFSET = Math.ceil((HEADER_SIZE + LABELS_MAX * LABEL_SIZE) / 16) * 16;
+
+const STORE_FILE = '.ds4map.samples.ds4m';
+const JSON_FILE = '.ds4map.samples.json';
+
+function readAt(fd, length, position) {
+  const buf = Buffer.alloc(length);
+  const n = fs.readSync(fd, buf, 0, length, position);
+  return buf.subarray(0, n);
+}
+
+class SampleStore {
+  /**
+   * Abre o crea el almacén
+   * @param {string} file - Ruta del archivo .ds4m
+   * @param {number|null} width - Ancho de registro (64 al crear); si el archivo existe debe coincidir
+   */
+  constructor(file = path.join(process.cwd(), STORE_FILE), width = null) {
+    const exists = fs.existsSync(file) && fs.statSync(file).size > 0;
+    this.file = file;
+    this.fd = fs.openSync(file, exists ? 'r+' : 'w+');
+    this.ids = new Map();
+    this.counts = [];
+    this.heads = [];
+    try {
+      if (exists) {
+        this._load();
+        if (width !== null && width !== this.width) throw new Error(`${file}: store width is ${this.width}, not ${width}`);
+      } else {
+        this.width = width || 64;
+        const head = Buffer.alloc(HEADER_SIZE);
+        head.write(MAGIC, 0, 'latin1');
+        head.writeUInt16LE(VERSION, 4);
+        head.writeUInt16LE(this.width, 6);
+        fs.writeSync(this.fd, head, 0, HEADER_SIZE, 0);
+        fs.ftruncateSync(this.fd, DATA_OFFSET);
+      }
+    } catch (e) {
+      fs.closeSync(this.fd);
+      throw e;
+    }
+    this.recordSize = RECORD_SIZE + 2 * this.width;
+    const size = fs.fstatSync(this.fd).size;
+    this.count = Math.floor((size - DATA_OFFSET) / this.recordSize);
+    this.end = DATA_OFFSET + this.count * this.recordSize;
+    if (size !== this.end) fs.ftruncateSync(this.fd, this.end);  // registro final incompleto
+    if (exists && this.count) this._relinkLast();
+  }
+
+  _load() {
+    const head = readAt(this.fd, DATA_OFFSET, 0);
+    if (head.length < DATA_OFFSET || head.toString('latin1', 0, 4) !== MAGIC || head.readUInt16LE(4) !== VERSION) {
+      throw new Error(`${this.file}: not a sample store (version ${VERSION})`);
+    }
+    this.width = head.readUInt16LE(6);
+    const n = head.readUInt32LE(8);
+    for (let i = 0; i < n; i++) {
+      const off = HEADER_SIZE + i * LABEL_SIZE;
+      const raw = head.subarray(off, off + 32);
+      const len = raw.indexOf(0) === -1 ? 32 : raw.indexOf(0);
+      this.ids.set(raw.toString('utf8', 0, len), i);
+      this.counts.push(head.readUInt32LE(off + 32));
+      this.heads.push(head.readUInt32LE(off + 36));
+    }
+  }
+
+  _writeLabel(lid) {
+    const buf = Buffer.alloc(8);
+    buf.writeUInt32LE(this.counts[lid], 0);
+    buf.writeUInt32LE(this.heads[lid], 4);
+    fs.writeSync(this.fd, buf, 0, 8, HEADER_SIZE + lid * LABEL_SIZE + 32);
+  }
+
+  /** Enlaza el último registro si un corte llegó antes de actualizar la cabecera (como en Python) */
+  _relinkLast() {
+    const i = this.count - 1;
+    const rec = readAt(this.fd, RECORD_SIZE, DATA_OFFSET + i * this.recordSize);
+    const lid = rec.readUInt16LE(0);
+    const prev = rec.readUInt32LE(8);
+    if (lid < this.heads.length && this.heads[lid] === i + 1) return;
+    if (lid < this.heads.length && prev === this.heads[lid]) {
+      this.counts[lid] += 1;
+      this.heads[lid] = i + 1;
+      this._writeLabel(lid);
+    } else {
+      this.count = i;
+      this.end -= this.recordSize;
+      fs.ftruncateSync(this.fd, this.end);
+    }
+  }
+
+  _labelId(label) {
+    let lid = this.ids.get(label);
+    if (lid === undefined) {
+      const name = Buffer.from(String(label), 'utf8');
+      if (!name.length || name.length > 32) throw new Error(`label must be 1-32 bytes of UTF-8: ${label}`);
+      lid = this.counts.length;
+      if (lid >= LABELS_MAX) throw new Error(`too many labels (max ${LABELS_MAX})`);
+      this.ids.set(label, lid);
+      this.counts.push(0);
+      this.heads.push(0);
+      const slot = Buffer.alloc(LABEL_SIZE);
+      name.copy(slot);
+      fs.writeSync(this.fd, slot, 0, LABEL_SIZE, HEADER_SIZE + lid * LABEL_SIZE);
+      const n = Buffer.alloc(4);
+      n.writeUInt32LE(lid + 1, 0);
+      fs.writeSync(this.fd, n, 0, 4, 8);
+    }
+    return lid;
+  }
+
+  /**
+   * Añade una muestra: un registro al final y 8 bytes de cabecera
+   * @returns {number} Índice de la muestra
+   */
+  append(label, before, after) {
+    const width = this.width;
+    if (before.length > width || after.length > width) throw new Error(`report longer than the store width (${width} bytes)`);
+    const lid = this._labelId(label);
+    const i = this.count;
+    const rec = Buffer.alloc(this.recordSize);
+    rec.writeUInt16LE(lid, 0);
+    rec.writeUInt16LE(before.length, 2);
+    rec.writeUInt16LE(after.length, 4);
+    rec.writeUInt32LE(this.heads[lid], 8);
+    Buffer.from(before).copy(rec, RECORD_SIZE);
+    Buffer.from(after).copy(rec, RECORD_SIZE + width);
+    fs.writeSync(this.fd, rec, 0, rec.length, this.end);  // el registro antes que la cabecera
+    this.end += this.recordSize;
+    this.count = i + 1;
+    this.counts[lid] += 1;
+    this.heads[lid] = i + 1;
+    this._writeLabel(lid);
+    return i;
+  }
+
+  /** {etiqueta: nº de muestras} */
+  get labels() {
+    const out = {};
+    for (const [label, lid] of this.ids) out[label] = this.counts[lid];
+    return out;
+  }
+
+  /**
+   * Muestras {label, before, after} en orden de inserción, o sólo las de `labels`
+   * (siguiendo la cadena de cada etiqueta)
+   */
+  pairs(labels = null) {
+    const names = [];
+    for (const [label, lid] of this.ids) names[lid] = label;
+    const size = this.recordSize;
+    const read = (i) => {
+      const rec = readAt(this.fd, size, DATA_OFFSET + i * size);
+      const nb = rec.readUInt16LE(2), na = rec.readUInt16LE(4);
+      return {
+        label: names[rec.readUInt16LE(0)],
+        before: Array.from(rec.subarray(RECORD_SIZE, RECORD_SIZE + nb)),
+        after: Array.from(rec.subarray(RECORD_SIZE + this.width, RECORD_SIZE + this.width + na)),
+      };
+    };
+    const out = [];
+    if (labels === null) {
+      for (let i = 0; i < this.count; i++) out.push(read(i));
+      return out;
+    }
+    for (const label of labels) {
+      const lid = this.ids.get(label);
+      if (lid === undefined) continue;
+      const chain = [];
+      for (let nxt = this.heads[lid]; nxt; nxt = readAt(this.fd, RECORD_SIZE, DATA_OFFSET + (nxt - 1) * size).readUInt32LE(8)) {
+        chain.push(nxt - 1);
+      }
+      chain.reverse().forEach(i => out.push(read(i)));
+    }
+    return out;
+  }
+
+  close() {
+    if (this.fd !== null) {
+      fs.closeSync(this.fd);
+      this.fd = null;
+    }
+  }
+}
+
+/**
+ * Muestras recolectadas: del almacén .ds4m si existe, si no del JSON
+ * @param {string} dir - Directorio de trabajo
+ * @returns {Array<Object>} [{label, before, after}]
+ */
+function loadSamples(dir = process.cwd()) {
+  const storePath = path.join(dir, STORE_FILE);
+  if (fs.existsSync(storePath)) {
+    const store = new SampleStore(storePath);
+    try { return store.pairs(); } finally { store.close(); }
+  }
+  try {
+    const jsonPath = path.join(dir, JSON_FILE);
+    if (fs.existsSync(jsonPath)) return JSON.parse(fs.readFileSync(jsonPath, 'utf8'));
+  } catch (e) { /* JSON corrupto: se empieza de cero como antes */ }
+  return [];
+}
+
+/**
+ * Guarda muestras nuevas: O(1) por muestra en el almacén .ds4m si existe;
+ * si no, reescribe .ds4map.samples.json como siempre
+ * @returns {string} Ruta escrita
+ */
+function appendSamples(pairs, dir = process.cwd()) {
+  const storePath = path.join(dir, STORE_FILE);
+  if (fs.existsSync(storePath)) {
+    const store = new SampleStore(storePath);
+    try { pairs.forEach(p => store.append(p.label, p.before, p.after)); } finally { store.close(); }
+    return storePath;
+  }
+  const jsonPath = path.join(dir, JSON_FILE);
+  let existing = [];
+  try { if (fs.existsSync(jsonPath)) existing = JSON.parse(fs.readFileSync(jsonPath, 'utf8')); } catch (e) { existing = []; }
+  existing.push(...pairs);
+  fs.writeFileSync(jsonPath, JSON.stringify(existing, null, 2));
+  return jsonPath;
+}
+
+module.exports = { SampleStore, loadSamples, appendSamples, DATA_OFFSET, STORE_FILE, JSON_FILE };
@@ -48,6 +48,7 @@ app.post('/api/save-map', express.json(), validation.validateMappingBody(), (req
 
 // Collection job management
 const collectLib = require('./collect_lib');
+const sampleStore = require('./sample_store');
 let currentJob = null;
 
 // Aplicar rate limiting a endpoints de colección (más estricto)
@@ -122,9 +123,8 @@ app.post('/api/collect/auto', express.json(), collectRateLimit, async (req, res)
     for (const m of aggregated) { Object.assign(final.axes, m.axes || {}); Object.assign(final.buttons, m.buttons || {}); if (m.dpad && m.dpad.byte) final.dpad = m.dpad; }
     currentJob.result = final;
     // Validate using samples file if present
-    const samplesPath = path.join(process.cwd(), '.ds4map.samples.json');
     let samples = [];
-    try { if (fs.existsSync(samplesPath)) samples = JSON.parse(fs.readFileSync(samplesPath,'utf8')); } catch (e) { /* ignore */ }
+    try { samples = sampleStore.loadSamples(); } catch (e) { /* ignore */ }
     try {
       const validation = core.validateMapping(final, samples);
       currentJob.validation = validation;
@@ -0,0 +1,83 @@
+/**
+ * Tests del almacén binario de muestras en Node (server/sample_store.js)
+ */
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const { execFileSync } = require('child_process');
+const collectLib = require('../server/collect_lib');
+const { SampleStore, loadSamples, appendSamples, DATA_OFFSET, STORE_FILE } = require('../server/sample_store');
+
+const ROOT = path.join(__dirname, '..');
+
+function tmpDir() {
+  return fs.mkdtempSync(path.join(os.tmpdir(), 'ds4m-'));
+}
+
+function testSampleStoreAppendsAndReopens() {
+  const file = path.join(tmpDir(), STORE_FILE);
+  const store = new SampleStore(file, 16);
+  store.append('cross', [0, 0, 0, 0, 0, 8], [0, 0, 0, 0, 0, 0x28]);
+  store.append('circle', [1, 2], [1, 3]);
+  store.append('cross', [0, 0, 0, 0, 0, 8], [0, 0, 0, 0, 0, 0x28, 7]);
+  store.close();
+  if (fs.statSync(file).size !== DATA_OFFSET + 3 * (12 + 2 * 16)) throw new Error('unexpected store size');
+
+  const again = new SampleStore(file);
+  if (JSON.stringify(again.labels) !== '{"cross":2,"circle":1}') throw new Error('labels: ' + JSON.stringify(again.labels));
+  const cross = again.pairs(['cross']);
+  if (cross.length !== 2 || cross[1].after.length !== 7) throw new Error('label chain not followed');
+  if (again.pairs()[1].label !== 'circle') throw new Error('insertion order lost');
+  again.close();
+
+  let threw = false;
+  try { new SampleStore(file, 64); } catch (e) { threw = /width is 16/.test(e.message); }
+  if (!threw) throw new Error('mismatching width should be rejected');
+  console.log('✓ testSampleStoreAppendsAndReopens passed');
+}
+
+function testSampleStoreReadByPython() {
+  const dir = tmpDir();
+  const file = path.join(dir, STORE_FILE);
+  const store = new SampleStore(file);
+  store.append('l1', [0, 0x10], [0, 0x30]);
+  store.close();
+  const code = 'import sys; from python.sample_store import SampleStore; s = SampleStore(sys.argv[1]); '
+    + 'print(s.labels, [(l, list(b), list(a)) for l, b, a in s.pairs()])';
+  let out;
+  try {
+    out = execFileSync('python', ['-c', code, file], { cwd: ROOT, encoding: 'utf8' }).trim();
+  } catch (e) {
+    console.warn('python not available: skipping interop check');
+    return;
+  }
+  if (out !== "{'l1': 1} [('l1', [0, 16], [0, 48])]") throw new Error('python read: ' + out);
+  console.log('✓ testSampleStoreReadByPython passed');
+}
+
+async function testCollectAppendsToStoreWhenPresent() {
+  const dir = tmpDir();
+  new SampleStore(path.join(dir, STORE_FILE)).close();
+  const cwd = process.cwd();
+  process.chdir(dir);
+  try {
+    await collectLib.collectSamples({ label: 'cross', count: 3, simulate: true, save: false }, () => {});
+    await collectLib.collectSamples({ label: 'cross', count: 2, simulate: true, save: false }, () => {});
+    if (fs.existsSync(path.join(dir, '.ds4map.samples.json'))) throw new Error('JSON rewritten although the store exists');
+    if (loadSamples(dir).length !== 5) throw new Error('expected 5 samples in the store');
+  } finally {
+    process.chdir(cwd);
+  }
+  // Sin almacén: el JSON de siempre
+  const plain = tmpDir();
+  appendSamples([{ label: 'x', before: [0], after: [1] }], plain);
+  if (loadSamples(plain).length !== 1 || !fs.existsSync(path.join(plain, '.ds4map.samples.json'))) throw new Error('JSON fallback broken');
+  console.log('✓ testCollectAppendsToStoreWhenPresent passed');
+}
+
+module.exports = {
+  testSampleStoreAppendsAndReopens,
+  testSampleStoreReadByPython,
+  testCollectAppendsToStoreWhenPresent
+};
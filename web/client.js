@@ -18,7 +18,32 @@
    * Construir URL de WebSocket basada en el protocolo actual
    * Si la página se carga con HTTPS, usar WSS; sino usar WS
    */
-  const WS_URL = (location.protocol === 'https:' ? 'wss' : 'ws') + '://' + location.host;
+  const WS_URL = (location.protocol === 'https:' ? 'wss' : 'ws') + '://' + location.host + wsQuery();
+
+  /**
+   * Reenviar al WebSocket los parámetros de protocolo de la página
+   * (p. ej. ?format=binary&ts=1 o ?batch=1 con el backend Python en /ws)
+   */
+  function wsQuery() {
+    const page = new URLSearchParams(location.search);
+    const out = new URLSearchParams();
+    ['format', 'ts', 'batch'].forEach(k => { if (page.has(k)) out.set(k, page.get(k)); });
+    const q = out.toString();
+    return q ? '?' + q : '';
+  }
+
+  /**
+   * Sincronización con el backend Python: al conectar llega una instantánea
+   * {type:'snapshot', seq, epoch, axes, buttons} y luego deltas con seq.
+   * Al reconectar se piden sólo los eventos perdidos (?since=seq&epoch=...).
+   */
+  let syncEpoch = null;
+  let lastSeq = null;
+
+  function resumeUrl() {
+    if (syncEpoch === null || lastSeq === null || WS_URL.indexOf('?') !== -1) return WS_URL;
+    return WS_URL + '?since=' + lastSeq + '&epoch=' + encodeURIComponent(syncEpoch);
+  }
   
   // Estado de conexión WebSocket
   let ws = null;
@@ -117,7 +142,8 @@
     
     // Intentar establecer conexión WebSocket
     try {
-      ws = new WebSocket(WS_URL);
+      ws = new WebSocket(resumeUrl());
+      ws.binaryType = 'arraybuffer';
     } catch (e) {
       console.error('Error creando WebSocket:', e);
       attemptReconnect();
@@ -201,11 +227,42 @@
     }
   }
 
+  /**
+   * Tabla de controles del protocolo binario (?format=binary)
+   * Se recibe una vez al conectar como {type:'controls', ids, scale, ts}
+   */
+  let controlTable = null;
+
+  /**
+   * Decodifica un frame binario en eventos {type, id, value[, ts]}
+   *
+   * Registro little-endian: índice uint16 | tipo uint8 (0=botón, 1=eje) |
+   * valor int16 [| ts_ms uint32]
+   *
+   * @param {ArrayBuffer} buf - Frame binario
+   * @returns {Array<Object>} Eventos decodificados
+   */
+  function decodeBinaryFrame(buf) {
+    if (!controlTable) return [];
+    const view = new DataView(buf);
+    const size = controlTable.ts ? 9 : 5;
+    const events = [];
+    for (let off = 0; off + size <= view.byteLength; off += size) {
+      const id = controlTable.ids[view.getUint16(off, true)];
+      const isAxis = view.getUint8(off + 2) === 1;
+      const raw = view.getInt16(off + 3, true);
+      const ev = { type: isAxis ? 'axis' : 'button', id, value: isAxis ? raw / controlTable.scale : raw };
+      if (controlTable.ts) ev.ts = view.getUint32(off + 5, true);
+      events.push(ev);
+    }
+    return events;
+  }
+
   /**
    * Manejar mensajes entrantes del WebSocket
    * 
-   * Procesa eventos de entrada (botones, ejes) y actualiza la UI en consecuencia.
-   * También maneja mensajes de estado de calibración.
+   * Acepta frames JSON con un evento, arrays JSON de eventos (?batch=1),
+   * la tabla de controles y frames binarios (?format=binary).
    */
   function handleMessage(m) {
     try {
@@ -214,6 +271,12 @@
         console.warn('Mensaje WebSocket sin datos');
         return;
       }
+
+      // Frame binario: registros empaquetados
+      if (m.data instanceof ArrayBuffer) {
+        decodeBinaryFrame(m.data).forEach(handleEvent);
+        return;
+      }
       
       // Parsear JSON del mensaje
       let msg;
@@ -223,12 +286,43 @@
         console.error('Error parseando mensaje JSON:', parseErr);
         return;
       }
-      
+
+      if (Array.isArray(msg)) {
+        msg.forEach(handleEvent);
+      } else if (msg && msg.type === 'controls' && Array.isArray(msg.ids)) {
+        controlTable = msg;
+      } else if (msg && msg.type === 'snapshot') {
+        applySnapshot(msg);
+      } else {
+        handleEvent(msg);
+      }
+    } catch (err) {
+      console.error('Error procesando mensaje WebSocket:', err);
+    }
+  }
+
+  /**
+   * Aplica una instantánea de estado completo como eventos individuales
+   */
+  function applySnapshot(snap) {
+    syncEpoch = snap.epoch;
+    lastSeq = snap.seq;
+    Object.keys(snap.buttons || {}).forEach(id => handleEvent({ type: 'button', id, value: snap.buttons[id] }));
+    Object.keys(snap.axes || {}).forEach(id => handleEvent({ type: 'axis', id, value: snap.axes[id] }));
+  }
+
+  /**
+   * Procesa un evento de entrada (botones, ejes) y actualiza la UI en consecuencia.
+   * También maneja mensajes de estado de calibración.
+   */
+  function handleEvent(msg) {
+    try {
       // Validar estructura básica del mensaje
       if (!msg || typeof msg.type !== 'string') {
         console.warn('Mensaje con estructura inválida:', msg);
         return;
       }
+      if (typeof msg.seq === 'number') lastSeq = msg.seq;
       
       /**
        * Manejar evento de botón
@@ -262,7 +356,7 @@
         if (axisEl) {
           // Construir texto con todos los valores del eje (excepto 'type')
           const text = Object.keys(msg)
-            .filter(k => k !== 'type')
+            .filter(k => k !== 'type' && k !== 'seq')
             .map(k => `${k}: ${msg[k]}`)
             .join('  ');
           
@@ -300,9 +394,9 @@
         }
       }
     } catch (err) {
-      console.error('Error procesando mensaje WebSocket:', err);
+      console.error('Error procesando evento:', err);
     }
-  } // Fin de handleMessage
+  } // Fin de handleEvent
   
   /**
    * Textos de UI (placeholder amigable para i18n/internacionalización)